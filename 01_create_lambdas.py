@@ -4,14 +4,17 @@ Script to create Lambda functions for trading agent.
 Creates:
 1. Market Data Lambda - Fetches and analyzes stock data
 2. Email Notification Lambda - Sends trading alerts
+3. Daily Pipeline Lambda - Scheduled watchlist analysis and summary email
+4. Shared dependency layer (requests) used by all functions
+
+Packages are content-hashed: unchanged code is neither rebuilt nor re-uploaded.
 """
 
 import json
 import os
-import zipfile
 import boto3
-import time
-from io import BytesIO
+from lambda_builder import build_function_package, deploy_function, ensure_layer
+from provisioner import LAMBDA_FUNCTIONS, lambda_permissions_policy, retry_while_propagating
 
 # Initialize clients
 lambda_client = boto3.client('lambda', region_name='us-west-2')
@@ -92,7 +95,7 @@ try:
     print(f"✓ Created IAM role: {role_arn}")
     
     # Wait for role to be available
-    time.sleep(10)
+    iam_client.get_waiter('role_exists').wait(RoleName=lambda_role_name)
     
 except iam_client.exceptions.EntityAlreadyExistsException:
     role_response = iam_client.get_role(RoleName=lambda_role_name)
@@ -117,87 +120,61 @@ for policy_arn in policies_to_attach:
         if 'already attached' not in str(e).lower():
             print(f"⚠️  Warning attaching policy: {e}")
 
-# Step 3: Create Market Data Lambda
-print("\nStep 3: Creating Market Data Lambda function...")
-
-def create_lambda_zip(filename):
-    """Create a zip file for Lambda deployment"""
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        zip_file.write(filename, os.path.basename(filename))
-    zip_buffer.seek(0)
-    return zip_buffer.read()
-
-market_data_function_name = 'TradingAgent-MarketData'
+# Step 3: Publish shared dependency layer
+print("\nStep 3: Building shared dependency layer...")
 
 try:
-    # Create zip file
-    zip_content = create_lambda_zip('lambda_market_data.py')
-    
-    # Create or update function
-    try:
-        lambda_client.create_function(
-            FunctionName=market_data_function_name,
-            Runtime='python3.12',
-            Role=role_arn,
-            Handler='lambda_market_data.lambda_handler',
-            Code={'ZipFile': zip_content},
-            Description='Fetches and analyzes stock market data',
-            Timeout=30,
-            MemorySize=256
-        )
-        print(f"✓ Created Lambda function: {market_data_function_name}")
-    except lambda_client.exceptions.ResourceConflictException:
-        lambda_client.update_function_code(
-            FunctionName=market_data_function_name,
-            ZipFile=zip_content
-        )
-        print(f"✓ Updated Lambda function: {market_data_function_name}")
-    
-    # Get function ARN
-    market_data_response = lambda_client.get_function(FunctionName=market_data_function_name)
-    market_data_arn = market_data_response['Configuration']['FunctionArn']
-    
+    layer_arn, published = ensure_layer(lambda_client)
+    if published:
+        print(f"✓ Published dependency layer: {layer_arn}")
+    else:
+        print(f"✓ Dependency layer unchanged: {layer_arn}")
 except Exception as e:
-    print(f"❌ Error creating market data Lambda: {e}")
+    print(f"❌ Error building dependency layer: {e}")
     exit(1)
 
-# Step 4: Create Email Notification Lambda
-print("\nStep 4: Creating Email Notification Lambda function...")
+# Step 4: Create or update Lambda functions
+print("\nStep 4: Deploying Lambda functions...")
 
-notification_function_name = 'TradingAgent-EmailNotification'
+function_arns = {}
 
-try:
-    # Create zip file
-    zip_content = create_lambda_zip('lambda_notification.py')
-    
-    # Create or update function
+for key, spec in LAMBDA_FUNCTIONS.items():
+    function_name = spec['function_name']
     try:
-        lambda_client.create_function(
-            FunctionName=notification_function_name,
-            Runtime='python3.12',
-            Role=role_arn,
-            Handler='lambda_notification.lambda_handler',
-            Code={'ZipFile': zip_content},
-            Description='Sends email notifications for trading alerts',
-            Timeout=30,
-            MemorySize=256
-        )
-        print(f"✓ Created Lambda function: {notification_function_name}")
-    except lambda_client.exceptions.ResourceConflictException:
-        lambda_client.update_function_code(
-            FunctionName=notification_function_name,
-            ZipFile=zip_content
+        # Rebuilds only when sources change; skips upload when CodeSha256 matches
+        zip_content, digest, rebuilt = build_function_package(function_name, spec['sources'])
+        print(f"  {function_name}: package {digest[:12]} ({'rebuilt' if rebuilt else 'cached'}, {len(zip_content)} bytes)")
+        
+        # The pipeline invokes the other functions and Bedrock
+        policy = lambda_permissions_policy(key, 'us-west-2', account_id)
+        if policy:
+            iam_client.put_role_policy(RoleName=lambda_role_name, PolicyName=f'TradingAgent-{key}-permissions',
+                                       PolicyDocument=json.dumps(policy))
+        
+        # A new role can take a few seconds before Lambda is allowed to assume it
+        function_arns[key], changed = deploy_function(
+            lambda_client,
+            function_name,
+            zip_content,
+            role_arn=role_arn,
+            handler=spec['handler'],
+            description=spec['description'],
+            layers=[layer_arn],
+            timeout=spec.get('timeout', 30),
+            create_function=retry_while_propagating
         )
-        print(f"✓ Updated Lambda function: {notification_function_name}")
-    
-    # Get function ARN
-    notification_response = lambda_client.get_function(FunctionName=notification_function_name)
-    notification_arn = notification_response['Configuration']['FunctionArn']
-    
-except Exception as e:
-    print(f"❌ Error creating notification Lambda: {e}")
-    exit(1)
+        if changed:
+            print(f"✓ Deployed Lambda function: {function_name}")
+        else:
+            print(f"✓ Lambda function up to date: {function_name}")
+    except Exception as e:
+        print(f"❌ Error deploying {function_name}: {e}")
+        exit(1)
+
+market_data_function_name = LAMBDA_FUNCTIONS['market_data']['function_name']
+market_data_arn = function_arns['market_data']
+notification_function_name = LAMBDA_FUNCTIONS['notification']['function_name']
+notification_arn = function_arns['notification']
 
 # Step 5: Verify SES email
 print("\nStep 5: Verifying email address in Amazon SES...")
@@ -259,7 +236,8 @@ lambda_config = {
                 "properties": {
                     "alert_type": {
                         "type": "string",
-                        "enum": ["high_confidence_opportunity", "stop_loss_triggered", "take_profit_reached", "daily_summary"],
+                        "enum": ["high_confidence_opportunity", "stop_loss_triggered", "take_profit_reached", "daily_summary",
+                                 "trade_approval_request"],
                         "description": "Type of alert to send"
                     },
                     "data": {
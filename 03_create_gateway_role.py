@@ -37,7 +37,7 @@ try:
     )
     role_arn = role_response['Role']['Arn']
     print(f"✓ Role created: {role_arn}")
-    time.sleep(10)
+    iam_client.get_waiter('role_exists').wait(RoleName=ROLE_NAME)
 except Exception as e:
     print(f"❌ Error: {e}")
     exit(1)
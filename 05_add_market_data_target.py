@@ -18,13 +18,23 @@ lambda_arn = "arn:aws:lambda:us-west-2:235206763254:function:TradingAgent-Market
 tool_schema = [
     {
         "name": "analyze_stock",
-        "description": "Fetch and analyze stock market data with technical indicators (RSI, MACD, EMA, Bollinger Bands)",
+        "description": "Fetch and analyze stock market data with technical indicators (RSI, MACD, EMA, Bollinger Bands, ATR, ADX, Stochastic, OBV, VWAP). If the data provider is down, returns the last known good analysis with stale=true and data_as_of",
         "inputSchema": {
             "type": "object",
             "properties": {
                 "symbol": {
                     "type": "string",
                     "description": "Stock ticker symbol (e.g., AAPL, MSFT, GOOGL)"
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": ["daily", "intraday", "multi_timeframe"],
+                    "description": "daily (default), intraday bars, or multi_timeframe for daily signals confirmed by weekly/monthly trend"
+                },
+                "interval": {
+                    "type": "string",
+                    "enum": ["1min", "5min", "15min"],
+                    "description": "Intraday bar size (intraday mode only, default 15min)"
                 }
             },
             "required": ["symbol"]
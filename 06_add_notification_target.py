@@ -24,11 +24,11 @@ tool_schema = [
             "properties": {
                 "alert_type": {
                     "type": "string",
-                    "description": "Type of alert: high_confidence_opportunity, stop_loss_triggered, take_profit_reached, or daily_summary"
+                    "description": "Type of alert: high_confidence_opportunity, stop_loss_triggered, take_profit_reached, daily_summary, or trade_approval_request"
                 },
                 "data": {
                     "type": "object",
-                    "description": "Alert data to include in email (recommendations, prices, etc.)"
+                    "description": "Alert data to include in email (recommendations, prices, etc.). For daily_summary, optional closes ({symbol: [chronological closes]}) enables correlation flags"
                 }
             },
             "required": ["alert_type", "data"]
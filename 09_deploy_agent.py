@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 """
 Script to deploy Trading Agent to AgentCore Runtime.
+
+Blocks until the endpoint is READY (use --no-wait to return after launch)
+and reports how long each deployment phase took.
 """
 
+import argparse
 import json
 import os
 from bedrock_agentcore_starter_toolkit import Runtime
+from runtime_status import READY_STATUSES, PhaseTimer, configure_runtime, wait_for_runtime
+
+parser = argparse.ArgumentParser(description="Deploy Trading Agent to AgentCore Runtime")
+parser.add_argument("--no-wait", action="store_true", help="Return as soon as the launch is submitted")
+parser.add_argument("--timeout", type=int, default=900, help="Seconds to wait for the endpoint")
+args = parser.parse_args()
 
 # Load all configurations
 with open('memory_config.json') as f:
@@ -24,29 +34,11 @@ print("=" * 80)
 print("DEPLOYING TRADING AGENT TO AGENTCORE RUNTIME")
 print("=" * 80)
 
-# Initialize Runtime
-runtime = Runtime()
-
-# Build authorizer configuration
-auth_config = {
-    "customJWTAuthorizer": {
-        "allowedClients": [cognito_config["client_id"]],
-        "discoveryUrl": cognito_config["discovery_url"]
-    }
-}
+timer = PhaseTimer()
 
 # Step 1: Configure runtime
 print("\nStep 1: Configuring runtime...")
-runtime.configure(
-    entrypoint="trading_agent.py",
-    agent_name="trading_agent",
-    execution_role=role_config["role_arn"],
-    auto_create_ecr=True,
-    memory_mode="NO_MEMORY",
-    requirements_file="requirements.txt",
-    region="us-west-2",
-    authorizer_configuration=auth_config
-)
+runtime = configure_runtime(Runtime(), role_config, cognito_config)
 print("✓ Runtime configured")
 
 # Step 2: Build environment variables
@@ -57,7 +49,17 @@ env_vars = {
     "COGNITO_CLIENT_ID": cognito_config["client_id"],
     "COGNITO_CLIENT_SECRET": cognito_config["client_secret"],
     "COGNITO_DISCOVERY_URL": cognito_config["discovery_url"],
-    "OAUTH_SCOPES": "trading-api/read trading-api/write"
+    "OAUTH_SCOPES": "trading-api/read trading-api/write",
+    "MEMORY_RETRIEVAL_MODE": os.environ.get("MEMORY_RETRIEVAL_MODE", "eager"),
+    "PORTFOLIO_CAPITAL": os.environ.get("PORTFOLIO_CAPITAL", "10000"),
+    "MODEL_ROUTING": os.environ.get("MODEL_ROUTING", "on"),
+    "AGENT_MAX_CONCURRENCY": os.environ.get("AGENT_MAX_CONCURRENCY", "4"),
+    "AGENT_MAX_QUEUE": os.environ.get("AGENT_MAX_QUEUE", "16"),
+    "AGENT_QUEUE_TIMEOUT_SECONDS": os.environ.get("AGENT_QUEUE_TIMEOUT_SECONDS", "30"),
+    "GATEWAY_FAILURE_THRESHOLD": os.environ.get("GATEWAY_FAILURE_THRESHOLD", "3"),
+    "GATEWAY_COOLDOWN_SECONDS": os.environ.get("GATEWAY_COOLDOWN_SECONDS", "60"),
+    "LAST_GOOD_MAX_AGE_HOURS": os.environ.get("LAST_GOOD_MAX_AGE_HOURS", "72"),
+    "DEBUG_STATS": os.environ.get("DEBUG_STATS", "off")
 }
 
 print("Environment variables:")
@@ -79,12 +81,23 @@ print("  4. Deploy to AgentCore Runtime")
 print("\n⏱️  Expected time: 5-10 minutes")
 print("=" * 80)
 
-launch_result = runtime.launch(
-    env_vars=env_vars,
-    auto_update_on_conflict=True
-)
+# Build + ECR push + runtime create/update request
+with timer.phase("build_and_push"):
+    launch_result = runtime.launch(
+        env_vars=env_vars,
+        auto_update_on_conflict=True
+    )
 
 agent_arn = launch_result.agent_arn
+print(f"\n✓ Image pushed and runtime submitted in {timer.phases['build_and_push']}s")
+
+status = "SUBMITTED"
+if not args.no_wait:
+    print("\nWaiting for runtime and endpoint to become READY...")
+    wait_result = wait_for_runtime(runtime, timeout=args.timeout)
+    status = wait_result["status"]
+    for phase, seconds in wait_result["phases"].items():
+        timer.record(phase, seconds)
 
 # Save runtime config
 runtime_output_config = {
@@ -92,22 +105,31 @@ runtime_output_config = {
     "agent_name": "trading_agent",
     "region": "us-west-2",
     "memory_id": memory_config["memory_id"],
-    "gateway_url": gateway_config["gateway_url"]
+    "gateway_url": gateway_config["gateway_url"],
+    "status": status,
+    "deploy_timings": dict(timer.phases, total=timer.elapsed())
 }
 
 with open('runtime_config.json', 'w') as f:
     json.dump(runtime_output_config, f, indent=2)
 
-print(f"\n✓ Agent deployment initiated!")
-print(f"  Agent ARN: {agent_arn}")
+print(f"\n  Agent ARN: {agent_arn}")
 print(f"✓ Configuration saved to runtime_config.json")
 
 print("\n" + "=" * 80)
-print("NEXT STEPS")
+print("DEPLOYMENT TIMINGS")
 print("=" * 80)
-print("\n1. Monitor deployment status:")
-print("   python3 10_check_status.py")
-print("\n2. Wait for status to show 'READY'")
-print("\n3. Test your agent:")
-print("   python3 11_test_agent.py")
-print("\n" + "=" * 80)
+for phase, seconds in timer.phases.items():
+    print(f"  {phase}: {seconds}s")
+print(f"  total: {timer.elapsed()}s")
+
+if args.no_wait:
+    print("\nDeployment initiated. Monitor it with:")
+    print("   python3 10_check_status.py --wait")
+elif status in READY_STATUSES:
+    print("\n✓ Agent is READY. Test it with:")
+    print("   python3 11_test_agent.py")
+else:
+    print(f"\n✗ Deployment finished with status {status}")
+    print("   Check CloudWatch logs, or run: python3 10_check_status.py --wait")
+    exit(1)
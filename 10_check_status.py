@@ -1,10 +1,22 @@
 #!/usr/bin/env python3
 """
 Script to check Trading Agent deployment status.
+
+Usage:
+  python3 10_check_status.py                 # one-shot status
+  python3 10_check_status.py --wait          # block until READY or FAILED
+  python3 10_check_status.py --wait --timeout 600
 """
 
+import argparse
 import json
 from bedrock_agentcore_starter_toolkit import Runtime
+from runtime_status import READY_STATUSES, FAILED_STATUSES, configure_runtime, wait_for_runtime
+
+parser = argparse.ArgumentParser(description="Check Trading Agent deployment status")
+parser.add_argument("--wait", action="store_true", help="Poll until the endpoint is READY or FAILED")
+parser.add_argument("--timeout", type=int, default=900, help="Seconds to wait before giving up (with --wait)")
+args = parser.parse_args()
 
 # Load configurations
 with open('runtime_execution_role_config.json') as f:
@@ -13,40 +25,28 @@ with open('runtime_execution_role_config.json') as f:
 with open('cognito_config.json') as f:
     cognito_config = json.load(f)
 
-# Initialize Runtime
-runtime = Runtime()
-
-# Build authorizer configuration
-auth_config = {
-    "customJWTAuthorizer": {
-        "allowedClients": [cognito_config["client_id"]],
-        "discoveryUrl": cognito_config["discovery_url"]
-    }
-}
-
 # Configure runtime
 print("Loading runtime configuration...")
-runtime.configure(
-    entrypoint="trading_agent.py",
-    agent_name="trading_agent",
-    execution_role=role_config["role_arn"],
-    auto_create_ecr=True,
-    memory_mode="NO_MEMORY",
-    requirements_file="requirements.txt",
-    region="us-west-2",
-    authorizer_configuration=auth_config
-)
+runtime = configure_runtime(Runtime(), role_config, cognito_config)
 
 # Check status
-print("Checking runtime deployment status...")
-status_response = runtime.status()
-
-status = status_response.endpoint["status"]
+if args.wait:
+    print(f"Waiting for deployment (timeout {args.timeout}s)...")
+    result = wait_for_runtime(runtime, timeout=args.timeout)
+    status = result["status"]
+    endpoint = result["endpoint"]
+    print(f"\nElapsed: {result['elapsed_seconds']}s")
+    for phase, seconds in result["phases"].items():
+        print(f"  {phase}: {seconds}s")
+else:
+    print("Checking runtime deployment status...")
+    endpoint = runtime.status().endpoint
+    status = endpoint["status"]
 
 print(f"\nAgent Status: {status}")
-print(f"Endpoint Details: {json.dumps(status_response.endpoint, indent=2, default=str)}")
+print(f"Endpoint Details: {json.dumps(endpoint, indent=2, default=str)}")
 
-if status == "READY":
+if status in READY_STATUSES:
     print("\n" + "=" * 80)
     print("✓ Agent is READY to receive requests!")
     print("=" * 80)
@@ -56,11 +56,15 @@ elif status in ["CREATING", "UPDATING"]:
     print("\n" + "=" * 80)
     print("⏳ Agent deployment in progress...")
     print("=" * 80)
-    print("\nRun this script again in 1-2 minutes to check status.")
-elif status in ["CREATE_FAILED", "UPDATE_FAILED"]:
+    print("\nRun with --wait to block until the deployment finishes.")
+elif status in FAILED_STATUSES:
     print("\n" + "=" * 80)
     print("✗ Agent deployment failed!")
     print("=" * 80)
     print("\nCheck CloudWatch logs for details")
+    exit(1)
+elif status == "TIMEOUT":
+    print(f"\n⚠ Deployment did not finish within {args.timeout}s")
+    exit(1)
 else:
     print(f"\n⚠ Unknown status: {status}")
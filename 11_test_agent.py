@@ -7,6 +7,7 @@ import json
 import base64
 import requests
 from bedrock_agentcore_starter_toolkit import Runtime
+from runtime_status import configure_runtime
 
 # Load configurations
 with open('runtime_execution_role_config.json') as f:
@@ -46,25 +47,7 @@ print("✓ OAuth token obtained")
 
 # Step 2: Initialize Runtime
 print("\n2. Initializing Runtime...")
-runtime = Runtime()
-
-auth_config = {
-    "customJWTAuthorizer": {
-        "allowedClients": [cognito_config["client_id"]],
-        "discoveryUrl": cognito_config["discovery_url"]
-    }
-}
-
-runtime.configure(
-    entrypoint="trading_agent.py",
-    agent_name="trading_agent",
-    execution_role=role_config["role_arn"],
-    auto_create_ecr=True,
-    memory_mode="NO_MEMORY",
-    requirements_file="requirements.txt",
-    region="us-west-2",
-    authorizer_configuration=auth_config
-)
+runtime = configure_runtime(Runtime(), role_config, cognito_config)
 print("✓ Runtime configured")
 
 # Step 3: Test with stock analysis
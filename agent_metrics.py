@@ -0,0 +1,61 @@
+"""
+Agent metrics
+Per-tier latency and token usage for agent invocations, including prompt cache hits
+"""
+
+import threading
+
+
+def usage_from_result(result):
+    """Accumulated token usage of a Strands AgentResult as a plain dict"""
+    metrics = getattr(result, 'metrics', None)
+    usage = getattr(metrics, 'accumulated_usage', None) or {}
+    return {
+        'inputTokens': usage.get('inputTokens', 0),
+        'outputTokens': usage.get('outputTokens', 0),
+        'cacheReadInputTokens': usage.get('cacheReadInputTokens', 0),
+        'cacheWriteInputTokens': usage.get('cacheWriteInputTokens', 0)
+    }
+
+
+class AgentMetrics:
+    """Thread-safe running totals per label (model tier, cache path, ...)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tiers = {}
+
+    def record(self, tier, seconds, usage=None):
+        usage = usage or {}
+        with self._lock:
+            stats = self.tiers.setdefault(tier, {
+                'requests': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+                'inputTokens': 0,
+                'outputTokens': 0,
+                'cacheReadInputTokens': 0,
+                'cacheWriteInputTokens': 0
+            })
+            stats['requests'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            for key in ('inputTokens', 'outputTokens', 'cacheReadInputTokens', 'cacheWriteInputTokens'):
+                stats[key] += usage.get(key, 0)
+
+    def summary(self):
+        with self._lock:
+            report = {}
+            for tier, stats in self.tiers.items():
+                prompt_tokens = stats['inputTokens'] + stats['cacheReadInputTokens'] + stats['cacheWriteInputTokens']
+                report[tier] = {
+                    'requests': stats['requests'],
+                    'avg_seconds': round(stats['total_seconds'] / stats['requests'], 3),
+                    'max_seconds': round(stats['max_seconds'], 3),
+                    'input_tokens': stats['inputTokens'],
+                    'output_tokens': stats['outputTokens'],
+                    'cache_read_tokens': stats['cacheReadInputTokens'],
+                    'cache_write_tokens': stats['cacheWriteInputTokens'],
+                    'cached_prompt_ratio': round(stats['cacheReadInputTokens'] / prompt_tokens, 3) if prompt_tokens else 0.0
+                }
+            return report
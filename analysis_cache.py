@@ -0,0 +1,168 @@
+"""
+Analysis cache
+Memoizes full stock analyses keyed by (symbol, latest bar, indicator parameters).
+
+The latest bar enters the key as its date, close and volume: a new bar, or
+the same day's forming bar updating intraday, changes the key, so cached
+results never go stale mid-session; the TTL only bounds how long an entry
+occupies memory. Entries live in a
+per-container LRU and, when a table is configured, in DynamoDB so warm
+containers and the screener can share results. The table needs a string
+partition key 'cache_key' and TTL enabled on 'expires_at', and the Lambda role
+needs dynamodb:GetItem/PutItem on it.
+
+Separately, the latest good analysis per (mode, symbol) is kept for
+ANALYSIS_LAST_GOOD_MAX_AGE_HOURS regardless of bar date. It is only read when
+the provider is down, and callers must mark what they return as stale.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from trading_config import get_setting
+from ttl_cache import TTLCache
+
+
+def parameters_hash(parameters):
+    """Stable short hash of an indicator parameter dict"""
+    encoded = json.dumps(parameters, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def bar_version(bar):
+    """The latest bar as it stands: its date plus close and volume, which move while it is forming"""
+    return f"{bar['date']}@{bar['close']}x{bar.get('volume')}"
+
+
+def analysis_key(symbol, bar, parameters, mode='daily'):
+    return f"{mode}#{symbol.upper()}#{bar_version(bar)}#{parameters_hash(parameters)}"
+
+
+def last_good_key(symbol, mode='daily'):
+    return f"{mode}#{symbol.upper()}#last_good"
+
+
+class DynamoDBAnalysisStore:
+    """Optional shared backend: one item per analysis, expired by DynamoDB TTL.
+
+    Table: partition key 'cache_key' (S), TTL on 'expires_at'. Last known good
+    results share the table under their own keys. setup_infrastructure.py
+    creates it when market_data.analysis_cache_table (or ANALYSIS_CACHE_TABLE)
+    is set.
+    """
+
+    def __init__(self, table, ttl_seconds):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key):
+        item = self.table.get_item(Key={'cache_key': key}).get('Item')
+        if not item or int(item.get('expires_at', 0)) <= time.time():
+            return None
+        return json.loads(item['result'])
+
+    def set(self, key, result, ttl_seconds=None):
+        self.table.put_item(Item={
+            'cache_key': key,
+            'result': json.dumps(result),
+            'expires_at': int(time.time() + (ttl_seconds or self.ttl_seconds))
+        })
+
+
+class AnalysisCache:
+    """In-memory LRU + TTL in front of an optional shared store"""
+
+    def __init__(self, memory, store=None, last_good=None):
+        self.memory = memory
+        self.store = store
+        self.last_good = last_good or TTLCache(max_size=memory.max_size, ttl_seconds=72 * 3600)
+        self.store_hits = 0
+        self.store_errors = 0
+
+    def get(self, symbol, bar, parameters, mode='daily'):
+        key = analysis_key(symbol, bar, parameters, mode)
+        result = self.memory.get(key)
+        if result is not None or self.store is None:
+            return result
+
+        try:
+            result = self.store.get(key)
+        except Exception as e:
+            self.store_errors += 1
+            print(f"Analysis cache store read failed: {e}")
+            return None
+        if result is not None:
+            self.store_hits += 1
+            self.memory.set(key, result)
+        return result
+
+    def set(self, symbol, bar, parameters, result, mode='daily'):
+        key = analysis_key(symbol, bar, parameters, mode)
+        self.memory.set(key, result)
+        if self.store is not None:
+            try:
+                self.store.set(key, result)
+            except Exception as e:
+                self.store_errors += 1
+                print(f"Analysis cache store write failed: {e}")
+        self.remember(symbol, result, mode)
+
+    def remember(self, symbol, result, mode='daily'):
+        """Record result as the last known good analysis for the symbol"""
+        key = last_good_key(symbol, mode)
+        self.last_good.set(key, result)
+        if self.store is not None:
+            try:
+                self.store.set(key, result, ttl_seconds=self.last_good.ttl_seconds)
+            except Exception as e:
+                self.store_errors += 1
+                print(f"Analysis cache store write failed: {e}")
+
+    def last_known_good(self, symbol, mode='daily'):
+        """Latest good analysis of any bar date (None if there is none)"""
+        key = last_good_key(symbol, mode)
+        result = self.last_good.get(key)
+        if result is not None or self.store is None:
+            return result
+
+        try:
+            result = self.store.get(key)
+        except Exception as e:
+            self.store_errors += 1
+            print(f"Analysis cache store read failed: {e}")
+            return None
+        if result is not None:
+            self.last_good.set(key, result)
+        return result
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats.update({'store_hits': self.store_hits, 'store_errors': self.store_errors})
+        return stats
+
+
+def create_analysis_cache(dynamodb=None):
+    """Cache sized by ANALYSIS_CACHE_MAX_ENTRIES / ANALYSIS_CACHE_TTL_SECONDS,
+    keeping last known good analyses for ANALYSIS_LAST_GOOD_MAX_AGE_HOURS.
+
+    The DynamoDB backend is used when ANALYSIS_CACHE_TABLE (or
+    market_data.analysis_cache_table in config) names a table.
+    """
+    ttl_seconds = int(os.environ.get('ANALYSIS_CACHE_TTL_SECONDS', 900))
+    max_entries = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', 256))
+    memory = TTLCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+    last_good = TTLCache(
+        max_size=max_entries,
+        ttl_seconds=int(float(os.environ.get('ANALYSIS_LAST_GOOD_MAX_AGE_HOURS', 72)) * 3600)
+    )
+
+    table_name = os.environ.get('ANALYSIS_CACHE_TABLE') or get_setting('market_data', 'analysis_cache_table')
+    store = None
+    if table_name:
+        if dynamodb is None:
+            import boto3
+            dynamodb = boto3.resource('dynamodb')
+        store = DynamoDBAnalysisStore(dynamodb.Table(table_name), ttl_seconds)
+    return AnalysisCache(memory, store, last_good)
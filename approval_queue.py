@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Approval Queue
+Human-in-the-loop approval of proposed Phase 2 trades.
+
+A proposed order becomes a pending approval request and an approval email
+(alert_type 'trade_approval_request') is sent. The request is approved or
+rejected from this CLI before phase_2_settings.approval_timeout_minutes
+runs out, otherwise it expires. Approved requests are released to an
+execution stage exactly once: phase_2_settings.executor picks the
+paper-trading engine ('paper', default) or the broker adapter ('broker').
+The paper executor saves every accepted order to the account file in
+phase_2_settings.paper_trading.account_file (filled by paper_trading.py
+--account), so a released order is never held only in memory.
+
+Expiry never scans: the in-memory queue keeps a heap ordered by expiry, and
+the DynamoDB queue queries a GSI on (status, expires_at) for pending
+requests whose expiry has passed.
+
+Usage:
+  python3 approval_queue.py propose AAPL BUY 1 --entry 175.5 --stop 170 --take-profit 185
+  python3 approval_queue.py list
+  python3 approval_queue.py approve <request_id>
+  python3 approval_queue.py reject <request_id> --reason "earnings tomorrow"
+  python3 approval_queue.py process          # expire overdue requests, release approved ones
+  python3 approval_queue.py process --executor broker
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from paper_trading import load_engine, paper_settings, save_engine
+from price_alerts import lambda_notifier
+from trading_config import get_setting
+
+STATUS_INDEX = 'status-expires-index'
+EXECUTORS = ('paper', 'broker')
+ORDER_FIELDS = ('symbol', 'side', 'quantity', 'entry_price', 'stop_price', 'take_profit', 'confidence', 'reason')
+
+
+def approval_settings(config=None):
+    """phase_2_settings relevant to approvals"""
+    settings = get_setting('phase_2_settings', default={}, config=config) or {}
+    return {
+        'require_human_approval': settings.get('require_human_approval', True),
+        'approval_timeout_minutes': settings.get('approval_timeout_minutes', 60),
+        'executor': settings.get('executor', 'paper')
+    }
+
+
+def approval_request(order, timeout_minutes, now=None):
+    """Pending request for an order dict (symbol, side, quantity, entry_price, ...)"""
+    now = time.time() if now is None else now
+    request = {field: order.get(field) for field in ORDER_FIELDS}
+    request['symbol'] = request['symbol'].upper()
+    request.update({
+        'request_id': uuid.uuid4().hex[:12],
+        'status': 'pending',
+        'created_at': int(now),
+        'expires_at': int(now + timeout_minutes * 60)
+    })
+    return request
+
+
+def format_time(epoch_seconds):
+    return datetime.fromtimestamp(epoch_seconds, timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+
+
+class LocalApprovalQueue:
+    """In-memory stand-in: requests by id, a heap of (expires_at, id) and a FIFO of approved ids"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.requests = {}
+        self._expiry = []
+        self._approved = deque()
+
+    def submit(self, request):
+        self.requests[request['request_id']] = request
+        heapq.heappush(self._expiry, (request['expires_at'], request['request_id']))
+        return request
+
+    def get(self, request_id):
+        return self.requests.get(request_id)
+
+    def pending(self):
+        return [r for r in self.requests.values() if r['status'] == 'pending']
+
+    def decide(self, request_id, status, decided_by=None, note=None):
+        """Approve or reject a pending, unexpired request; None if that is no longer possible"""
+        request = self.requests.get(request_id)
+        now = self.clock()
+        if request is None or request['status'] != 'pending' or request['expires_at'] <= now:
+            return None
+        request.update({'status': status, 'decided_at': int(now), 'decided_by': decided_by, 'note': note})
+        if status == 'approved':
+            self._approved.append(request_id)
+        return request
+
+    def expire_due(self):
+        """Mark pending requests past their expiry as expired; decided ones are skipped lazily"""
+        now = self.clock()
+        expired = []
+        while self._expiry and self._expiry[0][0] <= now:
+            _, request_id = heapq.heappop(self._expiry)
+            request = self.requests[request_id]
+            if request['status'] == 'pending':
+                request['status'] = 'expired'
+                expired.append(request)
+        return expired
+
+    def claim_approved(self):
+        """Approved requests not yet released, each returned once"""
+        claimed = []
+        while self._approved:
+            request = self.requests[self._approved.popleft()]
+            request['status'] = 'released'
+            claimed.append(request)
+        return claimed
+
+    def record_execution(self, request, execution):
+        request['execution'] = execution
+
+
+class DynamoDBApprovalQueue:
+    """Items keyed by request_id with a GSI on (status, expires_at).
+
+    Table: partition key 'request_id' (S); GSI 'status-expires-index' with
+    partition key 'status' (S) and sort key 'expires_at' (N); provisioner.py
+    creates it when the table is named. Status changes are conditional
+    updates, so two workers never decide, expire or release the same request
+    twice.
+    """
+
+    def __init__(self, table, clock=time.time):
+        self.table = table
+        self.clock = clock
+
+    @staticmethod
+    def _plain(item):
+        return json.loads(json.dumps(item, default=float)) if item else None
+
+    def submit(self, request):
+        self.table.put_item(Item=json.loads(json.dumps(request), parse_float=Decimal))
+        return request
+
+    def get(self, request_id):
+        return self._plain(self.table.get_item(Key={'request_id': request_id}).get('Item'))
+
+    def _by_status(self, status, expires_before=None):
+        from boto3.dynamodb.conditions import Key
+
+        condition = Key('status').eq(status)
+        if expires_before is not None:
+            condition = condition & Key('expires_at').lte(int(expires_before))
+        kwargs = {'IndexName': STATUS_INDEX, 'KeyConditionExpression': condition}
+        items = []
+        while True:
+            response = self.table.query(**kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return [self._plain(item) for item in items]
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def pending(self):
+        return self._by_status('pending')
+
+    def _transition(self, request_id, from_status, to_status, extra=None, condition=None, values=None):
+        """Conditional status update; returns the new item or None if the condition failed"""
+        names = {'#status': 'status'}
+        values = dict(values or {}, **{':from': from_status, ':to': to_status})
+        updates = ['#status = :to']
+        for key, value in (extra or {}).items():
+            names[f"#{key}"] = key
+            values[f":{key}"] = value
+            updates.append(f"#{key} = :{key}")
+        try:
+            response = self.table.update_item(
+                Key={'request_id': request_id},
+                UpdateExpression='SET ' + ', '.join(updates),
+                ConditionExpression='#status = :from' + (f" AND {condition}" if condition else ''),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+                ReturnValues='ALL_NEW'
+            )
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            return None
+        return self._plain(response['Attributes'])
+
+    def decide(self, request_id, status, decided_by=None, note=None):
+        now = int(self.clock())
+        return self._transition(
+            request_id, 'pending', status,
+            extra={'decided_at': now, 'decided_by': decided_by, 'note': note},
+            condition='expires_at > :now', values={':now': now}
+        )
+
+    def expire_due(self):
+        expired = []
+        for request in self._by_status('pending', expires_before=self.clock()):
+            request = self._transition(request['request_id'], 'pending', 'expired')
+            if request:
+                expired.append(request)
+        return expired
+
+    def claim_approved(self):
+        claimed = []
+        for request in self._by_status('approved'):
+            request = self._transition(request['request_id'], 'approved', 'released')
+            if request:
+                claimed.append(request)
+        return claimed
+
+    def record_execution(self, request, execution):
+        self.table.update_item(
+            Key={'request_id': request['request_id']},
+            UpdateExpression='SET execution = :execution',
+            ExpressionAttributeValues={':execution': json.loads(json.dumps(execution), parse_float=Decimal)}
+        )
+
+
+def create_approval_queue(dynamodb=None, allow_local=True):
+    """DynamoDB queue when APPROVAL_QUEUE_TABLE (or phase_2_settings.approval_table) is set.
+
+    Otherwise the in-memory queue, or None with allow_local=False.
+    """
+    table_name = os.environ.get('APPROVAL_QUEUE_TABLE') or get_setting('phase_2_settings', 'approval_table')
+    if table_name:
+        if dynamodb is None:
+            import boto3
+            dynamodb = boto3.resource('dynamodb')
+        return DynamoDBApprovalQueue(dynamodb.Table(table_name))
+    if not allow_local:
+        return None
+    return LocalApprovalQueue()
+
+
+def order_type_for(request):
+    """A limit at entry_price for BUY requests that have one, otherwise a market order"""
+    return 'limit' if request.get('entry_price') and request['side'] == 'BUY' else 'market'
+
+
+def broker_executor(config=None):
+    """Execution stage that submits each released request through broker_adapter.OrderManager"""
+    from broker_adapter import create_order_manager
+
+    async def submit(request):
+        manager = create_order_manager(config)
+        try:
+            order_type = order_type_for(request)
+            return await manager.submit(
+                request['symbol'], request['side'], int(request['quantity']), order_type,
+                limit_price=request.get('entry_price') if order_type == 'limit' else None,
+                stop_price=request.get('stop_price'), take_profit=request.get('take_profit')
+            )
+        finally:
+            manager.client.close()
+
+    def execute(request):
+        # One client per request: each asyncio.run gets its own event loop
+        order = asyncio.run(submit(request))
+        return {'status': order['status'], 'order_id': order.get('order_id'),
+                'client_order_id': order['client_order_id'], 'reject_reason': order.get('reject_reason')}
+
+    return execute
+
+
+def paper_executor(path=None, config=None):
+    """Execution stage on the saved paper account: each order is written to disk before it is reported"""
+    settings = paper_settings(config)
+    path = path or settings['account_file']
+
+    def execute(request):
+        engine = load_engine(path, settings=settings)
+        execution = engine.execute(request)
+        save_engine(engine, path)
+        return dict(execution, account_file=path)
+
+    return execute
+
+
+def create_executor(name=None, config=None):
+    """Execution stage by name ('paper' or 'broker'), defaulting to phase_2_settings.executor"""
+    name = name or approval_settings(config)['executor']
+    if name == 'paper':
+        return paper_executor(config=config)
+    if name == 'broker':
+        return broker_executor(config)
+    raise ValueError(f"Unknown executor '{name}' (expected one of {', '.join(EXECUTORS)})")
+
+
+class ApprovalService:
+    """Proposes orders, collects decisions and releases approved orders to execute(order).
+
+    execute defaults to the configured executor (see create_executor).
+    """
+
+    def __init__(self, queue, notify, execute=None, settings=None):
+        self.queue = queue
+        self.notify = notify
+        self.settings = settings or approval_settings()
+        self.execute = execute or create_executor(self.settings['executor'])
+
+    def propose(self, order):
+        """Queue the order for approval and email it, or execute it directly when approval is off"""
+        if not self.settings['require_human_approval']:
+            return {'status': 'released', 'execution': self.execute(order)}
+        request = self.queue.submit(approval_request(order, self.settings['approval_timeout_minutes']))
+        try:
+            self.notify('trade_approval_request', request)
+        except Exception as e:
+            print(f"⚠️  Approval email for {request['request_id']} failed: {e}")
+        return request
+
+    def approve(self, request_id, decided_by=None, note=None):
+        return self.queue.decide(request_id, 'approved', decided_by, note)
+
+    def reject(self, request_id, decided_by=None, note=None):
+        return self.queue.decide(request_id, 'rejected', decided_by, note)
+
+    def process(self):
+        """Expire overdue requests and hand approved ones to the execution stage"""
+        expired = self.queue.expire_due()
+        released = []
+        for request in self.queue.claim_approved():
+            try:
+                execution = self.execute(request)
+            except Exception as e:
+                execution = {'status': 'failed', 'error': str(e)}
+            self.queue.record_execution(request, execution)
+            released.append(dict(request, execution=execution))
+        return {'expired': expired, 'released': released}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Review and process trade approval requests")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    propose = subparsers.add_parser("propose", help="Queue an order for approval and email it")
+    propose.add_argument("symbol")
+    propose.add_argument("side", choices=["BUY", "SELL"], type=str.upper)
+    propose.add_argument("quantity", type=int)
+    propose.add_argument("--entry", type=float, help="Entry (limit) price")
+    propose.add_argument("--stop", type=float, help="Protective stop price")
+    propose.add_argument("--take-profit", type=float)
+    propose.add_argument("--confidence", type=float)
+    propose.add_argument("--reason", help="Why the trade is proposed")
+    subparsers.add_parser("list", help="Pending requests")
+    for command in ("approve", "reject"):
+        decision = subparsers.add_parser(command)
+        decision.add_argument("request_id")
+        decision.add_argument("--reason", help="Note stored with the decision")
+    process = subparsers.add_parser("process", help="Expire overdue requests and release approved ones")
+    process.add_argument("--executor", choices=EXECUTORS, help="Execution stage (default: phase_2_settings.executor)")
+    args = parser.parse_args()
+
+    queue = create_approval_queue(allow_local=False)
+    if queue is None:
+        parser.error("no approval table configured (APPROVAL_QUEUE_TABLE or phase_2_settings.approval_table)")
+    service = ApprovalService(queue, notify=lambda_notifier(), execute=create_executor(getattr(args, 'executor', None)))
+    user = os.environ.get('USER', 'cli')
+
+    if args.command == "propose":
+        request = service.propose({
+            'symbol': args.symbol, 'side': args.side, 'quantity': args.quantity, 'entry_price': args.entry,
+            'stop_price': args.stop, 'take_profit': args.take_profit, 'confidence': args.confidence,
+            'reason': args.reason
+        })
+        if 'request_id' in request:
+            print(f"✓ {request['request_id']} pending until {format_time(request['expires_at'])}, approval email sent")
+        else:
+            print(f"✓ Approval not required, executed: {request['execution']}")
+    elif args.command == "list":
+        pending = sorted(service.queue.pending(), key=lambda r: r['expires_at'])
+        print(f"{len(pending)} pending request(s)")
+        for r in pending:
+            print(f"  {r['request_id']}  {r['side']:<4} {r['quantity']} {r['symbol']:<6} @ {r['entry_price']}  "
+                  f"expires {format_time(r['expires_at'])}")
+    elif args.command in ("approve", "reject"):
+        decide = service.approve if args.command == "approve" else service.reject
+        request = decide(args.request_id, decided_by=user, note=args.reason)
+        if request is None:
+            print(f"✗ {args.request_id} is not pending (already decided, expired or unknown)")
+        else:
+            print(f"✓ {args.request_id} {request['status']}")
+    else:
+        result = service.process()
+        print(f"{len(result['expired'])} expired, {len(result['released'])} released")
+        for request in result['released']:
+            print(f"  {request['request_id']}  {request['side']} {request['quantity']} {request['symbol']}: "
+                  f"{request['execution']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Broker Adapter
+Phase 2 execution layer between the agent and a broker's REST API.
+
+  BrokerClient     asyncio client over one pooled requests.Session; every call
+                   passes a token-bucket rate limiter and runs on a bounded
+                   thread pool, so connections are reused and the broker's
+                   request limit is never exceeded
+  OrderManager     tracks every order in memory by client_order_id, coalesces
+                   cancels and replaces issued within batch_window_ms into one
+                   batch call each, and reconciles local state with the broker
+  MockBroker       local ThreadingHTTPServer speaking the same API, backed by
+                   the paper-trading engine, for offline testing
+
+Broker API (Alpaca-style):
+  POST /v2/orders                 {symbol, side, qty, type, limit_price, stop_price, take_profit, client_order_id}
+  GET  /v2/orders?status=open|all
+  GET  /v2/orders/<order_id>
+  POST /v2/orders/batch_cancel    {order_ids: [...]}
+  POST /v2/orders/batch_replace   {orders: [{order_id, qty, limit_price, stop_price}]}
+  GET  /v2/account
+  POST /mock/bar                  {symbol, bar}  (mock only: advance the simulation)
+
+Usage:
+  python3 broker_adapter.py --serve --port 8765     # run the mock broker
+  python3 broker_adapter.py --demo                  # offline round trip against the mock broker
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from trading_config import get_setting
+
+TERMINAL_STATES = ('filled', 'cancelled', 'rejected')
+
+
+class BrokerError(Exception):
+    """Raised when the broker rejects a request or cannot be reached"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def broker_settings(config=None):
+    """phase_2_settings.broker with defaults; the API key comes from BROKER_API_KEY"""
+    settings = get_setting('phase_2_settings', 'broker', default={}, config=config) or {}
+    return {
+        'base_url': os.environ.get('BROKER_BASE_URL') or settings.get('base_url', ''),
+        'rate_limit_per_second': settings.get('rate_limit_per_second', 5),
+        'pool_size': settings.get('pool_size', 8),
+        'batch_window_ms': settings.get('batch_window_ms', 50),
+        'timeout_seconds': settings.get('timeout_seconds', 10)
+    }
+
+
+class RateLimiter:
+    """Token bucket for asyncio: rate tokens per second, up to burst at once"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self.waited_seconds = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+                self.waited_seconds += delay
+                await asyncio.sleep(delay)
+
+
+class BrokerClient:
+    """Rate-limited async calls over a pooled requests.Session"""
+
+    def __init__(self, base_url, api_key=None, rate_limit_per_second=5, pool_size=8, timeout_seconds=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout_seconds = timeout_seconds
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+        self.limiter = RateLimiter(rate_limit_per_second)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+        self.requests_sent = 0
+
+    async def request(self, method, path, body=None, params=None):
+        await self.limiter.acquire()
+        call = partial(self.session.request, method, self.base_url + path, json=body, params=params,
+                       timeout=self.timeout_seconds)
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(self.executor, call)
+        except requests.RequestException as e:
+            raise BrokerError(str(e))
+        self.requests_sent += 1
+        try:
+            data = response.json() if response.content else {}
+        except ValueError:
+            # e.g. a proxy's HTML error page
+            raise BrokerError(f"HTTP {response.status_code}: non-JSON response", response.status_code)
+        if response.status_code >= 400:
+            raise BrokerError(data.get('message', f"HTTP {response.status_code}"), response.status_code)
+        return data
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    async def submit_order(self, order):
+        return await self.request('POST', '/v2/orders', order)
+
+    async def list_orders(self, status='open'):
+        return await self.request('GET', '/v2/orders', params={'status': status})
+
+    async def get_order(self, order_id):
+        return await self.request('GET', f"/v2/orders/{order_id}")
+
+    async def cancel_orders(self, order_ids):
+        return await self.request('POST', '/v2/orders/batch_cancel', {'order_ids': order_ids})
+
+    async def replace_orders(self, replacements):
+        return await self.request('POST', '/v2/orders/batch_replace', {'orders': replacements})
+
+    async def account(self):
+        return await self.request('GET', '/v2/account')
+
+
+def create_broker_client(config=None):
+    settings = broker_settings(config)
+    if not settings['base_url']:
+        raise BrokerError('No broker configured (BROKER_BASE_URL or phase_2_settings.broker.base_url)')
+    return BrokerClient(
+        settings['base_url'],
+        api_key=os.environ.get('BROKER_API_KEY'),
+        rate_limit_per_second=settings['rate_limit_per_second'],
+        pool_size=settings['pool_size'],
+        timeout_seconds=settings['timeout_seconds']
+    )
+
+
+def create_order_manager(config=None):
+    """OrderManager over the configured broker, batching with phase_2_settings.broker.batch_window_ms"""
+    return OrderManager(create_broker_client(config), broker_settings(config)['batch_window_ms'])
+
+
+class OrderManager:
+    """In-memory order state keyed by client_order_id, with batched cancels/replaces and reconciliation"""
+
+    def __init__(self, client, batch_window_ms=50):
+        self.client = client
+        self.batch_window = batch_window_ms / 1000
+        self.orders = {}
+        self.batches_sent = {'cancel': 0, 'replace': 0}
+        self._pending = {'cancel': [], 'replace': []}
+        self._flush_tasks = {}
+
+    def _track(self, client_order_id, broker_order):
+        state = self.orders.setdefault(client_order_id, {'client_order_id': client_order_id, 'history': []})
+        state.update({key: broker_order.get(key) for key in
+                      ('order_id', 'symbol', 'side', 'quantity', 'order_type', 'limit_price', 'stop_price',
+                       'status', 'fill_price', 'reject_reason')})
+        state['history'].append(broker_order.get('status'))
+        return state
+
+    async def submit(self, symbol, side, quantity, order_type='market', limit_price=None, stop_price=None,
+                     take_profit=None):
+        client_order_id = uuid.uuid4().hex[:16]
+        self.orders[client_order_id] = {
+            'client_order_id': client_order_id, 'order_id': None, 'symbol': symbol.upper(), 'side': side,
+            'quantity': quantity, 'order_type': order_type, 'status': 'pending_new', 'history': ['pending_new']
+        }
+        try:
+            broker_order = await self.client.submit_order({
+                'symbol': symbol, 'side': side, 'qty': quantity, 'type': order_type,
+                'limit_price': limit_price, 'stop_price': stop_price, 'take_profit': take_profit,
+                'client_order_id': client_order_id
+            })
+        except BrokerError as e:
+            self.orders[client_order_id].update({'status': 'rejected', 'reject_reason': str(e)})
+            return self.orders[client_order_id]
+        return self._track(client_order_id, broker_order)
+
+    async def submit_many(self, orders):
+        """Submit order dicts concurrently (the client's rate limiter paces them)"""
+        return await asyncio.gather(*(self.submit(**order) for order in orders))
+
+    async def _enqueue(self, kind, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending[kind].append((item, future))
+        if kind not in self._flush_tasks:
+            self._flush_tasks[kind] = asyncio.ensure_future(self._flush(kind))
+        return await future
+
+    async def _flush(self, kind):
+        # Collect everything issued during the window into one broker call
+        await asyncio.sleep(self.batch_window)
+        batch, self._pending[kind] = self._pending[kind], []
+        del self._flush_tasks[kind]
+        try:
+            if kind == 'cancel':
+                response = await self.client.cancel_orders([item for item, _ in batch])
+            else:
+                response = await self.client.replace_orders([item for item, _ in batch])
+            self.batches_sent[kind] += 1
+            results = {result['order_id']: result for result in response.get('results', [])}
+        except Exception as e:
+            # Every waiter must be resolved, or its order stays pending forever
+            error = e if isinstance(e, BrokerError) else BrokerError(f"{kind} batch failed: {e}")
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        for item, future in batch:
+            order_id = item if kind == 'cancel' else item['order_id']
+            future.set_result(results.get(order_id, {'order_id': order_id, 'ok': False, 'error': 'no result'}))
+
+    async def cancel(self, client_order_id):
+        """Cancel an order; concurrent cancels go to the broker as one batch"""
+        state = self.orders[client_order_id]
+        if state['status'] in TERMINAL_STATES or not state['order_id']:
+            return state
+        status, state['status'] = state['status'], 'pending_cancel'
+        try:
+            result = await self._enqueue('cancel', state['order_id'])
+        except BrokerError:
+            state['status'] = status
+            raise
+        state['status'] = 'cancelled' if result.get('ok') else result.get('status', 'open')
+        state['history'].append(state['status'])
+        return state
+
+    async def replace(self, client_order_id, quantity=None, limit_price=None, stop_price=None):
+        """Modify an open order; concurrent replaces go to the broker as one batch"""
+        state = self.orders[client_order_id]
+        if state['status'] in TERMINAL_STATES or not state['order_id']:
+            return state
+        status, state['status'] = state['status'], 'pending_replace'
+        try:
+            result = await self._enqueue('replace', {
+                'order_id': state['order_id'], 'qty': quantity, 'limit_price': limit_price, 'stop_price': stop_price
+            })
+        except BrokerError:
+            state['status'] = status
+            raise
+        if result.get('ok'):
+            state['history'].append('replaced')
+            self._track(client_order_id, result['order'])
+        else:
+            state['status'] = 'open'
+            state['reject_reason'] = result.get('error')
+        return state
+
+    async def reconcile(self):
+        """Bring local state in line with the broker; returns what differed"""
+        broker_orders = await self.client.list_orders('all')
+        by_client_id = {order['client_order_id']: order for order in broker_orders if order.get('client_order_id')}
+        report = {'updated': [], 'missing_at_broker': [], 'untracked_at_broker': []}
+
+        for client_order_id, state in self.orders.items():
+            broker_order = by_client_id.get(client_order_id)
+            if broker_order is None:
+                if state['status'] not in TERMINAL_STATES:
+                    report['missing_at_broker'].append(client_order_id)
+                continue
+            if (broker_order['order_id'], broker_order['status']) != (state['order_id'], state['status']):
+                report['updated'].append((client_order_id, state['status'], broker_order['status']))
+                self._track(client_order_id, broker_order)
+
+        # Walk the broker list itself: orders without a client id (e.g. bracket legs) must not collapse into one
+        report['untracked_at_broker'] = [order['order_id'] for order in broker_orders
+                                         if order.get('client_order_id') not in self.orders
+                                         and order['status'] == 'open']
+        return report
+
+    def summary(self):
+        statuses = {}
+        for state in self.orders.values():
+            statuses[state['status']] = statuses.get(state['status'], 0) + 1
+        return {'orders': statuses, 'batches_sent': dict(self.batches_sent),
+                'requests_sent': self.client.requests_sent,
+                'rate_limit_wait_seconds': round(self.client.limiter.waited_seconds, 3)}
+
+
+def broker_view(order):
+    """Paper-engine order as returned by the mock broker"""
+    return {key: order.get(key) for key in
+            ('order_id', 'client_order_id', 'symbol', 'side', 'quantity', 'order_type', 'limit_price',
+             'stop_price', 'take_profit', 'status', 'fill_price', 'filled', 'reject_reason', 'replaces')}
+
+
+class MockBrokerHandler(BaseHTTPRequestHandler):
+    """Broker API over a PaperTradingEngine shared by all handler threads"""
+
+    engine = None
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with self.lock:
+            if url.path == '/v2/orders':
+                status = parse_qs(url.query).get('status', ['open'])[0]
+                orders = [broker_view(order) for order in self.engine.orders.values()
+                          if status == 'all' or order['status'] == status]
+                return self._send(200, orders)
+            if url.path.startswith('/v2/orders/'):
+                order = self.engine.orders.get(url.path.rsplit('/', 1)[1])
+                if order is None:
+                    return self._send(404, {'message': 'order not found'})
+                return self._send(200, broker_view(order))
+            if url.path == '/v2/account':
+                return self._send(200, self.engine.account())
+        self._send(404, {'message': f"unknown path {url.path}"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._body()
+        with self.lock:
+            if path == '/v2/orders':
+                order = self.engine.submit(body['symbol'], body['side'], body['qty'], body.get('type', 'market'),
+                                           limit_price=body.get('limit_price'), stop_price=body.get('stop_price'),
+                                           take_profit=body.get('take_profit'))
+                order['client_order_id'] = body.get('client_order_id')
+                if order['status'] == 'rejected':
+                    return self._send(422, {'message': order['reject_reason'], 'order': broker_view(order)})
+                return self._send(200, broker_view(order))
+            if path == '/v2/orders/batch_cancel':
+                results = [{'order_id': order_id, 'ok': self.engine.cancel(order_id),
+                            'status': self.engine.orders[order_id]['status'] if order_id in self.engine.orders else None}
+                           for order_id in body.get('order_ids', [])]
+                return self._send(200, {'results': results})
+            if path == '/v2/orders/batch_replace':
+                return self._send(200, {'results': [self._replace(item) for item in body.get('orders', [])]})
+            if path == '/mock/bar':
+                fills = self.engine.on_bar(body['symbol'], body['bar'])
+                return self._send(200, {'fills': [broker_view(order) for order in fills]})
+        self._send(404, {'message': f"unknown path {path}"})
+
+    def _replace(self, item):
+        old = self.engine.orders.get(item['order_id'])
+        new = self.engine.replace(item['order_id'], item.get('qty'), item.get('limit_price'), item.get('stop_price'))
+        if new is None:
+            return {'order_id': item['order_id'], 'ok': False, 'error': 'order is not open'}
+        if new['status'] == 'rejected':
+            return {'order_id': item['order_id'], 'ok': False, 'error': new['reject_reason']}
+        new['client_order_id'] = old.get('client_order_id')
+        return {'order_id': item['order_id'], 'ok': True, 'order': broker_view(new)}
+
+
+def start_mock_broker(engine=None, host='127.0.0.1', port=0):
+    """Serve the mock broker on a background thread; returns (server, base_url)"""
+    from paper_trading import PaperTradingEngine
+
+    handler = type('MockBroker', (MockBrokerHandler,), {'engine': engine or PaperTradingEngine(),
+                                                         'lock': threading.Lock()})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+async def demo(base_url, bars_by_symbol):
+    """Submit, batch-replace and batch-cancel orders, feed bars to the mock and reconcile"""
+    client = BrokerClient(base_url, rate_limit_per_second=50)
+    manager = OrderManager(client)
+    try:
+        orders = []
+        for symbol, bars in bars_by_symbol.items():
+            price = bars[0]['close']
+            quantity = max(int(900 // price), 1)
+            orders.append({'symbol': symbol, 'side': 'BUY', 'quantity': quantity, 'order_type': 'limit',
+                           'limit_price': round(price * 0.97, 2)})
+        placed = await manager.submit_many(orders)
+        open_ids = [state['client_order_id'] for state in placed if state['status'] == 'open']
+
+        # Half the orders are repriced, the rest cancelled; each group goes out as one batch
+        half = len(open_ids) // 2
+        await asyncio.gather(
+            *(manager.replace(cid, limit_price=manager.orders[cid]['limit_price'] * 1.02) for cid in open_ids[:half]),
+            *(manager.cancel(cid) for cid in open_ids[half:])
+        )
+
+        for symbol, bars in bars_by_symbol.items():
+            for bar in bars[1:]:
+                await client.request('POST', '/mock/bar', {'symbol': symbol, 'bar': bar})
+        report = await manager.reconcile()
+        return manager, report, await client.account()
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock broker server and offline broker adapter demo")
+    parser.add_argument("--serve", action="store_true", help="Run the mock broker until interrupted")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--demo", action="store_true", help="Round trip against an in-process mock broker")
+    parser.add_argument("--symbols", default="AAPL,MSFT,NVDA,TSLA")
+    args = parser.parse_args()
+
+    if args.serve:
+        server, base_url = start_mock_broker(port=args.port)
+        print(f"Mock broker listening on {base_url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    if not args.demo:
+        parser.error("choose --serve or --demo")
+
+    from local_stubs import generate_daily_series
+    from market_data_providers import parse_alpha_vantage_series
+    from paper_trading import PaperTradingEngine, paper_settings
+
+    symbols = args.symbols.split(',')
+    bars_by_symbol = {symbol: parse_alpha_vantage_series(generate_daily_series(symbol, days=30)['Time Series (Daily)'])
+                      for symbol in symbols}
+    # Demo limits sized for the fake prices rather than the Phase 2 defaults
+    engine = PaperTradingEngine(settings=dict(paper_settings(), max_capital_per_trade=1000, max_daily_trades=len(symbols)))
+    server, base_url = start_mock_broker(engine)
+    try:
+        manager, report, account = asyncio.run(demo(base_url, bars_by_symbol))
+    finally:
+        server.shutdown()
+
+    for state in manager.orders.values():
+        print(f"  {state['client_order_id']}  {state['side']:<4} {state['quantity']:>3} {state['symbol']:<6} "
+              f"{state['status']:<10} {' → '.join(state['history'])}")
+    print(f"Reconciliation: {report}")
+    print(f"Adapter: {manager.summary()}")
+    print(f"Account: {json.dumps(account)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Circuit breaker
+Stops calling a failing dependency (gateway, market data provider) for a cool-down period.
+
+  closed     calls go through; consecutive failures are counted
+  open       after failure_threshold failures, calls fail immediately with
+             CircuitOpen until cooldown_seconds have passed
+  half_open  one trial call is let through; success closes the circuit,
+             failure opens it for another cool-down
+
+Callers fall back to last-known-good data instead of waiting on timeouts.
+"""
+
+import threading
+import time
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, cooldown_seconds=60, is_failure=None, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.is_failure = is_failure or (lambda error: True)
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.rejected = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.cooldown_seconds:
+            return 'half_open'
+        return 'open'
+
+    def retry_in(self):
+        """Seconds until the next trial call is allowed (0 when closed)"""
+        if self.opened_at is None:
+            return 0.0
+        return max(self.cooldown_seconds - (self.clock() - self.opened_at), 0.0)
+
+    def allow(self):
+        """True if a call may go ahead; in half_open only one trial at a time"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_running:
+                    self.times_opened += 1
+                    print(f"Circuit '{self.name}' opened after {self.failures} failure(s)")
+                self.opened_at = self.clock()
+            self.trial_running = False
+
+    def call(self, function, *args, **kwargs):
+        """Call through the breaker; errors rejected by is_failure count as successes"""
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} unavailable, retrying in {self.retry_in():.0f}s")
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_in_seconds': round(self.retry_in(), 1)
+            }
@@ -0,0 +1,119 @@
+"""
+Concurrency control
+Per-session serialization and a global concurrency limit for the agent entrypoint.
+
+Requests for the same session run one at a time, so memory events for a
+conversation are written in order. Across sessions at most max_concurrent
+requests run at once; further requests wait in a bounded queue and are
+rejected once the queue is full or they have waited queue_timeout_seconds,
+instead of piling onto Bedrock and getting throttled.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class GateBusy(Exception):
+    """Raised when a request cannot get a slot (queue full or wait timed out)"""
+
+
+class RequestGate:
+    def __init__(self, max_concurrent=4, max_queue=16, queue_timeout_seconds=30, clock=time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.clock = clock
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self.waiting = 0
+        self.running = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _session_lock(self, session_id):
+        """Lock for a session plus a reference count so idle sessions are dropped"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = self._sessions[session_id] = [threading.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _release_session(self, session_id):
+        entry = self._sessions[session_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._sessions[session_id]
+
+    @contextmanager
+    def slot(self, session_id):
+        """Hold the session lock and one global slot for the duration of a request"""
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise GateBusy(f"{self.waiting} requests already queued")
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            session_lock = self._session_lock(session_id)
+
+        start = self.clock()
+        deadline = start + self.queue_timeout_seconds
+        has_session = has_slot = False
+        try:
+            # Session first, so a request never holds a global slot while queued behind its own session
+            has_session = session_lock.acquire(timeout=max(deadline - self.clock(), 0))
+            if has_session:
+                has_slot = self._slots.acquire(timeout=max(deadline - self.clock(), 0))
+        finally:
+            waited = self.clock() - start
+            with self._lock:
+                self.waiting -= 1
+                if has_slot:
+                    self.running += 1
+                    self.total_wait_seconds += waited
+                    self.max_wait_seconds = max(self.max_wait_seconds, waited)
+                else:
+                    self.rejected += 1
+                    self._release_session(session_id)
+
+        if not has_slot:
+            if has_session:
+                session_lock.release()
+            raise GateBusy(f"no slot after waiting {waited:.1f}s")
+
+        try:
+            yield waited
+        finally:
+            self._slots.release()
+            session_lock.release()
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self._release_session(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self.running,
+                'queue_depth': self.waiting,
+                'max_queue_depth': self.max_waiting,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_wait_seconds': round(self.total_wait_seconds / self.completed, 3) if self.completed else 0.0,
+                'max_wait_seconds': round(self.max_wait_seconds, 3),
+                'active_sessions': len(self._sessions)
+            }
+
+
+def create_request_gate():
+    """Gate sized by AGENT_MAX_CONCURRENCY / AGENT_MAX_QUEUE / AGENT_QUEUE_TIMEOUT_SECONDS"""
+    return RequestGate(
+        max_concurrent=int(os.environ.get('AGENT_MAX_CONCURRENCY', 4)),
+        max_queue=int(os.environ.get('AGENT_MAX_QUEUE', 16)),
+        queue_timeout_seconds=float(os.environ.get('AGENT_QUEUE_TIMEOUT_SECONDS', 30))
+    )
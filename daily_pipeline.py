@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Daily analysis pipeline
+Map the watchlist over the MarketData Lambda, rank the results, send one email.
+
+  map     analyze every watchlist symbol in parallel (bounded concurrency)
+  filter  keep BUY/SELL results at or above min_confidence_score
+  review  sector limits (portfolio_analytics)
+  reduce  rank the approved candidates by confidence, then flag correlated
+          pairs among the picks that made the cut
+  narrate one model call that writes the summary paragraph (optional)
+  notify  a single daily_summary call to the notification Lambda
+  log     the emailed picks go to the recommendation log (source 'daily_pipeline')
+
+The filter, review and ranking are deterministic; the LLM never decides
+what is recommended, and it only sees picks that will be in the email. On
+days with no candidates the model is not called at all and the "No
+high-confidence trading opportunities" email goes out as is.
+
+Deployed as the TradingAgent-DailyPipeline Lambda (lambda_handler), which the
+daily EventBridge schedule invokes.
+
+Usage:
+  python3 daily_pipeline.py                      # deployed Lambdas + Bedrock narrative
+  python3 daily_pipeline.py --stub               # fully offline (fake data, SES and narrative)
+  python3 daily_pipeline.py --no-email --output run.json
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from portfolio_analytics import flag_correlations, review_recommendations
+from recommendation_log import create_recommendation_log, log_record
+from trading_config import MODULE_DIR, get_setting
+
+MODEL_ID = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
+REGION = "us-west-2"
+
+
+def load_watchlist(path=os.path.join(MODULE_DIR, 'watchlist.json')):
+    with open(path) as f:
+        return [item['symbol'] for item in json.load(f)['watchlist']]
+
+
+def parse_lambda_response(response):
+    """Body of a Lambda-style response, raising on error status codes"""
+    body = response.get('body', '{}')
+    body = json.loads(body) if isinstance(body, str) else body
+    if response.get('statusCode', 200) >= 400:
+        raise RuntimeError(body.get('error', f"HTTP {response.get('statusCode')}"))
+    return body
+
+
+class LambdaExecutor:
+    """Invokes the deployed MarketData and EmailNotification Lambdas"""
+
+    def __init__(self, region=REGION, config_path='lambda_config.json'):
+        import boto3
+
+        self.lambda_client = boto3.client('lambda', region_name=region)
+        self.functions = {
+            'market_data': os.environ.get('MARKET_DATA_FUNCTION', 'TradingAgent-MarketData'),
+            'notification': os.environ.get('NOTIFICATION_FUNCTION', 'TradingAgent-EmailNotification')
+        }
+        try:
+            with open(config_path) as f:
+                lambda_config = json.load(f)
+            self.functions = {key: lambda_config[key]['function_name'] for key in self.functions}
+        except FileNotFoundError:
+            pass
+
+    def _invoke(self, key, event):
+        response = self.lambda_client.invoke(FunctionName=self.functions[key], Payload=json.dumps(event).encode())
+        payload = json.loads(response['Payload'].read())
+        if response.get('FunctionError'):
+            raise RuntimeError(payload.get('errorMessage', 'Lambda function error'))
+        return parse_lambda_response(payload)
+
+    def analyze(self, symbol):
+        return self._invoke('market_data', {'symbol': symbol, 'include_closes': True})
+
+    def notify(self, alert_type, data):
+        return self._invoke('notification', {'alert_type': alert_type, 'data': data})
+
+
+class StubExecutor:
+    """Runs both Lambda handlers in-process against fake Alpha Vantage and SES"""
+
+    def __init__(self):
+        from local_stubs import install_lambda_stubs
+
+        self.market_data, self.notification = install_lambda_stubs()
+
+    def analyze(self, symbol):
+        return parse_lambda_response(self.market_data.lambda_handler({'symbol': symbol, 'include_closes': True}, None))
+
+    def notify(self, alert_type, data):
+        return parse_lambda_response(self.notification.lambda_handler({'alert_type': alert_type, 'data': data}, None))
+
+
+class BedrockNarrator:
+    """One Converse call that turns the ranked picks into a short summary paragraph"""
+
+    def __init__(self, model_id=MODEL_ID, region=REGION):
+        import boto3
+
+        self.model_id = model_id
+        self.client = boto3.client('bedrock-runtime', region_name=region)
+
+    def __call__(self, recommendations):
+        picks = [{key: rec.get(key) for key in ('symbol', 'recommendation', 'confidence', 'price', 'signals')}
+                 for rec in recommendations]
+        prompt = (
+            "Write a 3-5 sentence summary for a swing trader's daily email. The picks below were "
+            "selected by deterministic rules; explain them, do not add or remove picks.\n\n"
+            + json.dumps(picks, indent=2)
+        )
+        response = self.client.converse(
+            modelId=self.model_id,
+            messages=[{'role': 'user', 'content': [{'text': prompt}]}],
+            inferenceConfig={'maxTokens': 400, 'temperature': 0.3}
+        )
+        return response['output']['message']['content'][0]['text']
+
+
+def template_narrator(recommendations):
+    """Offline stand-in for BedrockNarrator"""
+    picks = ', '.join(f"{rec['symbol']} ({rec['recommendation']}, {rec['confidence']*100:.0f}%)" for rec in recommendations)
+    return f"Today's rule-based screen selected {len(recommendations)} idea(s): {picks}."
+
+
+def analyze_watchlist(executor, symbols, max_concurrency=4):
+    """Map step: returns (results by symbol, errors by symbol)"""
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = {pool.submit(executor.analyze, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                errors[symbol] = str(e)
+    return results, errors
+
+
+def prefilter_candidates(results, min_confidence=None):
+    """Filter step: fresh BUY/SELL results whose confidence reaches min_confidence_score"""
+    if min_confidence is None:
+        min_confidence = get_setting('phase_1_settings', 'min_confidence_score', default=0.7)
+    return [
+        result for result in results.values()
+        if result.get('recommendation') in ('BUY', 'SELL') and result.get('confidence', 0) >= min_confidence
+        and not result.get('stale')
+    ]
+
+
+def rank_recommendations(candidates, limit=None):
+    """Reduce step: highest confidence first, capped at limit"""
+    ranked = sorted(candidates, key=lambda result: (-result.get('confidence', 0), result['symbol']))
+    return ranked[:limit] if limit else ranked
+
+
+def run_daily_pipeline(executor, symbols, max_concurrency=4, narrator=None, send_email=True, limit=None,
+                       min_confidence=None, recommendation_log=None):
+    """Run map -> filter -> review -> reduce -> narrate -> notify -> log and return what happened with per-stage timings"""
+    if limit is None:
+        limit = get_setting('phase_1_settings', 'max_suggestions_per_day', default=3)
+    timings = {}
+
+    start = time.monotonic()
+    results, errors = analyze_watchlist(executor, symbols, max_concurrency)
+    timings['analyze'] = round(time.monotonic() - start, 3)
+
+    start = time.monotonic()
+    # Close series from the map step feed the correlation check and stay out of the email payload
+    closes = {symbol: result.pop('closes') for symbol, result in results.items() if result.get('closes')}
+    candidates = prefilter_candidates(results, min_confidence)
+    # Held-back picks free their slot before the cap, so the day still gets up to limit suggestions
+    review = review_recommendations(candidates)
+    ranked = rank_recommendations(review['recommendations'], limit)
+    # Only flag pairs that are both in the email, not ones the cap dropped
+    correlated = flag_correlations(ranked, closes)
+    timings['rank'] = round(time.monotonic() - start, 3)
+
+    # Nothing passed the filter: skip the model and send the empty summary
+    narrative = None
+    if narrator and ranked:
+        start = time.monotonic()
+        try:
+            narrative = narrator(ranked)
+        except Exception as e:
+            print(f"⚠️  Narrative failed, sending without it: {e}")
+        timings['narrate'] = round(time.monotonic() - start, 3)
+
+    notification = None
+    if send_email:
+        start = time.monotonic()
+        notification = executor.notify('daily_summary', {
+            'recommendations': ranked,
+            'held_back': review['held_back'],
+            'narrative': narrative
+        })
+        timings['notify'] = round(time.monotonic() - start, 3)
+
+    if recommendation_log:
+        for rec in ranked:
+            try:
+                recommendation_log.append(log_record(rec, source='daily_pipeline'))
+            except Exception as e:
+                print(f"⚠️  Failed to log {rec['symbol']}: {e}")
+
+    return {
+        'analyzed': len(results),
+        'candidates': len(candidates),
+        'correlated': correlated,
+        'model_calls': 1 if 'narrate' in timings else 0,
+        'errors': errors,
+        'recommendations': ranked,
+        'held_back': review['held_back'],
+        'narrative': narrative,
+        'notification': notification,
+        'timings': timings
+    }
+
+
+def lambda_handler(event, context):
+    """Scheduled entrypoint: the full pipeline against the deployed Lambdas.
+
+    Optional event keys: symbols, min_confidence, narrative (false skips the
+    model call) and send_email.
+    """
+    event = event or {}
+    narrator = BedrockNarrator() if event.get('narrative', True) else None
+    result = run_daily_pipeline(
+        LambdaExecutor(),
+        event.get('symbols') or load_watchlist(),
+        max_concurrency=int(os.environ.get('PIPELINE_MAX_CONCURRENCY', 4)),
+        narrator=narrator,
+        send_email=event.get('send_email', True),
+        min_confidence=event.get('min_confidence'),
+        recommendation_log=create_recommendation_log(allow_local=False)
+    )
+    print(f"{result['candidates']} of {result['analyzed']} symbol(s) passed the pre-filter; "
+          f"{result['model_calls']} model call(s); timings {result['timings']}")
+    return {'statusCode': 200, 'body': json.dumps(result, default=str)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the daily watchlist analysis and send the summary email")
+    parser.add_argument("--stub", action="store_true", help="Offline: fake market data, SES and narrative")
+    parser.add_argument("--symbols", help="Comma-separated symbols (default: watchlist.json)")
+    parser.add_argument("--max-concurrency", type=int, default=4,
+                        help="Parallel MarketData calls (keep low on the Alpha Vantage free tier)")
+    parser.add_argument("--min-confidence", type=float,
+                        help="Candidate threshold (default: phase_1_settings.min_confidence_score)")
+    parser.add_argument("--no-narrative", action="store_true", help="Skip the model-written summary")
+    parser.add_argument("--no-email", action="store_true", help="Do not send the daily_summary email")
+    parser.add_argument("--output", help="Write the run result as JSON")
+    parser.add_argument("--no-log", action="store_true", help="Do not add the picks to the recommendation log")
+    args = parser.parse_args()
+
+    symbols = args.symbols.split(',') if args.symbols else load_watchlist()
+    # Fake market data would skew the hit rates, so stub runs are never logged
+    recommendation_log = None if args.no_log or args.stub else create_recommendation_log()
+    if args.stub:
+        executor = StubExecutor()
+        narrator = None if args.no_narrative else template_narrator
+    else:
+        executor = LambdaExecutor()
+        narrator = None if args.no_narrative else BedrockNarrator()
+
+    print(f"Analyzing {len(symbols)} symbol(s) with up to {args.max_concurrency} in parallel...")
+    result = run_daily_pipeline(executor, symbols, args.max_concurrency, narrator, send_email=not args.no_email,
+                                min_confidence=args.min_confidence, recommendation_log=recommendation_log)
+    print(f"{result['candidates']} of {result['analyzed']} symbol(s) passed the pre-filter; "
+          f"{result['model_calls']} model call(s)")
+
+    for rec in result['recommendations']:
+        print(f"  {rec['symbol']:<6} {rec['recommendation']:<4} {rec['confidence']*100:.0f}%  ${rec['price']:.2f}")
+    for rec in result['held_back']:
+        print(f"  held back {rec['symbol']}: {rec['held_back_reason']}")
+    for symbol, error in result['errors'].items():
+        print(f"  ⚠️  {symbol}: {error}")
+    if result['narrative']:
+        print(f"\n{result['narrative']}")
+    print(f"\nTimings: {result['timings']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"✓ Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
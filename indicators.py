@@ -0,0 +1,498 @@
+"""
+Indicator engine
+Streaming technical indicators over fixed-size ring buffers.
+
+Each indicator is updated one bar at a time in O(1) time and constant memory,
+so the same code computes a full daily history in a single pass and keeps
+intraday indicators current as new bars arrive. Indicators are looked up in a
+registry, so new ones plug into IndicatorSet with register_indicator().
+"""
+
+import copy
+from collections import deque
+
+DEFAULT_PARAMETERS = {
+    'rsi_period': 14,
+    'rsi_overbought': 70,
+    'rsi_oversold': 30,
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'ema_short': 20,
+    'ema_long': 50,
+    'bollinger_period': 20,
+    'bollinger_std': 2,
+    'atr_period': 14,
+    'adx_period': 14,
+    'stochastic_k': 14,
+    'stochastic_d': 3,
+    'stochastic_overbought': 80,
+    'stochastic_oversold': 20,
+    'vwap_period': 20
+}
+
+
+def indicator_parameters(config=None):
+    """Indicator parameters from trading_parameters.technical_indicators, with defaults"""
+    from trading_config import get_setting
+
+    configured = get_setting('trading_parameters', 'technical_indicators', default={}, config=config) or {}
+    return {key: configured.get(key, value) for key, value in DEFAULT_PARAMETERS.items()}
+
+
+class RollingWindow:
+    """Fixed-capacity ring buffer keeping a running sum and sum of squares"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            evicted = self.values[0]
+            self.total -= evicted
+            self.total_squares -= evicted * evicted
+        self.values.append(value)
+        self.total += value
+        self.total_squares += value * value
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    def mean(self):
+        return self.total / len(self.values) if self.values else None
+
+    def std(self):
+        """Population standard deviation of the window"""
+        if not self.values:
+            return None
+        mean = self.mean()
+        return max(self.total_squares / len(self.values) - mean * mean, 0.0) ** 0.5
+
+
+class EMA:
+    """Exponential moving average seeded with the SMA of the first period"""
+
+    def __init__(self, period):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.value = None
+        self._seed = []
+
+    def update(self, price):
+        if self.value is None:
+            self._seed.append(price)
+            if len(self._seed) == self.period:
+                self.value = sum(self._seed) / self.period
+                self._seed = None
+        else:
+            self.value = (price - self.value) * self.multiplier + self.value
+        return self.value
+
+
+class RSI:
+    """Relative Strength Index with Wilder smoothing"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self._gains = 0.0
+        self._losses = 0.0
+        self._count = 0
+
+    def update(self, price):
+        if self.previous is None:
+            self.previous = price
+            return None
+
+        delta = price - self.previous
+        self.previous = price
+        gain = max(delta, 0.0)
+        loss = max(-delta, 0.0)
+
+        if self.avg_gain is None:
+            self._gains += gain
+            self._losses += loss
+            self._count += 1
+            if self._count == self.period:
+                self.avg_gain = self._gains / self.period
+                self.avg_loss = self._losses / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return self.value
+
+    @property
+    def value(self):
+        if self.avg_gain is None:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+
+
+class MACD:
+    """MACD line, signal line (EMA of the MACD line) and histogram"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.line = None
+
+    def update(self, price):
+        fast = self.fast.update(price)
+        slow = self.slow.update(price)
+        if fast is not None and slow is not None:
+            self.line = fast - slow
+            self.signal.update(self.line)
+        return self.line
+
+
+class BollingerBands:
+    """Upper, middle and lower bands over a rolling window"""
+
+    def __init__(self, period=20, num_std=2):
+        self.window = RollingWindow(period)
+        self.num_std = num_std
+
+    def update(self, price):
+        self.window.push(price)
+
+    def bands(self):
+        if not self.window.full:
+            return None, None, None
+        middle = self.window.mean()
+        width = self.num_std * self.window.std()
+        return middle + width, middle, middle - width
+
+
+class WilderAverage:
+    """Wilder smoothing seeded with the simple average of the first period values"""
+
+    def __init__(self, period):
+        self.period = period
+        self.value = None
+        self._total = 0.0
+        self._count = 0
+
+    def update(self, value):
+        if self.value is None:
+            self._total += value
+            self._count += 1
+            if self._count == self.period:
+                self.value = self._total / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + value) / self.period
+        return self.value
+
+
+class RollingExtreme:
+    """Rolling max (or min) over a window using a monotonic deque, amortized O(1)"""
+
+    def __init__(self, size, highest=True):
+        self.size = size
+        self.highest = highest
+        self.entries = deque()
+        self.count = 0
+
+    def push(self, value):
+        while self.entries and (self.entries[-1][1] <= value if self.highest else self.entries[-1][1] >= value):
+            self.entries.pop()
+        self.entries.append((self.count, value))
+        if self.entries[0][0] <= self.count - self.size:
+            self.entries.popleft()
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.size
+
+    @property
+    def value(self):
+        return self.entries[0][1] if self.entries else None
+
+
+def true_range(bar, previous_close):
+    if previous_close is None:
+        return bar['high'] - bar['low']
+    return max(bar['high'] - bar['low'], abs(bar['high'] - previous_close), abs(bar['low'] - previous_close))
+
+
+class ATR:
+    """Average True Range (Wilder)"""
+
+    def __init__(self, period=14):
+        self.average = WilderAverage(period)
+        self.previous_close = None
+
+    def update(self, bar):
+        self.average.update(true_range(bar, self.previous_close))
+        self.previous_close = bar['close']
+
+    @property
+    def value(self):
+        return self.average.value
+
+
+class ADX:
+    """Average Directional Index with +DI/-DI (Wilder)"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous = None
+        self.tr = WilderAverage(period)
+        self.plus_dm = WilderAverage(period)
+        self.minus_dm = WilderAverage(period)
+        self.adx = WilderAverage(period)
+        self.plus_di = None
+        self.minus_di = None
+
+    def update(self, bar):
+        previous = self.previous
+        self.previous = bar
+        if previous is None:
+            return
+
+        up_move = bar['high'] - previous['high']
+        down_move = previous['low'] - bar['low']
+        tr = self.tr.update(true_range(bar, previous['close']))
+        plus = self.plus_dm.update(up_move if up_move > down_move and up_move > 0 else 0.0)
+        minus = self.minus_dm.update(down_move if down_move > up_move and down_move > 0 else 0.0)
+        if tr is None:
+            return
+
+        # Ratios of Wilder averages equal the ratios of Wilder sums used in the textbook form
+        self.plus_di = 100 * plus / tr if tr else 0.0
+        self.minus_di = 100 * minus / tr if tr else 0.0
+        di_total = self.plus_di + self.minus_di
+        self.adx.update(100 * abs(self.plus_di - self.minus_di) / di_total if di_total else 0.0)
+
+    @property
+    def value(self):
+        return self.adx.value
+
+
+class Stochastic:
+    """Stochastic oscillator: %K over the high/low range and %D as its SMA"""
+
+    def __init__(self, k_period=14, d_period=3):
+        self.highs = RollingExtreme(k_period, highest=True)
+        self.lows = RollingExtreme(k_period, highest=False)
+        self.d_window = RollingWindow(d_period)
+        self.k = None
+
+    def update(self, bar):
+        self.highs.push(bar['high'])
+        self.lows.push(bar['low'])
+        if not self.highs.full:
+            return
+        price_range = self.highs.value - self.lows.value
+        self.k = 100 * (bar['close'] - self.lows.value) / price_range if price_range else 50.0
+        self.d_window.push(self.k)
+
+    @property
+    def d(self):
+        return self.d_window.mean() if self.d_window.full else None
+
+
+class OBV:
+    """On-Balance Volume"""
+
+    def __init__(self):
+        self.value = None
+        self.previous_close = None
+
+    def update(self, bar):
+        if self.previous_close is None:
+            self.value = 0.0
+        elif bar['close'] > self.previous_close:
+            self.value += bar['volume']
+        elif bar['close'] < self.previous_close:
+            self.value -= bar['volume']
+        self.previous_close = bar['close']
+
+
+class VWAP:
+    """Volume-weighted average price.
+
+    Intraday bars ('YYYY-MM-DD HH:MM:SS') use a session VWAP that resets each
+    day; daily bars use a rolling window of the last period bars.
+    """
+
+    def __init__(self, period=20):
+        self.price_volume = RollingWindow(period)
+        self.volume = RollingWindow(period)
+        self.session = None
+        self.session_price_volume = 0.0
+        self.session_volume = 0.0
+        self.intraday = False
+
+    def update(self, bar):
+        typical = (bar['high'] + bar['low'] + bar['close']) / 3
+        volume = bar['volume']
+        self.intraday = len(bar['date']) > 10
+        if self.intraday:
+            session = bar['date'][:10]
+            if session != self.session:
+                self.session = session
+                self.session_price_volume = 0.0
+                self.session_volume = 0.0
+            self.session_price_volume += typical * volume
+            self.session_volume += volume
+        else:
+            self.price_volume.push(typical * volume)
+            self.volume.push(volume)
+
+    @property
+    def value(self):
+        if self.intraday:
+            return self.session_price_volume / self.session_volume if self.session_volume else None
+        if not self.volume.full or not self.volume.total:
+            return None
+        return self.price_volume.total / self.volume.total
+
+
+def _round(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+
+class Indicator:
+    """Gives an indicator object a uniform update(bar) / snapshot() interface"""
+
+    def __init__(self, state, update, snapshot):
+        self.state = state
+        self._update = update
+        self._snapshot = snapshot
+
+    def update(self, bar):
+        self._update(self.state, bar)
+
+    def snapshot(self):
+        return self._snapshot(self.state)
+
+
+# name -> factory(parameters) returning an Indicator; snapshot keys follow registration order
+INDICATORS = {}
+
+
+def register_indicator(name, factory):
+    """Add (or replace) an indicator computed by every IndicatorSet"""
+    INDICATORS[name] = factory
+    return factory
+
+
+def _bollinger_snapshot(bollinger):
+    upper, middle, lower = bollinger.bands()
+    return {'bollinger_bands': {'upper': _round(upper), 'middle': _round(middle), 'lower': _round(lower)}}
+
+
+def _macd_snapshot(macd):
+    line = macd.line
+    signal = macd.signal.value
+    histogram = line - signal if line is not None and signal is not None else None
+    return {'macd': {'line': _round(line), 'signal': _round(signal), 'histogram': _round(histogram)}}
+
+
+register_indicator('rsi', lambda p: Indicator(
+    RSI(p['rsi_period']),
+    lambda rsi, bar: rsi.update(bar['close']),
+    lambda rsi: {'rsi': _round(rsi.value)}
+))
+register_indicator('ema', lambda p: Indicator(
+    (EMA(p['ema_short']), EMA(p['ema_long'])),
+    lambda emas, bar: [ema.update(bar['close']) for ema in emas],
+    lambda emas: {f"ema_{ema.period}": _round(ema.value) for ema in emas}
+))
+register_indicator('macd', lambda p: Indicator(
+    MACD(p['macd_fast'], p['macd_slow'], p['macd_signal']),
+    lambda macd, bar: macd.update(bar['close']),
+    _macd_snapshot
+))
+register_indicator('bollinger_bands', lambda p: Indicator(
+    BollingerBands(p['bollinger_period'], p['bollinger_std']),
+    lambda bollinger, bar: bollinger.update(bar['close']),
+    _bollinger_snapshot
+))
+register_indicator('atr', lambda p: Indicator(
+    ATR(p['atr_period']),
+    ATR.update,
+    lambda atr: {'atr': _round(atr.value)}
+))
+register_indicator('adx', lambda p: Indicator(
+    ADX(p['adx_period']),
+    ADX.update,
+    lambda adx: {'adx': {'adx': _round(adx.value), 'plus_di': _round(adx.plus_di), 'minus_di': _round(adx.minus_di)}}
+))
+register_indicator('stochastic', lambda p: Indicator(
+    Stochastic(p['stochastic_k'], p['stochastic_d']),
+    Stochastic.update,
+    lambda stochastic: {'stochastic': {'k': _round(stochastic.k), 'd': _round(stochastic.d)}}
+))
+register_indicator('obv', lambda p: Indicator(
+    OBV(),
+    OBV.update,
+    lambda obv: {'obv': _round(obv.value, 0)}
+))
+register_indicator('vwap', lambda p: Indicator(
+    VWAP(p['vwap_period']),
+    VWAP.update,
+    lambda vwap: {'vwap': _round(vwap.value)}
+))
+
+
+class IndicatorSet:
+    """All indicators for one symbol/timeframe, updated bar by bar.
+
+    Bars older than or equal to the last one seen are ignored, so callers can
+    hand over an overlapping fetch and only the new bars are processed. A bar
+    that is still forming should go to preview() instead, and be applied once
+    it has closed.
+    """
+
+    def __init__(self, parameters=None, names=None):
+        self.parameters = dict(DEFAULT_PARAMETERS, **(parameters or {}))
+        self.indicators = [INDICATORS[name](self.parameters) for name in (names or INDICATORS)]
+        self.last_bar = None
+        self.bars_processed = 0
+
+    def update(self, bar):
+        if self.last_bar is not None and bar['date'] <= self.last_bar['date']:
+            return False
+        for indicator in self.indicators:
+            indicator.update(bar)
+        self.last_bar = bar
+        self.bars_processed += 1
+        return True
+
+    def update_many(self, bars):
+        """Apply bars in order; returns how many were new"""
+        return sum(1 for bar in bars if self.update(bar))
+
+    def preview(self, bar):
+        """Snapshot with bar applied to a copy of the state; the set itself is unchanged"""
+        if self.last_bar is not None and bar['date'] <= self.last_bar['date']:
+            return self.snapshot()
+        values = {}
+        for indicator in copy.deepcopy(self.indicators):
+            indicator.update(bar)
+            values.update(indicator.snapshot())
+        return values
+
+    def snapshot(self):
+        values = {}
+        for indicator in self.indicators:
+            values.update(indicator.snapshot())
+        return values
+
+
+def compute_indicators(bars, parameters=None, names=None):
+    """Single pass over chronological bars; returns the final indicator snapshot"""
+    indicator_set = IndicatorSet(parameters, names)
+    indicator_set.update_many(bars)
+    return indicator_set.snapshot()
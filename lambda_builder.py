@@ -0,0 +1,197 @@
+"""
+Lambda Package Builder
+Deterministic, content-hashed Lambda zips and a shared dependency layer.
+
+Packages are rebuilt only when their sources change, and deployed code is
+left alone when its CodeSha256 already matches the local build.
+"""
+
+import base64
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from io import BytesIO
+
+BUILD_DIR = '.build'
+LAYER_NAME = 'TradingAgent-Dependencies'
+LAYER_REQUIREMENTS_FILE = 'lambda_requirements.txt'
+LAMBDA_RUNTIME = 'python3.12'
+
+# Fixed zip metadata so identical inputs always produce identical bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE = 0o644 << 16
+
+
+def content_hash(paths, extra=''):
+    """SHA-256 over file names and contents (order independent)"""
+    digest = hashlib.sha256(extra.encode())
+    for path in sorted(paths):
+        digest.update(path.replace(os.sep, '/').encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def code_sha256(zip_bytes):
+    """The CodeSha256 value Lambda reports for a deployment package"""
+    return base64.b64encode(hashlib.sha256(zip_bytes).digest()).decode()
+
+
+def deterministic_zip(entries):
+    """Zip (archive_name, source_path) pairs with fixed timestamps and ordering"""
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for archive_name, source_path in sorted(entries):
+            info = zipfile.ZipInfo(archive_name, date_time=ZIP_DATE_TIME)
+            info.external_attr = ZIP_FILE_MODE
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(source_path, 'rb') as f:
+                zip_file.writestr(info, f.read())
+    return zip_buffer.getvalue()
+
+
+def _cached_build(name, digest, build, build_dir):
+    """Return the cached zip for this digest, building it on a miss"""
+    os.makedirs(build_dir, exist_ok=True)
+    cached_path = os.path.join(build_dir, f"{name}-{digest[:16]}.zip")
+    if os.path.exists(cached_path):
+        with open(cached_path, 'rb') as f:
+            return f.read(), False
+
+    zip_bytes = build()
+    for stale in os.listdir(build_dir):
+        if stale.startswith(f"{name}-") and stale.endswith('.zip'):
+            os.remove(os.path.join(build_dir, stale))
+    with open(cached_path, 'wb') as f:
+        f.write(zip_bytes)
+    return zip_bytes, True
+
+
+def build_function_package(name, sources, build_dir=BUILD_DIR):
+    """Build (or reuse) the code zip for a function; returns (zip_bytes, digest, rebuilt)"""
+    digest = content_hash(sources)
+    zip_bytes, rebuilt = _cached_build(
+        name, digest,
+        lambda: deterministic_zip([(os.path.basename(path), path) for path in sources]),
+        build_dir
+    )
+    return zip_bytes, digest, rebuilt
+
+
+def build_dependency_layer(requirements_file=LAYER_REQUIREMENTS_FILE, build_dir=BUILD_DIR):
+    """Build (or reuse) the shared dependency layer; returns (zip_bytes, digest, rebuilt)
+
+    The digest covers only the requirements file, so every package in it is
+    pinned and installed without dependency resolution.
+    """
+    digest = content_hash([requirements_file], extra=LAMBDA_RUNTIME)
+
+    def build():
+        with tempfile.TemporaryDirectory() as staging:
+            target = os.path.join(staging, 'python')
+            subprocess.run(
+                [sys.executable, '-m', 'pip', 'install', '--quiet',
+                 '--requirement', requirements_file,
+                 '--no-deps',
+                 '--target', target,
+                 '--platform', 'manylinux2014_x86_64',
+                 '--implementation', 'cp',
+                 '--python-version', LAMBDA_RUNTIME.replace('python', ''),
+                 '--only-binary=:all:',
+                 '--no-compile'],
+                check=True
+            )
+            shutil.rmtree(os.path.join(target, 'bin'), ignore_errors=True)
+
+            entries = []
+            for root, _, files in os.walk(target):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    entries.append((os.path.relpath(path, staging).replace(os.sep, '/'), path))
+            return deterministic_zip(entries)
+
+    zip_bytes, rebuilt = _cached_build('layer', digest, build, build_dir)
+    return zip_bytes, digest, rebuilt
+
+
+def ensure_layer(lambda_client, requirements_file=LAYER_REQUIREMENTS_FILE, build_dir=BUILD_DIR):
+    """Publish the dependency layer unless a version with the same digest exists.
+
+    Returns (layer_version_arn, published).
+    """
+    zip_bytes, digest, _ = build_dependency_layer(requirements_file, build_dir)
+    description = f"Trading Agent Lambda dependencies ({digest[:16]})"
+
+    paginator = lambda_client.get_paginator('list_layer_versions')
+    for page in paginator.paginate(LayerName=LAYER_NAME):
+        for version in page.get('LayerVersions', []):
+            if version.get('Description') == description:
+                return version['LayerVersionArn'], False
+
+    response = lambda_client.publish_layer_version(
+        LayerName=LAYER_NAME,
+        Description=description,
+        Content={'ZipFile': zip_bytes},
+        CompatibleRuntimes=[LAMBDA_RUNTIME]
+    )
+    return response['LayerVersionArn'], True
+
+
+def deploy_function(lambda_client, function_name, zip_bytes, role_arn, handler, description,
+                    layers=(), environment=None, timeout=30, create_function=None):
+    """Create the function, or update it only where code, layers, environment or timeout changed.
+
+    environment (a dict of variables) is left alone when None. create_function
+    lets callers wrap creation (e.g. to retry while a new role propagates).
+    Returns (function_arn, changed).
+    """
+    layers = list(layers)
+    try:
+        configuration = lambda_client.get_function(FunctionName=function_name)['Configuration']
+    except lambda_client.exceptions.ResourceNotFoundException:
+        configuration = None
+
+    if configuration is None:
+        create = create_function or (lambda call: call())
+        kwargs = {}
+        if environment:
+            kwargs['Environment'] = {'Variables': environment}
+        response = create(lambda: lambda_client.create_function(
+            FunctionName=function_name,
+            Runtime=LAMBDA_RUNTIME,
+            Role=role_arn,
+            Handler=handler,
+            Code={'ZipFile': zip_bytes},
+            Description=description,
+            Timeout=timeout,
+            MemorySize=256,
+            Layers=layers,
+            **kwargs
+        ))
+        lambda_client.get_waiter('function_active_v2').wait(FunctionName=function_name)
+        return response['FunctionArn'], True
+
+    changed = False
+    if configuration.get('CodeSha256') != code_sha256(zip_bytes):
+        lambda_client.update_function_code(FunctionName=function_name, ZipFile=zip_bytes)
+        lambda_client.get_waiter('function_updated_v2').wait(FunctionName=function_name)
+        changed = True
+
+    updates = {}
+    deployed_layers = [layer['Arn'] for layer in configuration.get('Layers', [])]
+    if deployed_layers != layers:
+        updates['Layers'] = layers
+    if environment is not None and configuration.get('Environment', {}).get('Variables', {}) != environment:
+        updates['Environment'] = {'Variables': environment}
+    if configuration.get('Timeout') != timeout:
+        updates['Timeout'] = timeout
+    if updates:
+        lambda_client.update_function_configuration(FunctionName=function_name, **updates)
+        lambda_client.get_waiter('function_updated_v2').wait(FunctionName=function_name)
+        changed = True
+
+    return configuration['FunctionArn'], changed
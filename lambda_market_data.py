@@ -5,10 +5,17 @@ Fetches stock data and calculates technical indicators
 
 import json
 import os
-import requests
 from datetime import datetime, timedelta
 import boto3
 from decimal import Decimal
+from analysis_cache import create_analysis_cache
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from indicators import IndicatorSet, compute_indicators, indicator_parameters
+from market_data_providers import INTRADAY_INTERVALS, MarketDataError, create_provider, get_provider_name
+from recommendation_log import create_recommendation_log, log_record
+from signal_rules import flatten, load_signal_rules
+from timeframes import alignment_score, resample_bars, trend_bias
+from trading_config import DEBUG_STATS, get_setting
 
 # Initialize clients
 dynamodb = boto3.resource('dynamodb')
@@ -30,207 +37,241 @@ def get_api_key():
             return None
     return api_key
 
-def calculate_rsi(prices, period=14):
-    """Calculate Relative Strength Index"""
-    if len(prices) < period + 1:
-        return None
-    
-    deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
-    gains = [d if d > 0 else 0 for d in deltas]
-    losses = [-d if d < 0 else 0 for d in deltas]
-    
-    avg_gain = sum(gains[:period]) / period
-    avg_loss = sum(losses[:period]) / period
-    
-    if avg_loss == 0:
-        return 100
-    
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return round(rsi, 2)
+# Provider is reused across invocations in a warm container
+_provider = None
 
-def calculate_ema(prices, period):
-    """Calculate Exponential Moving Average"""
-    if len(prices) < period:
-        return None
-    
-    multiplier = 2 / (period + 1)
-    ema = sum(prices[:period]) / period
-    
-    for price in prices[period:]:
-        ema = (price - ema) * multiplier + ema
-    
-    return round(ema, 2)
+def get_market_data_provider():
+    """Build the configured market data provider once per container"""
+    global _provider
+    if _provider is None:
+        name = get_provider_name()
+        api_key = None if name == 'replay' else get_api_key()
+        _provider = create_provider(name, api_key)
+    return _provider
 
-def calculate_macd(prices):
-    """Calculate MACD (12, 26, 9)"""
-    if len(prices) < 26:
-        return None, None, None
-    
-    ema_12 = calculate_ema(prices, 12)
-    ema_26 = calculate_ema(prices, 26)
-    
-    if ema_12 is None or ema_26 is None:
-        return None, None, None
-    
-    macd_line = ema_12 - ema_26
-    
-    # For signal line, we'd need MACD history - simplified here
-    signal_line = macd_line * 0.9  # Approximation
-    histogram = macd_line - signal_line
-    
-    return round(macd_line, 2), round(signal_line, 2), round(histogram, 2)
+# Analyses memoized by (symbol, latest bar, parameters) while the container is warm
+analysis_cache = create_analysis_cache(dynamodb)
 
-def calculate_bollinger_bands(prices, period=20, std_dev=2):
-    """Calculate Bollinger Bands"""
-    if len(prices) < period:
-        return None, None, None
-    
-    recent_prices = prices[-period:]
-    sma = sum(recent_prices) / period
-    
-    variance = sum((p - sma) ** 2 for p in recent_prices) / period
-    std = variance ** 0.5
-    
-    upper_band = sma + (std_dev * std)
-    lower_band = sma - (std_dev * std)
-    
-    return round(upper_band, 2), round(sma, 2), round(lower_band, 2)
+# Stop calling a provider that keeps failing; requests fall back to the last known good analysis
+provider_breaker = CircuitBreaker(
+    'market_data',
+    failure_threshold=get_setting('market_data', 'circuit_breaker', 'failure_threshold', default=3),
+    cooldown_seconds=get_setting('market_data', 'circuit_breaker', 'cooldown_seconds', default=120),
+    is_failure=lambda error: getattr(error, 'unavailable', True)
+)
 
-def fetch_stock_data(symbol, api_key):
-    """Fetch stock data from Alpha Vantage"""
-    url = f"https://www.alphavantage.co/query"
-    params = {
-        'function': 'TIME_SERIES_DAILY',
-        'symbol': symbol,
-        'apikey': api_key,
-        'outputsize': 'compact'  # Last 100 days
-    }
-    
+def fetch_bars(fetch, *args):
+    """Call a provider method through the circuit breaker"""
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'Error Message' in data:
-            return {'error': f"Invalid symbol: {symbol}"}
-        
-        if 'Note' in data:
-            return {'error': 'API rate limit reached'}
-        
-        if 'Time Series (Daily)' not in data:
-            return {'error': 'No data available'}
-        
-        return data
-    except Exception as e:
-        return {'error': str(e)}
+        return provider_breaker.call(fetch, *args)
+    except CircuitOpen as e:
+        raise MarketDataError(str(e), unavailable=True)
+
+def degraded_result(symbol, error, mode='daily'):
+    """Last known good analysis marked stale when the provider is down, otherwise the error"""
+    result = analysis_cache.last_known_good(symbol, mode) if error.unavailable else None
+    if result is None:
+        return {'error': str(error)}
+    print(f"Serving stale {mode} analysis for {symbol} from {result.get('date')}: {error}")
+    return dict(result, stale=True, stale_reason=str(error), data_as_of=result.get('date'))
 
-def analyze_stock(symbol, api_key):
+# Recommendation history (DynamoDB only; nothing is logged when no table is configured)
+recommendation_log = create_recommendation_log(dynamodb, allow_local=False)
+
+# Signal rules compiled once per container from trading_parameters in config
+signal_rules = load_signal_rules()
+
+def derive_signals(price, indicators):
+    """Turn an indicator snapshot into signals, a recommendation and a confidence score"""
+    return signal_rules.evaluate(flatten(indicators, price))
+
+def atr_stop_loss(price, indicators):
+    """Volatility-based stop: price minus risk_management.atr_stop_multiplier x ATR"""
+    atr = indicators.get('atr')
+    if not atr:
+        return None
+    multiplier = get_setting('trading_parameters', 'risk_management', 'atr_stop_multiplier', default=2)
+    return round(price - multiplier * atr, 2)
+
+def correlation_window_days():
+    return get_setting('trading_parameters', 'risk_management', 'correlation_window_days', default=60)
+
+def analyze_stock(symbol, provider):
     """Fetch and analyze stock data"""
     # Fetch data
-    data = fetch_stock_data(symbol, api_key)
-    
-    if 'error' in data:
-        return data
-    
-    # Parse time series
-    time_series = data['Time Series (Daily)']
-    dates = sorted(time_series.keys(), reverse=True)
+    try:
+        bars = fetch_bars(provider.fetch_daily_bars, symbol)
+    except MarketDataError as e:
+        return degraded_result(symbol, e)
     
     # Get latest data
-    latest_date = dates[0]
-    latest_data = time_series[latest_date]
-    
-    current_price = float(latest_data['4. close'])
-    volume = int(latest_data['5. volume'])
-    
-    # Get historical prices for indicators
-    prices = [float(time_series[date]['4. close']) for date in dates[:100]]
-    
-    # Calculate technical indicators
-    rsi = calculate_rsi(prices, 14)
-    ema_20 = calculate_ema(prices, 20)
-    ema_50 = calculate_ema(prices, 50)
-    macd_line, signal_line, histogram = calculate_macd(prices)
-    upper_band, middle_band, lower_band = calculate_bollinger_bands(prices, 20, 2)
-    
-    # Determine signals
-    signals = []
-    
-    if rsi and rsi < 30:
-        signals.append("RSI_OVERSOLD")
-    elif rsi and rsi > 70:
-        signals.append("RSI_OVERBOUGHT")
-    
-    if ema_20 and ema_50:
-        if ema_20 > ema_50:
-            signals.append("BULLISH_EMA_CROSS")
-        else:
-            signals.append("BEARISH_EMA_CROSS")
+    latest = bars[-1]
+    current_price = latest['close']
+    
+    # Reuse the analysis if this symbol was already analyzed up to the same bar (a forming bar's
+    # close and volume are part of the key, so intraday updates are re-analyzed)
+    parameters = indicator_parameters()
+    cache_parameters = dict(parameters, signal_rules=signal_rules.fingerprint)
+    cached = analysis_cache.get(symbol, latest, cache_parameters)
+    if cached is not None:
+        return dict(cached, cached=True)
+    
+    # Calculate technical indicators in one pass over the last 100 days
+    indicators = compute_indicators(bars[-100:], parameters)
+    signals, recommendation, confidence = derive_signals(current_price, indicators)
+    
+    result = {
+        'symbol': symbol,
+        'date': latest['date'],
+        'price': current_price,
+        'volume': latest['volume'],
+        'indicators': indicators,
+        'atr_stop_loss': atr_stop_loss(current_price, indicators),
+        'signals': signals,
+        'recommendation': recommendation,
+        'confidence': confidence,
+        'timestamp': datetime.utcnow().isoformat(),
+        # Returned only on request (include_closes) for the portfolio correlation check
+        'closes': [bar['close'] for bar in bars[-(correlation_window_days() + 1):]]
+    }
+    analysis_cache.set(symbol, latest, cache_parameters, result)
+    if recommendation_log:
+        try:
+            recommendation_log.append(log_record(result))
+        except Exception as e:
+            print(f"Failed to log recommendation: {e}")
+    return result
+
+def analyze_multi_timeframe(symbol, provider):
+    """Daily analysis confirmed by weekly and monthly bars resampled from the same fetch.
+
+    The fetch is the full daily history (still one call): the compact 100 days
+    resample to about five monthly bars, too few for any monthly indicator.
+    """
+    try:
+        bars = fetch_bars(provider.fetch_daily_bars, symbol, True)
+    except MarketDataError as e:
+        return degraded_result(symbol, e, 'multi_timeframe')
+    
+    parameters = indicator_parameters()
+    series = {
+        'daily': bars[-100:],
+        'weekly': resample_bars(bars, 'weekly'),
+        'monthly': resample_bars(bars, 'monthly')
+    }
     
-    if macd_line and signal_line:
-        if macd_line > signal_line:
-            signals.append("MACD_BULLISH")
+    timeframes = {}
+    biases = {}
+    for name, timeframe_bars in series.items():
+        latest = timeframe_bars[-1]
+        indicators = compute_indicators(timeframe_bars, parameters)
+        row = flatten(indicators, latest['close'])
+        signals, recommendation, confidence = signal_rules.evaluate(row)
+        if signals:
+            biases[name] = round(signal_rules.bias(row), 2)
         else:
-            signals.append("MACD_BEARISH")
-    
-    if upper_band and lower_band:
-        if current_price > upper_band:
-            signals.append("PRICE_ABOVE_UPPER_BB")
-        elif current_price < lower_band:
-            signals.append("PRICE_BELOW_LOWER_BB")
-    
-    # Calculate confidence score
-    bullish_signals = sum(1 for s in signals if 'BULLISH' in s or 'OVERSOLD' in s or 'BELOW' in s)
-    bearish_signals = sum(1 for s in signals if 'BEARISH' in s or 'OVERBOUGHT' in s or 'ABOVE' in s)
-    
-    total_signals = len(signals)
-    if total_signals > 0:
-        confidence = abs(bullish_signals - bearish_signals) / total_signals
-    else:
-        confidence = 0
+            # Fall back to the trend when no rule fires on this timeframe
+            biases[name] = trend_bias(latest['close'], indicators[f"ema_{parameters['ema_short']}"])
+        timeframes[name] = {
+            'bars': len(timeframe_bars),
+            'date': latest['date'],
+            'close': latest['close'],
+            'indicators': indicators,
+            'signals': signals,
+            'recommendation': recommendation,
+            'confidence': confidence,
+            'bias': biases[name]
+        }
     
-    recommendation = "HOLD"
-    if bullish_signals > bearish_signals and confidence > 0.5:
-        recommendation = "BUY"
-    elif bearish_signals > bullish_signals and confidence > 0.5:
-        recommendation = "SELL"
+    score, aligned = alignment_score(biases)
+    daily = timeframes['daily']
+    result = {
+        'symbol': symbol,
+        'date': daily['date'],
+        'price': daily['close'],
+        'recommendation': daily['recommendation'],
+        'confidence': daily['confidence'],
+        'alignment_score': score,
+        'aligned': aligned,
+        'timeframes': timeframes,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    analysis_cache.remember(symbol, result, 'multi_timeframe')
+    return result
+
+# Rolling intraday indicators per (symbol, interval), kept while the container is warm
+_intraday_state = {}
+
+def default_interval():
+    """Intraday interval matching market_data.update_frequency_minutes"""
+    minutes = get_setting('market_data', 'update_frequency_minutes', default=15)
+    interval = f"{minutes}min"
+    return interval if interval in INTRADAY_INTERVALS else '15min'
+
+def analyze_intraday(symbol, interval, provider):
+    """Update rolling intraday indicators with bars newer than the last seen one.
+
+    The newest bar of a fetch may still be forming, so it is only previewed;
+    it is applied for good once a later fetch shows a newer bar. When a fetch
+    no longer overlaps the last bar seen, the bars in between were missed: the
+    state is rebuilt from the fetch and the gap is reported in gap_after.
+    """
+    if interval not in INTRADAY_INTERVALS:
+        return {'error': f"Unsupported interval: {interval} (use one of {', '.join(INTRADAY_INTERVALS)})"}
     
-    return {
+    try:
+        bars = fetch_bars(provider.fetch_intraday_bars, symbol, interval)
+    except MarketDataError as e:
+        return degraded_result(symbol, e, f"intraday_{interval}")
+    
+    key = (symbol.upper(), interval)
+    parameters = indicator_parameters()
+    indicator_set = _intraday_state.get(key)
+    gap_after = None
+    if indicator_set is not None and indicator_set.last_bar and bars[0]['date'] > indicator_set.last_bar['date']:
+        gap_after = indicator_set.last_bar['date']
+        print(f"Intraday gap for {key}: no bars between {gap_after} and {bars[0]['date']}, rebuilding")
+        indicator_set = None
+    if indicator_set is None:
+        indicator_set = IndicatorSet(parameters)
+        _intraday_state[key] = indicator_set
+    
+    forming = bars[-1]
+    new_bars = indicator_set.update_many(bars[:-1])
+    indicators = indicator_set.preview(forming)
+    latest = forming if indicator_set.last_bar is None or forming['date'] > indicator_set.last_bar['date'] \
+        else indicator_set.last_bar
+    signals, recommendation, confidence = derive_signals(latest['close'], indicators)
+    
+    result = {
         'symbol': symbol,
-        'date': latest_date,
-        'price': current_price,
-        'volume': volume,
-        'indicators': {
-            'rsi': rsi,
-            'ema_20': ema_20,
-            'ema_50': ema_50,
-            'macd': {
-                'line': macd_line,
-                'signal': signal_line,
-                'histogram': histogram
-            },
-            'bollinger_bands': {
-                'upper': upper_band,
-                'middle': middle_band,
-                'lower': lower_band
-            }
-        },
+        'interval': interval,
+        'date': latest['date'],
+        'price': latest['close'],
+        'volume': latest['volume'],
+        'indicators': indicators,
+        'atr_stop_loss': atr_stop_loss(latest['close'], indicators),
         'signals': signals,
         'recommendation': recommendation,
-        'confidence': round(confidence, 2),
+        'confidence': confidence,
+        'new_bars': new_bars,
+        'bars_processed': indicator_set.bars_processed,
+        'gap_after': gap_after,
         'timestamp': datetime.utcnow().isoformat()
     }
+    analysis_cache.remember(symbol, result, f"intraday_{interval}")
+    return result
 
 def lambda_handler(event, context):
     """Lambda handler for market data analysis"""
     
-    # Get API key
-    api_key = get_api_key()
-    if not api_key:
+    # Get market data provider
+    try:
+        provider = get_market_data_provider()
+    except MarketDataError as e:
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': 'API key not configured'})
+            'body': json.dumps({'error': str(e)})
         }
     
     # Parse input
@@ -246,8 +287,22 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': 'Symbol required'})
         }
     
+    mode = body.get('mode', event.get('mode', 'daily'))
+    
     # Analyze stock
-    result = analyze_stock(symbol, api_key)
+    if mode == 'intraday':
+        interval = body.get('interval', event.get('interval')) or default_interval()
+        result = analyze_intraday(symbol, interval, provider)
+    elif mode == 'multi_timeframe':
+        result = analyze_multi_timeframe(symbol, provider)
+    else:
+        result = analyze_stock(symbol, provider)
+        if DEBUG_STATS:
+            print(f"Analysis cache: {analysis_cache.stats()}")
+        if not body.get('include_closes', event.get('include_closes', False)):
+            result = {key: value for key, value in result.items() if key != 'closes'}
+    if DEBUG_STATS:
+        print(f"Market data circuit: {provider_breaker.stats()}")
     
     if 'error' in result:
         return {
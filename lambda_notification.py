@@ -6,7 +6,8 @@ Sends trading alerts and daily summaries via SES
 import json
 import os
 import boto3
-from datetime import datetime
+from datetime import datetime, timezone
+from portfolio_analytics import review_recommendations
 
 # Initialize SES client
 ses = boto3.client('ses', region_name=os.environ.get('AWS_REGION', 'us-west-2'))
@@ -27,7 +28,7 @@ def get_notification_email():
             return None
     return email
 
-def format_recommendation_email(recommendations):
+def format_recommendation_email(recommendations, held_back=None, narrative=None):
     """Format trading recommendations as HTML email"""
     
     html = """
@@ -51,6 +52,13 @@ def format_recommendation_email(recommendations):
         </div>
     """.format(date=datetime.now().strftime('%B %d, %Y'))
     
+    if narrative:
+        html += f"""
+        <div style="padding: 10px 20px;">
+            <p>{narrative}</p>
+        </div>
+        """
+    
     if not recommendations:
         html += """
         <div style="padding: 20px;">
@@ -87,8 +95,15 @@ def format_recommendation_email(recommendations):
             for signal in rec['signals']:
                 html += f"<li>{signal.replace('_', ' ')}</li>"
             
+            html += "</ul>"
+            
+            if rec.get('correlated_with'):
+                html += f"""
+                <p><strong>⚠️ Correlated with:</strong> {', '.join(rec['correlated_with'])}
+                (these positions tend to move together; size them as one bet)</p>
+                """
+            
             html += """
-                </ul>
                 
                 <h3>Risk Management:</h3>
                 <p>
@@ -99,6 +114,19 @@ def format_recommendation_email(recommendations):
             </div>
             """
     
+    if held_back:
+        html += """
+        <div style="padding: 10px 20px;">
+            <h3>Held back by sector concentration limits</h3>
+            <ul>
+        """
+        for rec in held_back:
+            html += f"<li>{rec['symbol']} - {rec['recommendation']} ({rec['confidence']*100:.0f}%): {rec['held_back_reason']}</li>"
+        html += """
+            </ul>
+        </div>
+        """
+    
     html += """
         <div class="footer">
             <p><strong>Disclaimer:</strong> This is an automated analysis for educational purposes only. 
@@ -111,6 +139,35 @@ def format_recommendation_email(recommendations):
     
     return html
 
+def format_approval_email(request):
+    """Format a trade approval request with the commands to approve or reject it"""
+    expires = datetime.fromtimestamp(request['expires_at'], timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+    request_id = request['request_id']
+    rows = [
+        ('Symbol', request['symbol']),
+        ('Side', request['side']),
+        ('Quantity', request['quantity']),
+        ('Entry Price', request.get('entry_price')),
+        ('Stop Loss', request.get('stop_price')),
+        ('Take Profit', request.get('take_profit')),
+        ('Confidence', f"{request['confidence']*100:.1f}%" if request.get('confidence') is not None else None),
+        ('Reason', request.get('reason'))
+    ]
+    table = ''.join(f"<tr><td><strong>{label}</strong></td><td>{value}</td></tr>"
+                    for label, value in rows if value not in (None, ''))
+    
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif;">
+        <h2>🔐 Trade Approval Required</h2>
+        <table cellpadding="6">{table}</table>
+        <p>This request expires at <strong>{expires}</strong>. Without a decision by then the trade is dropped.</p>
+        <p>Approve: <code>python3 approval_queue.py approve {request_id}</code><br>
+        Reject: <code>python3 approval_queue.py reject {request_id} --reason "..."</code></p>
+    </body>
+    </html>
+    """
+
 def format_alert_email(alert_type, data):
     """Format specific alert emails"""
     
@@ -118,7 +175,8 @@ def format_alert_email(alert_type, data):
         'high_confidence_opportunity': '🎯 High Confidence Trading Opportunity',
         'stop_loss_triggered': '⚠️ Stop Loss Triggered',
         'take_profit_reached': '✅ Take Profit Target Reached',
-        'daily_summary': '📊 Daily Trading Summary'
+        'daily_summary': '📊 Daily Trading Summary',
+        'trade_approval_request': '🔐 Trade Approval Required'
     }
     
     subject = subject_map.get(alert_type, '📬 Trading Alert')
@@ -126,7 +184,14 @@ def format_alert_email(alert_type, data):
     if alert_type == 'high_confidence_opportunity':
         body = format_recommendation_email([data])
     elif alert_type == 'daily_summary':
-        body = format_recommendation_email(data.get('recommendations', []))
+        # Always enforce sector limits and flag correlated picks before anything is sent; the review is
+        # idempotent, so picks the daily pipeline already reviewed pass through and its held_back is kept
+        review = review_recommendations(data.get('recommendations', []), data.get('closes'))
+        held_back = list(data.get('held_back') or []) + review['held_back']
+        body = format_recommendation_email(review['recommendations'], held_back, data.get('narrative'))
+    elif alert_type == 'trade_approval_request':
+        subject = f"{subject}: {data['side']} {data['quantity']} {data['symbol']}"
+        body = format_approval_email(data)
     else:
         body = f"""
         <html>
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Load test harness for the Trading Agent and its two Lambdas.
+
+Replays a weighted mix of agent prompts and direct Lambda events at a fixed
+rate and concurrency, then reports p50/p95/p99 latency, throughput and error
+rate per endpoint.
+
+Usage:
+  python3 load_test.py --stub --rate 20 --duration 30         # fully offline
+  python3 load_test.py --rate 2 --requests 50 --concurrency 4  # deployed stack
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PROMPTS = [
+    "What's AAPL's RSI right now?",
+    "Should I buy NVDA today?",
+    "Analyze MSFT and GOOGL and tell me which is the better swing trade.",
+    "Give me the top swing trade opportunities in my watchlist.",
+]
+
+DEFAULT_MIX = {
+    "agent": 1,
+    "market_data": 6,
+    "notification": 1,
+}
+
+SAMPLE_RECOMMENDATION = {
+    "symbol": "AAPL",
+    "recommendation": "BUY",
+    "price": 175.50,
+    "confidence": 0.85,
+    "indicators": {"rsi": 42.5, "ema_20": 178.20, "ema_50": 172.80},
+    "signals": ["BULLISH_EMA_CROSS", "MACD_BULLISH"]
+}
+
+
+def load_symbols(path='watchlist.json'):
+    with open(path) as f:
+        return [item['symbol'] for item in json.load(f)['watchlist']]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def lambda_failed(result):
+    """A Lambda-style response counts as an error when statusCode >= 400"""
+    return isinstance(result, dict) and result.get('statusCode', 200) >= 400
+
+
+class StubTargets:
+    """Calls the Lambda handlers in-process with fake Alpha Vantage, SES and Bedrock"""
+
+    def __init__(self, model_latency_seconds=0.8):
+        from local_stubs import FakeBedrockAgent, install_lambda_stubs
+
+        self.market_data, self.notification = install_lambda_stubs()
+        self.agent = FakeBedrockAgent(self.market_data.lambda_handler, model_latency_seconds)
+
+    def call(self, endpoint, request):
+        if endpoint == 'agent':
+            self.agent.invoke(request)
+            return True
+        if endpoint == 'market_data':
+            return not lambda_failed(self.market_data.lambda_handler(request, None))
+        return not lambda_failed(self.notification.lambda_handler(request, None))
+
+
+class AwsTargets:
+    """Calls the deployed Lambdas directly and the agent through AgentCore Runtime"""
+
+    def __init__(self, region='us-west-2'):
+        import boto3
+        import base64
+        import requests
+        from bedrock_agentcore_starter_toolkit import Runtime
+        from runtime_status import configure_runtime
+
+        with open('lambda_config.json') as f:
+            lambda_config = json.load(f)
+        with open('cognito_config.json') as f:
+            cognito_config = json.load(f)
+        with open('runtime_execution_role_config.json') as f:
+            role_config = json.load(f)
+
+        self.lambda_client = boto3.client('lambda', region_name=region)
+        self.functions = {
+            'market_data': lambda_config['market_data']['function_name'],
+            'notification': lambda_config['notification']['function_name'],
+        }
+
+        credentials = f"{cognito_config['client_id']}:{cognito_config['client_secret']}"
+        response = requests.post(
+            cognito_config['token_endpoint'],
+            headers={
+                "Authorization": f"Basic {base64.b64encode(credentials.encode()).decode()}",
+                "Content-Type": "application/x-www-form-urlencoded"
+            },
+            data={"grant_type": "client_credentials", "scope": "trading-api/read trading-api/write"}
+        )
+        response.raise_for_status()
+        self.bearer_token = response.json()["access_token"]
+        self.runtime = configure_runtime(Runtime(), role_config, cognito_config)
+
+    def call(self, endpoint, request):
+        if endpoint == 'agent':
+            self.runtime.invoke(request, bearer_token=self.bearer_token)
+            return True
+        response = self.lambda_client.invoke(
+            FunctionName=self.functions[endpoint],
+            Payload=json.dumps(request).encode()
+        )
+        if response.get('FunctionError'):
+            return False
+        return not lambda_failed(json.loads(response['Payload'].read()))
+
+
+class Workload:
+    """Weighted random mix of requests per endpoint"""
+
+    def __init__(self, mix, symbols, prompts, seed=7):
+        self.rng = random.Random(seed)
+        self.endpoints = list(mix)
+        self.weights = [mix[e] for e in self.endpoints]
+        self.symbols = symbols
+        self.prompts = prompts
+
+    def next(self):
+        endpoint = self.rng.choices(self.endpoints, weights=self.weights)[0]
+        if endpoint == 'agent':
+            return endpoint, {"prompt": self.rng.choice(self.prompts), "actor_id": "load_test"}
+        if endpoint == 'market_data':
+            return endpoint, {"symbol": self.rng.choice(self.symbols)}
+        return endpoint, {"alert_type": "high_confidence_opportunity", "data": SAMPLE_RECOMMENDATION}
+
+
+class LoadTestResults:
+    """Thread-safe latency/error collection per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.started = time.monotonic()
+        self.finished = None
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self):
+        duration = (self.finished or time.monotonic()) - self.started
+        report = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            errors = self.errors.get(endpoint, 0)
+            report[endpoint] = {
+                'requests': len(ordered),
+                'errors': errors,
+                'error_rate': round(errors / len(ordered), 4),
+                'throughput_rps': round(len(ordered) / duration, 2) if duration else None,
+                'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+                'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+                'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+                'max_ms': round(ordered[-1] * 1000, 1),
+            }
+        return {'duration_seconds': round(duration, 2), 'endpoints': report}
+
+
+def run_load_test(targets, workload, rate, concurrency, total_requests=None, duration=None):
+    """Open-loop load: requests are issued on a fixed schedule regardless of latency.
+
+    Latency is measured from each request's scheduled send time, so time spent
+    waiting for a free worker (when concurrency is saturated) counts against
+    it instead of being hidden (coordinated omission).
+    """
+    results = LoadTestResults()
+    interval = 1.0 / rate
+
+    def execute(scheduled, endpoint, request):
+        try:
+            ok = targets.call(endpoint, request)
+        except Exception as e:
+            print(f"  {endpoint} error: {e}")
+            ok = False
+        results.record(endpoint, time.monotonic() - scheduled, ok)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        issued = 0
+        while True:
+            if total_requests is not None and issued >= total_requests:
+                break
+            scheduled = results.started + issued * interval
+            if duration is not None and scheduled - results.started >= duration:
+                break
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(execute, scheduled, *workload.next())
+            issued += 1
+
+    results.finished = time.monotonic()
+    return results.summary()
+
+
+def print_report(summary):
+    print("\n" + "=" * 80)
+    print(f"LOAD TEST RESULTS ({summary['duration_seconds']}s)")
+    print("=" * 80)
+    print(f"{'endpoint':<14}{'reqs':>7}{'err%':>8}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, stats in summary['endpoints'].items():
+        print(f"{endpoint:<14}{stats['requests']:>7}{stats['error_rate'] * 100:>7.1f}%"
+              f"{stats['throughput_rps']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Trading Agent and its Lambdas")
+    parser.add_argument("--stub", action="store_true", help="Run offline against local fakes")
+    parser.add_argument("--rate", type=float, default=5.0, help="Requests per second")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum in-flight requests")
+    parser.add_argument("--requests", type=int, help="Total requests to send")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run (ignored with --requests)")
+    parser.add_argument("--mix", help='JSON weights per endpoint, e.g. \'{"market_data": 5, "agent": 1}\'')
+    parser.add_argument("--prompts", help="File with one agent prompt per line")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    mix = json.loads(args.mix) if args.mix else DEFAULT_MIX
+    prompts = DEFAULT_PROMPTS
+    if args.prompts:
+        with open(args.prompts) as f:
+            prompts = [line.strip() for line in f if line.strip()]
+
+    targets = StubTargets() if args.stub else AwsTargets()
+    workload = Workload(mix, load_symbols(), prompts)
+
+    print(f"Running {'stub' if args.stub else 'AWS'} load test: {args.rate} req/s, "
+          f"concurrency {args.concurrency}, mix {mix}")
+    summary = run_load_test(
+        targets, workload, args.rate, args.concurrency,
+        total_requests=args.requests,
+        duration=None if args.requests else args.duration
+    )
+    print_report(summary)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n✓ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
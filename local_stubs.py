@@ -0,0 +1,149 @@
+"""
+Local stubs
+Offline stand-ins for Alpha Vantage, SES and Bedrock so the Lambdas and the
+agent flow can be exercised without network access or AWS credentials.
+"""
+
+import os
+import random
+import re
+import time
+from datetime import date, datetime, timedelta
+
+REGION = 'us-west-2'
+
+
+def generate_daily_series(symbol, days=100, end=None, seed=None):
+    """Deterministic random-walk OHLCV bars in Alpha Vantage TIME_SERIES_DAILY format"""
+    rng = random.Random(seed if seed is not None else symbol)
+    end = end or date.today()
+    price = 50 + rng.random() * 400
+
+    trading_days = []
+    day = end
+    while len(trading_days) < days:
+        if day.weekday() < 5:
+            trading_days.append(day)
+        day -= timedelta(days=1)
+
+    series = {}
+    for day in reversed(trading_days):
+        open_price = price
+        price = max(1.0, price * (1 + rng.gauss(0.0005, 0.018)))
+        high = max(open_price, price) * (1 + rng.random() * 0.01)
+        low = min(open_price, price) * (1 - rng.random() * 0.01)
+        series[day.isoformat()] = {
+            '1. open': f"{open_price:.4f}",
+            '2. high': f"{high:.4f}",
+            '3. low': f"{low:.4f}",
+            '4. close': f"{price:.4f}",
+            '5. volume': str(rng.randint(5_000_000, 80_000_000))
+        }
+    return {
+        'Meta Data': {'2. Symbol': symbol, '4. Output Size': 'Compact'},
+        'Time Series (Daily)': series
+    }
+
+
+def generate_intraday_series(symbol, interval='15min', bars=100, end=None):
+    """Random-walk intraday bars in Alpha Vantage TIME_SERIES_INTRADAY format.
+
+    Bars are aligned to the interval, so repeated calls return overlapping
+    windows that advance as wall-clock time moves on.
+    """
+    minutes = int(interval.replace('min', ''))
+    end = end or datetime.now().replace(second=0, microsecond=0)
+    end -= timedelta(minutes=end.minute % minutes)
+    series = {}
+    for i in range(bars - 1, -1, -1):
+        timestamp = end - timedelta(minutes=i * minutes)
+        rng = random.Random(f"{symbol}-{timestamp.isoformat()}")
+        close = 100 + sum(map(ord, symbol)) % 50 + rng.gauss(0, 1.5)
+        series[timestamp.strftime('%Y-%m-%d %H:%M:%S')] = {
+            '1. open': f"{close * (1 + rng.gauss(0, 0.002)):.4f}",
+            '2. high': f"{close * 1.003:.4f}",
+            '3. low': f"{close * 0.997:.4f}",
+            '4. close': f"{close:.4f}",
+            '5. volume': str(rng.randint(50_000, 900_000))
+        }
+    return {'Meta Data': {'2. Symbol': symbol, '4. Interval': interval}, f"Time Series ({interval})": series}
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._payload
+
+
+class FakeAlphaVantage:
+    """Replaces the `requests` module used by the Alpha Vantage provider"""
+
+    def __init__(self, latency_seconds=0.05, error_rate=0.0):
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        time.sleep(self.latency_seconds)
+        params = params or {}
+        if self.error_rate and random.random() < self.error_rate:
+            return FakeResponse({'Note': 'Thank you for using Alpha Vantage! (simulated rate limit)'})
+        symbol = params.get('symbol', 'TEST')
+        if params.get('function') == 'TIME_SERIES_INTRADAY':
+            return FakeResponse(generate_intraday_series(symbol, params.get('interval', '15min')))
+        days = 100 if params.get('outputsize', 'compact') == 'compact' else 500
+        return FakeResponse(generate_daily_series(symbol, days=days))
+
+
+class FakeSES:
+    """Replaces the SES client used by the notification Lambda"""
+
+    def __init__(self, latency_seconds=0.03):
+        self.latency_seconds = latency_seconds
+        self.sent = []
+
+    def send_email(self, Source, Destination, Message):
+        time.sleep(self.latency_seconds)
+        self.sent.append({'to': Destination['ToAddresses'], 'subject': Message['Subject']['Data']})
+        return {'MessageId': f"stub-{len(self.sent)}"}
+
+
+class FakeBedrockAgent:
+    """Stands in for the deployed agent: calls the local market data tool, then 'thinks'"""
+
+    SYMBOL_PATTERN = re.compile(r'\b[A-Z]{1,5}\b')
+
+    def __init__(self, market_data_handler, model_latency_seconds=0.8):
+        self.market_data_handler = market_data_handler
+        self.model_latency_seconds = model_latency_seconds
+
+    def invoke(self, payload):
+        prompt = payload.get('prompt', '')
+        symbols = [s for s in self.SYMBOL_PATTERN.findall(prompt) if s not in ('I', 'A', 'RSI', 'EMA', 'MACD')]
+        results = [self.market_data_handler({'symbol': symbol}, None) for symbol in symbols[:5]]
+        time.sleep(self.model_latency_seconds)
+        return {'response': f"Analyzed {len(results)} symbol(s) (stub agent)", 'tool_results': len(results)}
+
+
+def install_lambda_stubs(alpha_vantage=None, ses=None):
+    """Point both Lambda modules at the fakes and return (market_data_module, notification_module)"""
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('ALPHA_VANTAGE_API_KEY', 'stub-key')
+    os.environ.setdefault('NOTIFICATION_EMAIL', 'stub@example.com')
+
+    import lambda_market_data
+    import lambda_notification
+    import market_data_providers
+
+    market_data_providers.requests = alpha_vantage or FakeAlphaVantage()
+    lambda_market_data._provider = None
+    lambda_notification.ses = ses or FakeSES()
+    return lambda_market_data, lambda_notification
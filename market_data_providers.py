@@ -0,0 +1,284 @@
+"""
+Market data providers
+Pluggable sources of OHLCV bars behind a common interface.
+
+Every provider returns bars as a chronological (oldest first) list of
+{'date', 'open', 'high', 'low', 'close', 'volume'} dicts.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from trading_config import get_setting
+
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+INTRADAY_INTERVALS = ('1min', '5min', '15min')
+
+
+class MarketDataError(Exception):
+    """Raised when a provider cannot return bars for a symbol.
+
+    unavailable marks outages (network errors, timeouts, rate limits) as
+    opposed to answers such as an invalid symbol.
+    """
+
+    def __init__(self, message, rate_limited=False, unavailable=False):
+        super().__init__(message)
+        self.rate_limited = rate_limited
+        self.unavailable = unavailable or rate_limited
+
+
+def parse_alpha_vantage_series(time_series):
+    """Convert an Alpha Vantage time series dict into chronological bars"""
+    bars = []
+    for timestamp in sorted(time_series):
+        values = time_series[timestamp]
+        bars.append({
+            'date': timestamp,
+            'open': float(values['1. open']),
+            'high': float(values['2. high']),
+            'low': float(values['3. low']),
+            'close': float(values['4. close']),
+            'volume': int(float(values['5. volume']))
+        })
+    return bars
+
+
+class MarketDataProvider:
+    """Base class for market data sources"""
+
+    name = 'base'
+
+    def fetch_daily_bars(self, symbol, full=False):
+        """Return chronological daily bars for a symbol or raise MarketDataError.
+
+        full asks for the whole available history instead of the recent window.
+        """
+        raise NotImplementedError
+
+    def fetch_intraday_bars(self, symbol, interval):
+        """Return the most recent chronological intraday bars ('date' is the bar timestamp)"""
+        raise MarketDataError(f"{self.name} does not provide intraday data")
+
+
+class AlphaVantageProvider(MarketDataProvider):
+    """Alpha Vantage TIME_SERIES_DAILY (compact: last 100 trading days; full: 20+ years)"""
+
+    name = 'alpha_vantage'
+
+    def __init__(self, api_key, timeout=10):
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def _query(self, params, series_key):
+        params = dict(params, apikey=self.api_key)
+        try:
+            response = requests.get(ALPHA_VANTAGE_URL, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            raise MarketDataError(str(e), unavailable=True)
+
+        if 'Error Message' in data:
+            raise MarketDataError(f"Invalid symbol: {params.get('symbol')}")
+
+        if 'Note' in data or 'Information' in data:
+            raise MarketDataError('API rate limit reached', rate_limited=True)
+
+        if series_key not in data:
+            raise MarketDataError('No data available')
+
+        return parse_alpha_vantage_series(data[series_key])
+
+    def fetch_daily_bars(self, symbol, full=False):
+        return self._query(
+            {'function': 'TIME_SERIES_DAILY', 'symbol': symbol, 'outputsize': 'full' if full else 'compact'},
+            'Time Series (Daily)'
+        )
+
+    def fetch_intraday_bars(self, symbol, interval):
+        if interval not in INTRADAY_INTERVALS:
+            raise MarketDataError(f"Unsupported interval: {interval}")
+        return self._query(
+            {'function': 'TIME_SERIES_INTRADAY', 'symbol': symbol, 'interval': interval, 'outputsize': 'compact'},
+            f"Time Series ({interval})"
+        )
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves bars from local JSON files for offline tests and backtests.
+
+    Daily bars live in SYMBOL.json and intraday bars in SYMBOL_<interval>.json;
+    files may hold either an Alpha Vantage response or a list of bars. Setting
+    as_of replays history: only bars on or before that date are returned.
+    """
+
+    name = 'replay'
+
+    def __init__(self, data_dir, as_of=None):
+        self.data_dir = data_dir
+        self.as_of = as_of
+        self._cache = {}
+
+    def _load(self, filename, series_key):
+        if filename not in self._cache:
+            path = os.path.join(self.data_dir, filename)
+            if not os.path.exists(path):
+                raise MarketDataError(f"No replay data: {filename}")
+            with open(path) as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                data = parse_alpha_vantage_series(data.get(series_key, {}))
+            self._cache[filename] = sorted(data, key=lambda bar: bar['date'])
+        return self._cache[filename]
+
+    def _replay(self, bars):
+        if self.as_of:
+            bars = [bar for bar in bars if bar['date'][:len(self.as_of)] <= self.as_of]
+        if not bars:
+            raise MarketDataError('No data available')
+        return bars
+
+    def fetch_daily_bars(self, symbol, full=False):
+        return self._replay(self._load(f"{symbol.upper()}.json", 'Time Series (Daily)'))
+
+    def fetch_intraday_bars(self, symbol, interval):
+        return self._replay(self._load(f"{symbol.upper()}_{interval}.json", f"Time Series ({interval})"))
+
+
+class FanOutProvider(MarketDataProvider):
+    """Combines providers by racing them or falling back between them.
+
+    'fallback' tries providers fastest-first (by observed latency) and skips
+    any provider that recently hit its rate limit. 'race' queries all healthy
+    providers concurrently and returns the first successful answer.
+    """
+
+    name = 'fanout'
+
+    def __init__(self, providers, strategy='fallback', rate_limit_cooldown_seconds=60,
+                 race_timeout_seconds=10):
+        self.providers = list(providers)
+        self.strategy = strategy
+        self.rate_limit_cooldown_seconds = rate_limit_cooldown_seconds
+        self.race_timeout_seconds = race_timeout_seconds
+        self.latency = {p.name: None for p in self.providers}
+        self.cooldown_until = {p.name: 0.0 for p in self.providers}
+        self._lock = threading.Lock()
+
+    def _observe(self, provider, seconds):
+        with self._lock:
+            previous = self.latency[provider.name]
+            self.latency[provider.name] = seconds if previous is None else 0.7 * previous + 0.3 * seconds
+
+    def _call(self, provider, method, *args):
+        start = time.monotonic()
+        try:
+            return getattr(provider, method)(*args)
+        except MarketDataError as e:
+            if e.rate_limited:
+                with self._lock:
+                    self.cooldown_until[provider.name] = time.monotonic() + self.rate_limit_cooldown_seconds
+            raise
+        finally:
+            self._observe(provider, time.monotonic() - start)
+
+    def healthy_providers(self):
+        """Providers not cooling down after a rate limit, fastest first"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [p for p in self.providers if self.cooldown_until[p.name] <= now]
+            latency = dict(self.latency)
+        return sorted(healthy or self.providers,
+                      key=lambda p: latency[p.name] if latency[p.name] is not None else 0.0)
+
+    def fetch_daily_bars(self, symbol, full=False):
+        return self._dispatch('fetch_daily_bars', symbol, full)
+
+    def fetch_intraday_bars(self, symbol, interval):
+        return self._dispatch('fetch_intraday_bars', symbol, interval)
+
+    def _dispatch(self, method, *args):
+        if self.strategy == 'race':
+            return self._race(method, *args)
+        return self._fallback(method, *args)
+
+    def _fallback(self, method, *args):
+        errors = []
+        unavailable = True
+        for provider in self.healthy_providers():
+            try:
+                return self._call(provider, method, *args)
+            except MarketDataError as e:
+                errors.append(f"{provider.name}: {e}")
+                unavailable = unavailable and e.unavailable
+        raise MarketDataError('; '.join(errors) or 'No providers configured', unavailable=unavailable and bool(errors))
+
+    def _race(self, method, *args):
+        providers = self.healthy_providers()
+        errors = []
+        unavailable = True
+        executor = ThreadPoolExecutor(max_workers=len(providers))
+        try:
+            futures = {executor.submit(self._call, p, method, *args): p for p in providers}
+            for future in as_completed(futures, timeout=self.race_timeout_seconds):
+                try:
+                    return future.result()
+                except MarketDataError as e:
+                    errors.append(f"{futures[future].name}: {e}")
+                    unavailable = unavailable and e.unavailable
+        except TimeoutError:
+            errors.append('race timed out')
+        finally:
+            # Do not wait for slower providers once a winner is known
+            executor.shutdown(wait=False)
+        raise MarketDataError('; '.join(errors), unavailable=unavailable)
+
+
+def create_provider(name, api_key=None, config=None):
+    """Build a provider by name using settings from the market_data config section"""
+    settings = get_setting('market_data', default={}, config=config) or {}
+
+    if name == 'alpha_vantage':
+        if not api_key:
+            raise MarketDataError('API key not configured')
+        return AlphaVantageProvider(api_key)
+
+    if name == 'replay':
+        data_dir = os.environ.get('MARKET_DATA_REPLAY_DIR', settings.get('replay_dir', 'market_data_replay'))
+        return ReplayProvider(data_dir, as_of=os.environ.get('MARKET_DATA_REPLAY_AS_OF'))
+
+    if name == 'fanout':
+        fanout = settings.get('fanout', {})
+        return FanOutProvider(
+            [create_provider(child, api_key, config) for child in fanout.get('providers', ['alpha_vantage'])],
+            strategy=fanout.get('strategy', 'fallback'),
+            rate_limit_cooldown_seconds=fanout.get('rate_limit_cooldown_seconds', 60),
+            race_timeout_seconds=fanout.get('race_timeout_seconds', 10)
+        )
+
+    raise MarketDataError(f"Unknown market data provider: {name}")
+
+
+def get_provider_name(config=None):
+    """Provider selected by MARKET_DATA_PROVIDER or market_data.provider in config"""
+    return os.environ.get('MARKET_DATA_PROVIDER') or get_setting(
+        'market_data', 'provider', default='alpha_vantage', config=config
+    )
+
+
+def record_replay_data(provider, symbols, data_dir):
+    """Save bars from any provider as replay files (e.g. to freeze a backtest dataset)"""
+    os.makedirs(data_dir, exist_ok=True)
+    saved = {}
+    for symbol in symbols:
+        bars = provider.fetch_daily_bars(symbol)
+        with open(os.path.join(data_dir, f"{symbol.upper()}.json"), 'w') as f:
+            json.dump(bars, f)
+        saved[symbol] = len(bars)
+    return saved
@@ -0,0 +1,72 @@
+"""
+AgentCore Memory retrieval cache
+Per-actor caching of long-term memory retrievals for the trading agent
+"""
+
+import os
+from ttl_cache import TTLCache
+
+# Namespaces whose records do not depend on the user query (cached once per actor)
+QUERY_INDEPENDENT_SUFFIXES = ("/preferences",)
+
+# Namespaces that change every turn and must never be served from cache
+UNCACHED_SUFFIXES = ("/summary",)
+
+
+def normalize_query(query):
+    """Collapse case and whitespace so trivially different prompts share an entry"""
+    return " ".join((query or "").lower().split())
+
+
+class CachingMemoryClient:
+    """Wraps a MemoryClient so retrieve_memories is served from a shared TTL cache.
+
+    Every other attribute is forwarded to the wrapped client, so the session
+    manager keeps using it for event reads and writes unchanged.
+    """
+
+    def __init__(self, memory_client, cache, actor_id):
+        self._client = memory_client
+        self._cache = cache
+        self._actor_id = actor_id
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def retrieve_memories(self, **kwargs):
+        """Retrieve memory records, reusing a cached result for the same actor/namespace/query"""
+        namespace = kwargs.get("namespace_path") or kwargs.get("namespace")
+
+        if namespace and namespace.endswith(UNCACHED_SUFFIXES):
+            return self._client.retrieve_memories(**kwargs)
+
+        if namespace and namespace.endswith(QUERY_INDEPENDENT_SUFFIXES):
+            cache_query = ""
+        else:
+            cache_query = normalize_query(kwargs.get("query"))
+
+        key = (self._actor_id, kwargs.get("memory_id"), namespace, cache_query, kwargs.get("top_k"))
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        memories = self._client.retrieve_memories(**kwargs)
+        self._cache.set(key, memories)
+        return memories
+
+    def invalidate(self):
+        """Drop all cached retrievals for this actor (call after writing to memory)"""
+        return invalidate_actor(self._cache, self._actor_id)
+
+
+def invalidate_actor(cache, actor_id):
+    """Drop all cached retrievals belonging to one actor"""
+    return cache.invalidate_where(lambda key: key[0] == actor_id)
+
+
+def create_retrieval_cache():
+    """Create the process-wide retrieval cache from environment settings"""
+    return TTLCache(
+        max_size=int(os.environ.get("MEMORY_CACHE_MAX_ENTRIES", "512")),
+        ttl_seconds=float(os.environ.get("MEMORY_CACHE_TTL_SECONDS", "300"))
+    )
@@ -0,0 +1,106 @@
+"""
+Model router
+Classifies agent prompts into cost/latency tiers.
+
+  direct  one symbol, one indicator lookup ("what's AAPL's RSI?"): answered
+          straight from the market data tool, no model call
+  fast    single-symbol questions: small, fast model
+  deep    multi-symbol, portfolio or open-ended reasoning: large model
+
+Classification is a handful of regexes, so routing adds microseconds.
+"""
+
+import os
+import re
+
+FAST_MODEL_ID = os.environ.get("FAST_MODEL_ID", "us.anthropic.claude-haiku-4-5-20251001-v1:0")
+DEEP_MODEL_ID = os.environ.get("DEEP_MODEL_ID", "us.anthropic.claude-sonnet-4-5-20250929-v1:0")
+
+MODEL_TIERS = {
+    "fast": FAST_MODEL_ID,
+    "deep": DEEP_MODEL_ID
+}
+
+# Indicator keywords answerable from one analyze_stock result: keyword -> (label, path in the result)
+LOOKUP_FIELDS = {
+    "rsi": ("RSI", ("indicators", "rsi")),
+    "macd": ("MACD", ("indicators", "macd")),
+    "atr": ("ATR", ("indicators", "atr")),
+    "adx": ("ADX", ("indicators", "adx")),
+    "vwap": ("VWAP", ("indicators", "vwap")),
+    "obv": ("OBV", ("indicators", "obv")),
+    "stochastic": ("Stochastic", ("indicators", "stochastic")),
+    "bollinger": ("Bollinger Bands", ("indicators", "bollinger_bands")),
+    "price": ("Price", ("price",)),
+}
+
+SYMBOL_PATTERN = re.compile(r"\$?\b([A-Z]{1,5})\b")
+NOT_SYMBOLS = {
+    "I", "A", "AM", "PM", "OK", "US", "CEO", "ETF", "IPO", "EPS", "AI",
+    "RSI", "EMA", "SMA", "MACD", "ATR", "ADX", "OBV", "VWAP", "BB",
+    "BUY", "SELL", "HOLD", "AND", "OR", "THE", "IS", "IT", "MY", "TODAY",
+}
+LOOKUP_PATTERN = re.compile(r"\b(" + "|".join(LOOKUP_FIELDS) + r")\b", re.IGNORECASE)
+REASONING_PATTERN = re.compile(
+    r"\b(should|buy|sell|hold|why|compare|versus|vs|better|best|recommend|opportunit\w*|"
+    r"portfolio|watchlist|risk|strategy|plan|position|size|explain|outlook)\b",
+    re.IGNORECASE,
+)
+DEEP_PATTERN = re.compile(
+    r"\b(compare|versus|vs|portfolio|watchlist|top|rank|all|diversif\w*|sector|strategy)\b",
+    re.IGNORECASE,
+)
+
+
+class Route:
+    """Routing decision for one prompt"""
+
+    def __init__(self, tier, symbols, lookup=None):
+        self.tier = tier
+        self.symbols = symbols
+        self.lookup = lookup
+
+    @property
+    def model_id(self):
+        """Model for this tier; direct lookups fall back to the fast model"""
+        return MODEL_TIERS.get(self.tier, FAST_MODEL_ID)
+
+    def __repr__(self):
+        return f"Route(tier={self.tier!r}, symbols={self.symbols!r}, lookup={self.lookup!r})"
+
+
+def extract_symbols(prompt):
+    """Ticker-like uppercase words in order of appearance, without duplicates"""
+    symbols = []
+    for match in SYMBOL_PATTERN.findall(prompt):
+        if match not in NOT_SYMBOLS and match not in symbols:
+            symbols.append(match)
+    return symbols
+
+
+def classify(prompt):
+    symbols = extract_symbols(prompt)
+    lookups = {match.lower() for match in LOOKUP_PATTERN.findall(prompt)}
+
+    if len(symbols) > 1 or DEEP_PATTERN.search(prompt):
+        return Route("deep", symbols)
+    if len(symbols) == 1 and len(lookups) == 1 and not REASONING_PATTERN.search(prompt):
+        return Route("direct", symbols, lookups.pop())
+    if len(symbols) == 1:
+        return Route("fast", symbols)
+    return Route("deep", symbols)
+
+
+def format_lookup(route, analysis):
+    """Plain-text answer for a direct lookup from an analyze_stock result"""
+    label, path = LOOKUP_FIELDS[route.lookup]
+    value = analysis
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    if value is None:
+        return None
+    if route.lookup == "price":
+        return f"{route.symbols[0]} closed at ${value} on {analysis.get('date')}."
+    if isinstance(value, dict):
+        value = ", ".join(f"{key.replace('_', ' ')} {part}" for key, part in value.items())
+    return f"{route.symbols[0]} {label} as of {analysis.get('date')}: {value} (close ${analysis.get('price')})."
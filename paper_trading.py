@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Paper Trading
+Simulated execution for Phase 2: orders are filled against daily bars instead of a broker.
+
+Each symbol has its own order book: resting limit and stop orders sit in
+heaps ordered by trigger price, so a bar only touches the orders it actually
+triggers (market orders wait in a FIFO for the next bar's open). Cancelled
+orders are dropped lazily when they reach the top of a heap.
+
+Fill rules per bar:
+  market      next open, plus slippage
+  limit       at the limit or the open if it gapped through, no slippage
+  stop        at the stop or the open if it gapped through, plus slippage
+
+BUY orders with stop_price/take_profit become brackets: once filled, a
+protective sell stop and a take-profit sell limit are placed as a
+one-cancels-other pair. New BUY orders are checked against
+phase_2_settings.max_capital_per_trade and max_daily_trades; exits are never
+blocked. Only long positions are simulated.
+
+The account can be saved to JSON (save_engine / load_engine). The approval
+queue's 'paper' executor places approved orders on the account in
+phase_2_settings.paper_trading.account_file, and --account replays the bars
+that account has not seen yet so those orders fill.
+
+Usage:
+  python3 paper_trading.py --stub                           # backtest the signal rules on the watchlist
+  python3 paper_trading.py --symbols AAPL,MSFT --cash 5000
+  python3 paper_trading.py --orders approved.json --stub    # fill a list of orders (e.g. agent output)
+  python3 paper_trading.py --account paper_account.json     # fill approved orders on the saved account
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import time
+from collections import deque
+from datetime import date
+
+from trading_config import get_setting
+
+SIDES = ('BUY', 'SELL')
+ORDER_TYPES = ('market', 'limit', 'stop')
+
+
+def paper_settings(config=None):
+    """Execution limits from phase_2_settings and cost model from phase_2_settings.paper_trading"""
+    settings = get_setting('phase_2_settings', default={}, config=config) or {}
+    costs = settings.get('paper_trading', {})
+    return {
+        'max_capital_per_trade': settings.get('max_capital_per_trade', 100),
+        'max_daily_trades': settings.get('max_daily_trades', 2),
+        'slippage_bps': costs.get('slippage_bps', 5),
+        'commission_per_share': costs.get('commission_per_share', 0.005),
+        'min_commission': costs.get('min_commission', 1.0),
+        'account_file': costs.get('account_file', 'paper_account.json')
+    }
+
+
+def slipped_price(price, side, slippage_bps):
+    """Price moved against the order by slippage_bps basis points"""
+    direction = 1 if side == 'BUY' else -1
+    return round(price * (1 + direction * slippage_bps / 10000), 4)
+
+
+def commission(quantity, settings):
+    return round(max(quantity * settings['commission_per_share'], settings['min_commission']), 2)
+
+
+class SymbolBook:
+    """Open orders for one symbol, each queue ordered so the next order to trigger is first"""
+
+    def __init__(self):
+        self.market = deque()
+        self.buy_limits = []   # (-limit, seq, id): highest bid first, fills when low <= limit
+        self.sell_limits = []  # (limit, seq, id): lowest offer first, fills when high >= limit
+        self.buy_stops = []    # (stop, seq, id): lowest first, triggers when high >= stop
+        self.sell_stops = []   # (-stop, seq, id): highest first, triggers when low <= stop
+
+    def add(self, order, seq):
+        kind, side, order_id = order['order_type'], order['side'], order['order_id']
+        if kind == 'market':
+            self.market.append(order_id)
+        elif kind == 'limit':
+            price = order['limit_price']
+            heapq.heappush(self.buy_limits if side == 'BUY' else self.sell_limits,
+                           (-price if side == 'BUY' else price, seq, order_id))
+        else:
+            price = order['stop_price']
+            heapq.heappush(self.buy_stops if side == 'BUY' else self.sell_stops,
+                           (price if side == 'BUY' else -price, seq, order_id))
+
+    def triggered(self, bar):
+        """Pop the ids of every order this bar fills, markets first"""
+        ids = list(self.market)
+        self.market.clear()
+        for heap, hit in (
+            (self.sell_stops, lambda key: bar['low'] <= -key),
+            (self.buy_stops, lambda key: bar['high'] >= key),
+            (self.buy_limits, lambda key: bar['low'] <= -key),
+            (self.sell_limits, lambda key: bar['high'] >= key),
+        ):
+            while heap and hit(heap[0][0]):
+                ids.append(heapq.heappop(heap)[2])
+        return ids
+
+
+class PaperTradingEngine:
+    """Order books, fills, positions and cash for a simulated account"""
+
+    def __init__(self, cash=None, settings=None):
+        if cash is None:
+            cash = os.environ.get('PORTFOLIO_CAPITAL', 10000)
+        self.cash = float(cash)
+        self.starting_cash = self.cash
+        self.settings = settings or paper_settings()
+        self.orders = {}
+        self.books = {}
+        self.positions = {}    # symbol -> [quantity, average price]
+        self.last_close = {}
+        self.daily_entries = {}
+        self.fills = []
+        self.realized_pnl = 0.0
+        self.commissions = 0.0
+        self.current_date = None
+        self._seq = 0
+
+    def _reject(self, order, reason):
+        order.update({'status': 'rejected', 'reject_reason': reason})
+        return order
+
+    def submit(self, symbol, side, quantity, order_type='market', limit_price=None, stop_price=None,
+               take_profit=None, trade_date=None, parent_id=None):
+        """Place an order; returns the order dict (status 'open' or 'rejected' with reject_reason)"""
+        self._seq += 1
+        symbol = symbol.upper()
+        order = {
+            'order_id': f"P{self._seq}",
+            'symbol': symbol,
+            'side': side,
+            'quantity': int(quantity),
+            'order_type': order_type,
+            'limit_price': limit_price,
+            'stop_price': stop_price,
+            'take_profit': take_profit,
+            'parent_id': parent_id,
+            'status': 'open',
+            'submitted': trade_date or self.current_date or date.today().isoformat()
+        }
+        self.orders[order['order_id']] = order
+
+        if side not in SIDES or order_type not in ORDER_TYPES:
+            return self._reject(order, f"unsupported order: {side} {order_type}")
+        if order['quantity'] <= 0:
+            return self._reject(order, 'quantity must be positive')
+        if (order_type == 'limit' and limit_price is None) or (order_type == 'stop' and stop_price is None):
+            return self._reject(order, f"{order_type} order needs a price")
+
+        if side == 'BUY' and parent_id is None:
+            reference = {'limit': limit_price, 'stop': stop_price}.get(order_type) or self.last_close.get(symbol)
+            if reference and order['quantity'] * reference > self.settings['max_capital_per_trade']:
+                return self._reject(order, f"exceeds max_capital_per_trade ${self.settings['max_capital_per_trade']}")
+            entries = self.daily_entries.get(order['submitted'], 0)
+            if entries >= self.settings['max_daily_trades']:
+                return self._reject(order, f"max_daily_trades ({self.settings['max_daily_trades']}) reached")
+            self.daily_entries[order['submitted']] = entries + 1
+
+        self.books.setdefault(symbol, SymbolBook()).add(order, self._seq)
+        return order
+
+    def execute(self, request):
+        """Execution stage for approval_queue: a limit at entry_price (market without one) with its bracket"""
+        order_type = 'limit' if request.get('entry_price') and request['side'] == 'BUY' else 'market'
+        order = self.submit(request['symbol'], request['side'], request['quantity'], order_type,
+                            limit_price=request.get('entry_price') if order_type == 'limit' else None,
+                            stop_price=request.get('stop_price'), take_profit=request.get('take_profit'))
+        return {'status': order['status'], 'order_id': order['order_id'], 'reject_reason': order.get('reject_reason')}
+
+    def cancel(self, order_id):
+        """Cancel an open order (it is skipped when it reaches the top of its queue)"""
+        order = self.orders.get(order_id)
+        if order is None or order['status'] != 'open':
+            return False
+        order['status'] = 'cancelled'
+        return True
+
+    def replace(self, order_id, quantity=None, limit_price=None, stop_price=None):
+        """Cancel an open order and submit a modified copy; the original stays open if the copy is rejected"""
+        old = self.orders.get(order_id)
+        if not self.cancel(order_id):
+            return None
+        entry = old['side'] == 'BUY' and old['parent_id'] is None
+        if entry:
+            # The replacement is the same trade, not a new entry for max_daily_trades
+            self.daily_entries[old['submitted']] -= 1
+        new = self.submit(old['symbol'], old['side'], quantity or old['quantity'], old['order_type'],
+                          limit_price=limit_price if limit_price is not None else old['limit_price'],
+                          stop_price=stop_price if stop_price is not None else old['stop_price'],
+                          take_profit=old['take_profit'], trade_date=old['submitted'], parent_id=old['parent_id'])
+        if new['status'] == 'rejected':
+            old['status'] = 'open'
+            if entry:
+                self.daily_entries[old['submitted']] += 1
+            return new
+        new['replaces'] = order_id
+        if old['parent_id'] is not None:
+            parent = self.orders[old['parent_id']]
+            parent['legs'] = [new['order_id'] if leg == order_id else leg for leg in parent['legs']]
+        return new
+
+    def _fill_price(self, order, bar):
+        side, kind = order['side'], order['order_type']
+        if kind == 'market':
+            return slipped_price(bar['open'], side, self.settings['slippage_bps'])
+        if kind == 'limit':
+            limit = order['limit_price']
+            return min(bar['open'], limit) if side == 'BUY' else max(bar['open'], limit)
+        stop = order['stop_price']
+        trigger = max(bar['open'], stop) if side == 'BUY' else min(bar['open'], stop)
+        return slipped_price(trigger, side, self.settings['slippage_bps'])
+
+    def _fill(self, order, bar):
+        symbol, side, quantity = order['symbol'], order['side'], order['quantity']
+        price = self._fill_price(order, bar)
+        fee = commission(quantity, self.settings)
+        position = self.positions.get(symbol)
+
+        if side == 'BUY':
+            if order['parent_id'] is None and quantity * price > self.settings['max_capital_per_trade']:
+                return self._reject(order, f"exceeds max_capital_per_trade ${self.settings['max_capital_per_trade']}")
+            if quantity * price + fee > self.cash:
+                return self._reject(order, 'insufficient cash')
+            held, average = position or (0, 0.0)
+            self.positions[symbol] = [held + quantity, (held * average + quantity * price) / (held + quantity)]
+            self.cash -= quantity * price + fee
+        else:
+            if not position or position[0] < quantity:
+                return self._reject(order, 'insufficient position (short selling is not simulated)')
+            self.realized_pnl += quantity * (price - position[1])
+            self.cash += quantity * price - fee
+            position[0] -= quantity
+            if position[0] == 0:
+                del self.positions[symbol]
+
+        self.commissions += fee
+        order.update({'status': 'filled', 'fill_price': price, 'commission': fee, 'filled': bar['date'][:10]})
+        self.fills.append(order)
+
+        if order['parent_id'] is not None:
+            # One side of a bracket filled: cancel the other leg
+            for leg_id in self.orders[order['parent_id']].get('legs', ()):
+                if leg_id != order['order_id']:
+                    self.cancel(leg_id)
+        elif side == 'BUY' and (order['stop_price'] or order['take_profit']):
+            self._place_bracket(order)
+        return order
+
+    def _place_bracket(self, order):
+        legs = []
+        if order['order_type'] != 'stop' and order['stop_price']:
+            legs.append(self.submit(order['symbol'], 'SELL', order['quantity'], 'stop',
+                                    stop_price=order['stop_price'], parent_id=order['order_id']))
+        if order['take_profit']:
+            legs.append(self.submit(order['symbol'], 'SELL', order['quantity'], 'limit',
+                                    limit_price=order['take_profit'], parent_id=order['order_id']))
+        order['legs'] = [leg['order_id'] for leg in legs]
+
+    def on_bar(self, symbol, bar):
+        """Fill whatever this bar triggers for the symbol and mark the position; returns the fills"""
+        symbol = symbol.upper()
+        self.current_date = bar['date'][:10]
+        fills = []
+        book = self.books.get(symbol)
+        if book:
+            for order_id in book.triggered(bar):
+                order = self.orders[order_id]
+                if order['status'] == 'open' and self._fill(order, bar)['status'] == 'filled':
+                    fills.append(order)
+        self.last_close[symbol] = bar['close']
+        return fills
+
+    def run(self, bars_by_symbol, strategy=None):
+        """Replay bars of all symbols in date order; strategy(engine, symbol, bar) may place orders
+        after each bar, which can fill from the next bar on (no look-ahead)"""
+        streams = [[(bar['date'], symbol, bar) for bar in bars] for symbol, bars in bars_by_symbol.items()]
+        for _, symbol, bar in heapq.merge(*streams, key=lambda event: (event[0], event[1])):
+            self.on_bar(symbol, bar)
+            if strategy:
+                strategy(self, symbol, bar)
+        return self.account()
+
+    def open_orders(self, symbol=None):
+        return [order for order in self.orders.values()
+                if order['status'] == 'open' and (symbol is None or order['symbol'] == symbol.upper())]
+
+    def to_dict(self):
+        """JSON-safe account state; the order books are rebuilt from the open orders on load"""
+        return {
+            'cash': self.cash,
+            'starting_cash': self.starting_cash,
+            'orders': self.orders,
+            'positions': self.positions,
+            'last_close': self.last_close,
+            'daily_entries': self.daily_entries,
+            'fills': [order['order_id'] for order in self.fills],
+            'realized_pnl': self.realized_pnl,
+            'commissions': self.commissions,
+            'current_date': self.current_date,
+            'seq': self._seq
+        }
+
+    @classmethod
+    def from_dict(cls, data, settings=None):
+        engine = cls(data['starting_cash'], settings)
+        engine.cash = data['cash']
+        engine.orders = data['orders']
+        engine.positions = data['positions']
+        engine.last_close = data['last_close']
+        engine.daily_entries = data['daily_entries']
+        engine.fills = [engine.orders[order_id] for order_id in data['fills']]
+        engine.realized_pnl = data['realized_pnl']
+        engine.commissions = data['commissions']
+        engine.current_date = data['current_date']
+        engine._seq = data['seq']
+        for order_id, order in engine.orders.items():
+            if order['status'] == 'open':
+                engine.books.setdefault(order['symbol'], SymbolBook()).add(order, int(order_id[1:]))
+        return engine
+
+    def account(self):
+        market_value = sum(quantity * self.last_close.get(symbol, average)
+                           for symbol, (quantity, average) in self.positions.items())
+        equity = self.cash + market_value
+        statuses = {}
+        for order in self.orders.values():
+            statuses[order['status']] = statuses.get(order['status'], 0) + 1
+        return {
+            'cash': round(self.cash, 2),
+            'market_value': round(market_value, 2),
+            'equity': round(equity, 2),
+            'return_percent': round((equity / self.starting_cash - 1) * 100, 2),
+            'realized_pnl': round(self.realized_pnl, 2),
+            'commissions': round(self.commissions, 2),
+            'positions': {symbol: {'quantity': quantity, 'average_price': round(average, 4)}
+                          for symbol, (quantity, average) in self.positions.items()},
+            'orders': statuses
+        }
+
+
+def load_engine(path, cash=None, settings=None):
+    """The account saved at path, or a new one when there is no file yet"""
+    try:
+        with open(path) as f:
+            return PaperTradingEngine.from_dict(json.load(f), settings)
+    except FileNotFoundError:
+        return PaperTradingEngine(cash, settings)
+
+
+def save_engine(engine, path):
+    """Write the account atomically so a crash never leaves a half-written file"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(engine.to_dict(), f, indent=2)
+    os.replace(temp_path, path)
+
+
+def signal_strategy(parameters=None, min_confidence=None, config=None):
+    """Backtest strategy: buy when the signal rules say BUY, with the configured stop and take profit"""
+    from indicators import IndicatorSet, indicator_parameters
+    from portfolio import risk_settings
+    from signal_rules import flatten, load_signal_rules
+
+    parameters = parameters or indicator_parameters(config)
+    rules = load_signal_rules(config)
+    risk = risk_settings(config)
+    if min_confidence is None:
+        min_confidence = get_setting('phase_1_settings', 'min_confidence_score', default=0.7, config=config)
+    indicator_sets = {}
+
+    def strategy(engine, symbol, bar):
+        indicator_set = indicator_sets.setdefault(symbol, IndicatorSet(parameters))
+        indicator_set.update(bar)
+        if symbol.upper() in engine.positions or engine.open_orders(symbol):
+            return
+        _, recommendation, confidence = rules.evaluate(flatten(indicator_set.snapshot(), bar['close']))
+        if recommendation != 'BUY' or confidence < min_confidence:
+            return
+        price = bar['close']
+        quantity = math.floor(engine.settings['max_capital_per_trade'] / (price * (1 + engine.settings['slippage_bps'] / 10000)))
+        if quantity > 0:
+            engine.submit(symbol, 'BUY', quantity,
+                          stop_price=round(price * (1 - risk['trailing_stop_loss_percent'] / 100), 2),
+                          take_profit=round(price * (1 + risk['take_profit_target_percent'] / 100), 2))
+
+    return strategy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paper-trade the signal rules or a list of orders against daily bars")
+    parser.add_argument("--symbols", help="Comma-separated symbols (default: watchlist.json)")
+    parser.add_argument("--cash", type=float, help="Starting cash (default: PORTFOLIO_CAPITAL or 10000)")
+    parser.add_argument("--orders", help="JSON list of orders {symbol, side, quantity, entry_price, stop_price, take_profit}")
+    parser.add_argument("--account", help="Saved account to fill and update (e.g. the approval queue's)")
+    parser.add_argument("--stub", action="store_true", help="Use fake market data")
+    args = parser.parse_args()
+
+    engine = load_engine(args.account, args.cash) if args.account else PaperTradingEngine(args.cash)
+    orders = []
+    if args.orders:
+        with open(args.orders) as f:
+            orders = json.load(f)
+        symbols = sorted({order['symbol'].upper() for order in orders})
+    elif args.account:
+        symbols = sorted({order['symbol'] for order in engine.open_orders()} | set(engine.positions))
+    elif args.symbols:
+        symbols = args.symbols.split(',')
+    else:
+        from daily_pipeline import load_watchlist
+        symbols = load_watchlist()
+
+    if args.stub:
+        from local_stubs import install_lambda_stubs
+        market_data, _ = install_lambda_stubs()
+    else:
+        import lambda_market_data as market_data
+    provider = market_data.get_market_data_provider()
+    bars_by_symbol = {}
+    for symbol in symbols:
+        try:
+            bars_by_symbol[symbol.upper()] = provider.fetch_daily_bars(symbol)
+        except Exception as e:
+            print(f"⚠️  No bars for {symbol}: {e}")
+
+    if args.account:
+        # Only bars the account has not seen: after its last bar, or from the day its first order was placed
+        submitted = [order['submitted'] for order in engine.open_orders()]
+        if engine.current_date:
+            bars_by_symbol = {symbol: [bar for bar in bars if bar['date'][:10] > engine.current_date]
+                              for symbol, bars in bars_by_symbol.items()}
+        elif submitted:
+            bars_by_symbol = {symbol: [bar for bar in bars if bar['date'][:10] >= min(submitted)]
+                              for symbol, bars in bars_by_symbol.items()}
+        bars_by_symbol = {symbol: bars for symbol, bars in bars_by_symbol.items() if bars}
+
+    strategy = None
+    if orders:
+        # Orders are placed before the first bar, like approved requests waiting for the open
+        first_date = min((bars[0]['date'] for bars in bars_by_symbol.values()), default=None)
+        engine.current_date = first_date[:10] if first_date else engine.current_date
+        for order in orders:
+            print(f"  {order['symbol']}: {engine.execute(order)}")
+    elif not args.account:
+        strategy = signal_strategy()
+
+    start = time.perf_counter()
+    account = engine.run(bars_by_symbol, strategy)
+    elapsed = time.perf_counter() - start
+
+    for fill in engine.fills:
+        print(f"  {fill['filled']} {fill['side']:<4} {fill['quantity']:>4} {fill['symbol']:<6} "
+              f"@ {fill['fill_price']:.2f} ({fill['order_type']})")
+    print(json.dumps(account, indent=2))
+    if args.account:
+        save_engine(engine, args.account)
+        print(f"✓ Account saved to {args.account}")
+    print(f"Simulated {len(engine.orders)} order(s) over {sum(map(len, bars_by_symbol.values()))} bar(s) "
+          f"in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
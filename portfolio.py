@@ -0,0 +1,279 @@
+"""
+Portfolio state
+Open positions in compact array-backed columns with running risk totals.
+
+Exposure and open risk are kept as running sums: adding, closing, marking or
+moving the stop of a position adjusts the totals by that position's old and
+new contribution, so the portfolio-wide numbers used for sizing are O(1) to
+read and update no matter how many positions are open.
+"""
+
+import json
+import math
+import os
+from array import array
+
+from trading_config import get_setting
+
+PORTFOLIO_FILE = 'portfolio.json'
+DEFAULT_CAPITAL = 10000.0
+
+
+def risk_settings(config=None):
+    """Risk limits from trading_parameters.risk_management, with defaults"""
+    risk = get_setting('trading_parameters', 'risk_management', default={}, config=config) or {}
+    return {
+        'max_loss_per_trade_percent': risk.get('max_loss_per_trade_percent', 2),
+        'max_portfolio_risk_percent': risk.get('max_portfolio_risk_percent', 10),
+        'trailing_stop_loss_percent': risk.get('trailing_stop_loss_percent', 3),
+        'take_profit_target_percent': risk.get('take_profit_target_percent', 5),
+        'position_sizing_method': risk.get('position_sizing_method', 'kelly_criterion'),
+        'kelly_multiplier': risk.get('kelly_multiplier', 0.5),
+        'kelly_win_rate': risk.get('kelly_win_rate', 0.5)
+    }
+
+
+def kelly_fraction(win_rate, win_loss_ratio, multiplier=1.0):
+    """Fraction of capital to commit: (W - (1 - W) / R) * multiplier, never negative"""
+    if win_loss_ratio <= 0:
+        return 0.0
+    return max(win_rate - (1 - win_rate) / win_loss_ratio, 0.0) * multiplier
+
+
+class Portfolio:
+    """Long positions stored column-wise in typed arrays.
+
+    Closed slots are recycled, so the arrays only grow to the peak number of
+    simultaneously open positions.
+    """
+
+    def __init__(self, capital=DEFAULT_CAPITAL, cash=None, settings=None):
+        self.capital = float(capital)
+        self.cash = float(capital if cash is None else cash)
+        self.settings = settings or risk_settings()
+
+        self.quantity = array('d')
+        self.entry_price = array('d')
+        self.stop_price = array('d')
+        self.mark_price = array('d')
+        self.symbols = []
+        self.ids = []
+
+        self.slots = {}
+        self.free_slots = []
+        self.exposure = 0.0
+        self.open_risk = 0.0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _contribution(self, slot):
+        quantity = self.quantity[slot]
+        mark = self.mark_price[slot]
+        return quantity * mark, quantity * max(mark - self.stop_price[slot], 0.0)
+
+    def _apply(self, slot, sign):
+        exposure, risk = self._contribution(slot)
+        self.exposure += sign * exposure
+        self.open_risk += sign * risk
+
+    def add_position(self, position_id, symbol, quantity, entry_price, stop_price=None, mark_price=None):
+        """Open (or replace) a position; the stop defaults to the trailing stop percentage"""
+        if position_id in self.slots:
+            self.close_position(position_id)
+        if stop_price is None:
+            stop_price = entry_price * (1 - self.settings['trailing_stop_loss_percent'] / 100)
+        values = (float(quantity), float(entry_price), float(stop_price), float(mark_price or entry_price))
+
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.quantity[slot], self.entry_price[slot], self.stop_price[slot], self.mark_price[slot] = values
+            self.symbols[slot] = symbol
+            self.ids[slot] = position_id
+        else:
+            slot = len(self.ids)
+            for column, value in zip((self.quantity, self.entry_price, self.stop_price, self.mark_price), values):
+                column.append(value)
+            self.symbols.append(symbol)
+            self.ids.append(position_id)
+
+        self.slots[position_id] = slot
+        self.cash -= values[0] * values[1]
+        self._apply(slot, 1)
+        return slot
+
+    def close_position(self, position_id, exit_price=None):
+        """Close a position and return its realized P&L"""
+        slot = self.slots.pop(position_id)
+        self._apply(slot, -1)
+        price = self.mark_price[slot] if exit_price is None else exit_price
+        quantity = self.quantity[slot]
+        self.cash += quantity * price
+        pnl = quantity * (price - self.entry_price[slot])
+        self.capital += pnl
+        self.quantity[slot] = 0.0
+        self.symbols[slot] = None
+        self.ids[slot] = None
+        self.free_slots.append(slot)
+        return pnl
+
+    def mark(self, position_id, price):
+        """Update a position's market price"""
+        slot = self.slots[position_id]
+        self._apply(slot, -1)
+        self.mark_price[slot] = price
+        self._apply(slot, 1)
+
+    def move_stop(self, position_id, stop_price):
+        """Update a position's stop (e.g. after a trailing stop ratchets)"""
+        slot = self.slots[position_id]
+        self._apply(slot, -1)
+        self.stop_price[slot] = stop_price
+        self._apply(slot, 1)
+
+    def risk_summary(self):
+        max_risk = self.capital * self.settings['max_portfolio_risk_percent'] / 100
+        return {
+            'capital': round(self.capital, 2),
+            'cash': round(self.cash, 2),
+            'open_positions': len(self.slots),
+            'exposure': round(self.exposure, 2),
+            'exposure_percent': round(self.exposure / self.capital * 100, 2) if self.capital else None,
+            'open_risk': round(self.open_risk, 2),
+            'open_risk_percent': round(self.open_risk / self.capital * 100, 2) if self.capital else None,
+            'risk_budget_remaining': round(max(max_risk - self.open_risk, 0.0), 2)
+        }
+
+    def size_position(self, symbol, entry_price, stop_price=None, win_rate=None, win_loss_ratio=None):
+        """Share count for a new long position under Kelly sizing and the risk limits.
+
+        win_rate defaults to kelly_win_rate, the measured BUY hit rate from
+        recommendation_log.py --score (0.5 until set), and win_loss_ratio to
+        take-profit / trailing-stop percentages. The result is the smallest of
+        the Kelly allocation, the per-trade loss cap, the remaining portfolio
+        risk budget and available cash.
+        """
+        s = self.settings
+        if stop_price is None:
+            stop_price = entry_price * (1 - s['trailing_stop_loss_percent'] / 100)
+        risk_per_share = entry_price - stop_price
+        if entry_price <= 0 or risk_per_share <= 0:
+            return {'symbol': symbol, 'shares': 0, 'error': 'Stop price must be below the entry price'}
+
+        if win_rate is None:
+            win_rate = s['kelly_win_rate']
+        if win_loss_ratio is None:
+            win_loss_ratio = s['take_profit_target_percent'] / s['trailing_stop_loss_percent']
+
+        fraction = 1.0
+        if s['position_sizing_method'] == 'kelly_criterion':
+            fraction = kelly_fraction(win_rate, win_loss_ratio, s['kelly_multiplier'])
+
+        max_trade_loss = self.capital * s['max_loss_per_trade_percent'] / 100
+        risk_budget = max(self.capital * s['max_portfolio_risk_percent'] / 100 - self.open_risk, 0.0)
+        limits = {
+            'kelly': self.capital * fraction / entry_price,
+            'max_loss_per_trade': max_trade_loss / risk_per_share,
+            'portfolio_risk_budget': risk_budget / risk_per_share,
+            'cash': max(self.cash, 0.0) / entry_price
+        }
+        limited_by = min(limits, key=limits.get)
+        shares = math.floor(limits[limited_by])
+
+        return {
+            'symbol': symbol,
+            'shares': shares,
+            'entry_price': round(entry_price, 2),
+            'stop_price': round(stop_price, 2),
+            'position_value': round(shares * entry_price, 2),
+            'risk_amount': round(shares * risk_per_share, 2),
+            'risk_percent': round(shares * risk_per_share / self.capital * 100, 2) if self.capital else None,
+            'kelly_fraction': round(fraction, 4),
+            'limited_by': limited_by
+        }
+
+    def positions(self):
+        """Open positions as dicts (the portfolio.json format)"""
+        return [{
+            'id': position_id,
+            'symbol': self.symbols[slot],
+            'quantity': self.quantity[slot],
+            'entry_price': self.entry_price[slot],
+            'stop_price': self.stop_price[slot],
+            'mark_price': self.mark_price[slot]
+        } for position_id, slot in self.slots.items()]
+
+
+def assign_position_ids(positions):
+    """Give rows without an id the default f"{symbol}-{row number}", skipping ids in use.
+
+    Returns True if any row changed. Every reader of portfolio.json uses this,
+    so an id-less row gets the same id wherever it is loaded.
+    """
+    used = {position['id'] for position in positions if position.get('id')}
+    changed = False
+    for i, position in enumerate(positions):
+        if position.get('id'):
+            continue
+        number = i + 1
+        while f"{position['symbol']}-{number}" in used:
+            number += 1
+        position['id'] = f"{position['symbol']}-{number}"
+        used.add(position['id'])
+        changed = True
+    return changed
+
+
+def load_portfolio(path=PORTFOLIO_FILE, capital=None):
+    """Build a Portfolio from portfolio.json; capital falls back to PORTFOLIO_CAPITAL"""
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+
+    if capital is None:
+        capital = data.get('capital') or float(os.environ.get('PORTFOLIO_CAPITAL', DEFAULT_CAPITAL))
+    portfolio = Portfolio(capital)
+    positions = data.get('positions', [])
+    assign_position_ids(positions)
+    for position in positions:
+        portfolio.add_position(
+            position['id'],
+            position['symbol'],
+            position['quantity'],
+            position['entry_price'],
+            stop_price=position.get('stop_price'),
+            mark_price=position.get('mark_price')
+        )
+    if data.get('cash') is not None:
+        portfolio.cash = float(data['cash'])
+    return portfolio
+
+
+def save_portfolio(portfolio, path=PORTFOLIO_FILE):
+    """Write capital, cash and positions back, keeping any other keys in the file.
+
+    Positions are merged into the rows already in the file, so fields other
+    tools own (price_alerts' target_price and high_water_mark) survive. Rows
+    for positions no longer open here are dropped. Trailing stops only
+    ratchet up, so the higher of the file's and the portfolio's stop is kept.
+    """
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    current = {position['id']: position for position in portfolio.positions()}
+    rows = data.get('positions', [])
+    assign_position_ids(rows)
+    positions = []
+    for row in rows:
+        position = current.pop(row['id'], None)
+        if position is None:
+            continue
+        position['stop_price'] = max(position['stop_price'], row.get('stop_price') or 0.0)
+        row.update(position)
+        positions.append(row)
+    positions.extend(current.values())
+    data.update({'capital': portfolio.capital, 'cash': portfolio.cash, 'positions': positions})
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
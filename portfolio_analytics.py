@@ -0,0 +1,131 @@
+"""
+Portfolio analytics
+Return correlations and sector concentration checks across the watchlist.
+
+Used by the notification Lambda to review the daily summary before it is
+sent: BUY recommendations beyond the per-sector limit are held back, and
+same-direction recommendations whose returns move together are flagged.
+"""
+
+import json
+import math
+import os
+
+from trading_config import MODULE_DIR, get_setting
+
+WATCHLIST_FILE = os.path.join(MODULE_DIR, 'watchlist.json')
+
+
+def analytics_settings(config=None):
+    risk = get_setting('trading_parameters', 'risk_management', default={}, config=config) or {}
+    return {
+        'max_buys_per_sector': risk.get('max_buys_per_sector', 2),
+        'correlation_threshold': risk.get('correlation_threshold', 0.8),
+        'correlation_window_days': risk.get('correlation_window_days', 60)
+    }
+
+
+def load_sectors(path=WATCHLIST_FILE):
+    """Symbol -> sector from watchlist.json (empty if the file is missing)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {item['symbol']: item.get('sector', 'Unknown') for item in json.load(f).get('watchlist', [])}
+
+
+def returns_from_closes(closes, window):
+    """Simple returns over the last window periods of a chronological close series"""
+    closes = closes[-(window + 1):]
+    return [(b - a) / a for a, b in zip(closes, closes[1:]) if a]
+
+
+def correlation_matrix(closes_by_symbol, window=60):
+    """Pearson correlation of returns for every pair of symbols.
+
+    Each return series is standardized once, then the whole matrix is a
+    single product Z @ Z.T / n. Series are truncated to their common length;
+    symbols with constant prices are dropped. Returns (symbols, matrix).
+    """
+    series = {symbol: returns_from_closes(closes, window) for symbol, closes in closes_by_symbol.items()}
+    length = min((len(returns) for returns in series.values()), default=0)
+    if length < 2:
+        return [], []
+
+    symbols = []
+    standardized = []
+    for symbol, returns in sorted(series.items()):
+        returns = returns[-length:]
+        mean = sum(returns) / length
+        std = math.sqrt(sum((r - mean) ** 2 for r in returns) / length)
+        if std == 0:
+            continue
+        symbols.append(symbol)
+        standardized.append([(r - mean) / std for r in returns])
+
+    matrix = [[sum(a * b for a, b in zip(row, other)) / length for other in standardized]
+              for row in standardized]
+    return symbols, matrix
+
+
+def flag_correlated(recommendations, symbols, matrix, threshold=0.8):
+    """Annotate BUY/SELL recommendations with same-direction peers correlated above threshold"""
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    flagged = []
+    for rec in recommendations:
+        i = index.get(rec['symbol'])
+        if i is None or rec.get('recommendation') not in ('BUY', 'SELL'):
+            continue
+        peers = [
+            other['symbol'] for other in recommendations
+            if other is not rec
+            and other.get('recommendation') == rec['recommendation']
+            and other['symbol'] in index
+            and matrix[i][index[other['symbol']]] >= threshold
+        ]
+        if peers:
+            rec['correlated_with'] = peers
+            flagged.append(rec['symbol'])
+    return flagged
+
+
+def apply_sector_limits(recommendations, sectors, max_buys_per_sector=2):
+    """Keep at most max_buys_per_sector BUYs per sector, highest confidence first.
+
+    Returns (kept, held_back); non-BUY recommendations are always kept.
+    """
+    ranked = sorted(recommendations, key=lambda rec: rec.get('confidence', 0), reverse=True)
+    counts = {}
+    kept, held_back = [], []
+    for rec in ranked:
+        if rec.get('recommendation') != 'BUY':
+            kept.append(rec)
+            continue
+        sector = sectors.get(rec['symbol'], 'Unknown')
+        if counts.get(sector, 0) >= max_buys_per_sector:
+            held_back.append(dict(rec, held_back_reason=f"{sector} already has {max_buys_per_sector} BUY recommendation(s)"))
+            continue
+        counts[sector] = counts.get(sector, 0) + 1
+        kept.append(rec)
+    return kept, held_back
+
+
+def flag_correlations(recommendations, closes_by_symbol, settings=None):
+    """Correlation flags among exactly these recommendations (annotated in place)"""
+    if not closes_by_symbol:
+        return []
+    settings = settings or analytics_settings()
+    symbols, matrix = correlation_matrix(closes_by_symbol, settings['correlation_window_days'])
+    return flag_correlated(recommendations, symbols, matrix, settings['correlation_threshold'])
+
+
+def review_recommendations(recommendations, closes_by_symbol=None, sectors=None, settings=None):
+    """Sector limits plus correlation flags for a batch of recommendations"""
+    settings = settings or analytics_settings()
+    sectors = load_sectors() if sectors is None else sectors
+
+    kept, held_back = apply_sector_limits(
+        [dict(rec) for rec in recommendations], sectors, settings['max_buys_per_sector']
+    )
+    correlated = flag_correlations(kept, closes_by_symbol, settings)
+
+    return {'recommendations': kept, 'held_back': held_back, 'correlated': correlated}
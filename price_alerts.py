@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Price Alert Engine
+Watches open positions for trailing stop-loss and take-profit triggers.
+
+Positions are indexed per symbol by trigger price (sorted lists + bisect), so
+each price tick finds the stops and targets it crosses in O(log n) and only
+touches the positions that actually fire or whose trailing stop moves.
+Alerts go out through the email notification Lambda. Only long positions
+are supported, matching the swing-trading strategy.
+
+Positions are read from portfolio.json:
+  {"positions": [{"id": "AAPL-1", "symbol": "AAPL", "quantity": 5, "entry_price": 175.5}]}
+id is optional: missing ids are assigned on load and written back.
+stop_price/target_price default to the trailing stop and take-profit
+percentages in config; ratcheted stops are written back after each check.
+The file is shared with portfolio.py, so saving only updates the fields this
+engine owns and drops positions it closed; everything else is kept.
+
+Usage:
+  python3 price_alerts.py --once                      # check latest prices, then exit
+  python3 price_alerts.py --interval-minutes 15       # keep polling
+  python3 price_alerts.py --once --stub               # offline with fake market data
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from portfolio import assign_position_ids
+from trading_config import get_setting
+
+POSITIONS_FILE = 'portfolio.json'
+NOTIFICATION_FUNCTION = 'TradingAgent-EmailNotification'
+
+
+class SymbolBook:
+    """Stops (ascending) and targets (ascending) for one symbol, grouped by trigger price"""
+
+    def __init__(self):
+        self.stop_prices = []
+        self.stop_groups = []
+        self.target_prices = []
+        self.target_groups = []
+
+    @staticmethod
+    def _insert(prices, groups, price, position_id):
+        index = bisect_left(prices, price)
+        if index < len(prices) and prices[index] == price:
+            groups[index].append(position_id)
+        else:
+            prices.insert(index, price)
+            groups.insert(index, [position_id])
+
+    def add(self, position_id, stop_price, target_price):
+        self._insert(self.stop_prices, self.stop_groups, stop_price, position_id)
+        if target_price is not None:
+            self._insert(self.target_prices, self.target_groups, target_price, position_id)
+
+    def pop_stops_at_or_above(self, price):
+        """Remove and return ids whose stop is >= price (the stop was hit)"""
+        index = bisect_left(self.stop_prices, price)
+        hit = [pid for group in self.stop_groups[index:] for pid in group]
+        del self.stop_prices[index:], self.stop_groups[index:]
+        return hit
+
+    def pop_targets_at_or_below(self, price):
+        """Remove and return ids whose take-profit target is <= price"""
+        index = bisect_right(self.target_prices, price)
+        hit = [pid for group in self.target_groups[:index] for pid in group]
+        del self.target_prices[:index], self.target_groups[:index]
+        return hit
+
+    def raise_stops_below(self, level):
+        """Ratchet every stop below level up to level; returns the ids that moved"""
+        index = bisect_left(self.stop_prices, level)
+        if index == 0:
+            return []
+        moved = [pid for group in self.stop_groups[:index] for pid in group]
+        del self.stop_prices[:index], self.stop_groups[:index]
+        self.stop_prices.insert(0, level)
+        self.stop_groups.insert(0, list(moved))
+        return moved
+
+
+class PriceAlertEngine:
+    """Holds long positions in memory and evaluates each price update against them"""
+
+    def __init__(self, trailing_stop_percent=None, take_profit_percent=None, notifier=None):
+        risk = get_setting('trading_parameters', 'risk_management', default={}) or {}
+        self.trailing_stop = (trailing_stop_percent if trailing_stop_percent is not None
+                              else risk.get('trailing_stop_loss_percent', 3)) / 100
+        self.take_profit = (take_profit_percent if take_profit_percent is not None
+                            else risk.get('take_profit_target_percent', 5)) / 100
+        self.notifier = notifier
+        self.positions = {}
+        self.books = {}
+        self.closed = set()
+        self._ids = itertools.count(1)
+
+    def add_position(self, position):
+        """Track a position: {'id', 'symbol', 'quantity', 'entry_price', optional 'stop_price'/'target_price'}"""
+        position = dict(position)
+        if 'id' not in position:
+            # Ids only ever count up, so a removed position's id is never handed out again
+            position_id = f"{position['symbol']}-{next(self._ids)}"
+            while position_id in self.positions or position_id in self.closed:
+                position_id = f"{position['symbol']}-{next(self._ids)}"
+            position['id'] = position_id
+        entry = position['entry_price']
+        position.setdefault('stop_price', round(entry * (1 - self.trailing_stop), 4))
+        position.setdefault('target_price', round(entry * (1 + self.take_profit), 4))
+        position.setdefault('high_water_mark', entry)
+
+        self.positions[position['id']] = position
+        self.closed.discard(position['id'])
+        book = self.books.setdefault(position['symbol'], SymbolBook())
+        book.add(position['id'], position['stop_price'], position['target_price'])
+        return position['id']
+
+    def remove_position(self, position_id):
+        """Stop tracking a position (entries left in the book are skipped lazily)"""
+        self.closed.add(position_id)
+        return self.positions.pop(position_id, None)
+
+    def on_price(self, symbol, price, timestamp=None):
+        """Evaluate one tick; returns the alerts it produced"""
+        book = self.books.get(symbol)
+        if book is None:
+            return []
+
+        alerts = []
+        for position_id in book.pop_stops_at_or_above(price):
+            alerts.extend(self._close(position_id, 'stop_loss_triggered', price, timestamp))
+        for position_id in book.pop_targets_at_or_below(price):
+            alerts.extend(self._close(position_id, 'take_profit_reached', price, timestamp))
+
+        level = round(price * (1 - self.trailing_stop), 4)
+        for position_id in book.raise_stops_below(level):
+            position = self.positions.get(position_id)
+            if position:
+                position['stop_price'] = level
+                position['high_water_mark'] = max(position['high_water_mark'], price)
+
+        for alert in alerts:
+            if self.notifier:
+                self.notifier(alert['alert_type'], alert['data'])
+        return alerts
+
+    def _close(self, position_id, alert_type, price, timestamp):
+        if position_id in self.closed or position_id not in self.positions:
+            return []
+        position = self.remove_position(position_id)
+        pnl_percent = (price - position['entry_price']) / position['entry_price'] * 100
+        return [{
+            'alert_type': alert_type,
+            'data': {
+                'position_id': position_id,
+                'symbol': position['symbol'],
+                'quantity': position.get('quantity'),
+                'entry_price': position['entry_price'],
+                'trigger_price': position['stop_price'] if alert_type == 'stop_loss_triggered' else position['target_price'],
+                'price': price,
+                'pnl_percent': round(pnl_percent, 2),
+                'timestamp': timestamp or datetime.utcnow().isoformat()
+            }
+        }]
+
+    def run(self, stream):
+        """Consume (symbol, price[, timestamp]) updates until the stream ends"""
+        alerts = []
+        for update in stream:
+            alerts.extend(self.on_price(*update))
+        return alerts
+
+    def symbols(self):
+        return sorted({p['symbol'] for p in self.positions.values()})
+
+
+def lambda_notifier(function_name=NOTIFICATION_FUNCTION, region='us-west-2'):
+    """Send alerts asynchronously through the email notification Lambda"""
+    import boto3
+
+    lambda_client = boto3.client('lambda', region_name=region)
+
+    def notify(alert_type, data):
+        lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'alert_type': alert_type, 'data': data}).encode()
+        )
+
+    return notify
+
+
+def load_positions(path=POSITIONS_FILE):
+    """Open positions from the file; rows without an id get one, written back so later saves can match them"""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        data = json.load(f)
+    positions = data.get('positions', [])
+    if assign_position_ids(positions):
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+    return positions
+
+
+ENGINE_FIELDS = ('stop_price', 'target_price', 'high_water_mark')
+
+
+def save_positions(engine, path=POSITIONS_FILE):
+    """Persist ratcheted stops and closed positions for the next run.
+
+    The file is re-read first: positions keep the fields other tools wrote
+    (e.g. portfolio.py's mark_price), positions added since they were loaded
+    are kept, and only positions this engine closed are dropped.
+    """
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    rows = data.get('positions', [])
+    assign_position_ids(rows)
+    positions = []
+    saved = set()
+    for position in rows:
+        position_id = position['id']
+        if position_id in engine.closed:
+            continue
+        if position_id in engine.positions:
+            tracked = engine.positions[position_id]
+            position.update({field: tracked[field] for field in ENGINE_FIELDS})
+            saved.add(position_id)
+        positions.append(position)
+    positions.extend(p for position_id, p in engine.positions.items() if position_id not in saved)
+    data['positions'] = positions
+    data['last_updated'] = datetime.utcnow().isoformat()
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def latest_prices(provider, symbols, interval=None):
+    """Latest close per symbol from the market data provider"""
+    prices = {}
+    for symbol in symbols:
+        try:
+            if interval:
+                bars = provider.fetch_intraday_bars(symbol, interval)
+            else:
+                bars = provider.fetch_daily_bars(symbol)
+            prices[symbol] = (bars[-1]['close'], bars[-1]['date'])
+        except Exception as e:
+            print(f"⚠️  No price for {symbol}: {e}")
+    return prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate stop-loss and take-profit alerts for open positions")
+    parser.add_argument("--positions", default=POSITIONS_FILE, help="Positions file")
+    parser.add_argument("--once", action="store_true", help="Check once and exit")
+    parser.add_argument("--interval-minutes", type=int,
+                        default=get_setting('market_data', 'update_frequency_minutes', default=15))
+    parser.add_argument("--stub", action="store_true", help="Fake market data and print alerts instead of emailing")
+    args = parser.parse_args()
+
+    if args.stub:
+        from local_stubs import install_lambda_stubs
+        market_data, _ = install_lambda_stubs()
+        notifier = lambda alert_type, data: print(f"📬 {alert_type}: {json.dumps(data)}")
+    else:
+        import lambda_market_data as market_data
+        notifier = lambda_notifier()
+
+    provider = market_data.get_market_data_provider()
+    interval = market_data.default_interval()
+
+    engine = PriceAlertEngine(notifier=notifier)
+    for position in load_positions(args.positions):
+        engine.add_position(position)
+    print(f"Watching {len(engine.positions)} position(s) in {', '.join(engine.symbols()) or 'no symbols'}")
+
+    while engine.positions:
+        prices = latest_prices(provider, engine.symbols(), interval)
+        for symbol, (price, timestamp) in prices.items():
+            for alert in engine.on_price(symbol, price, timestamp):
+                print(f"🔔 {alert['alert_type']}: {alert['data']['symbol']} @ {price}")
+        save_positions(engine, args.positions)
+
+        if args.once:
+            break
+        time.sleep(args.interval_minutes * 60)
+
+    print(f"✓ {len(engine.positions)} position(s) still open")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,895 @@
+#!/usr/bin/env python3
+"""
+Infrastructure Provisioner
+Dependency-graph setup of all Trading Agent AWS resources.
+
+Independent steps (Lambdas, Cognito, Memory, IAM roles) run concurrently,
+fixed sleeps are replaced by waiters/polling, and resource IDs are cached in
+a single state file so re-runs skip anything that has already converged.
+
+Optional DynamoDB tables (see DYNAMODB_TABLES) are opt-in: a table is only
+created when its name is set in config.json or its environment variable.
+The Lambda role is then granted access and the Lambdas that use the table
+get the name in their environment.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import boto3
+from botocore.exceptions import ClientError
+
+from lambda_builder import build_function_package, deploy_function, ensure_layer
+from trading_config import get_setting
+
+REGION = os.environ.get('AWS_REGION', 'us-west-2')
+STATE_FILE = 'infrastructure_state.json'
+
+LAMBDA_ROLE_NAME = 'TradingAgentLambdaRole'
+GATEWAY_ROLE_NAME = 'TradingAgentGatewayRole'
+RUNTIME_ROLE_NAME = 'TradingAgentRuntimeRole'
+COGNITO_POOL_NAME = 'trading-agent-pool'
+GATEWAY_NAME = 'TradingAgentGateway'
+MEMORY_NAME = 'trading_agent_memory'
+SCHEDULE_RULE_NAME = 'trading-agent-daily-analysis'
+SCHEDULE_EXPRESSION = 'cron(0 14 * * ? *)'  # 8 AM CST
+
+LAMBDA_POLICIES = [
+    'arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole',
+    'arn:aws:iam::aws:policy/AmazonSSMReadOnlyAccess',
+    'arn:aws:iam::aws:policy/AmazonSESFullAccess'
+]
+
+MARKET_DATA_TOOL_SCHEMA = [{
+    "name": "analyze_stock",
+    "description": "Fetch and analyze stock market data with technical indicators (RSI, MACD, EMA, Bollinger Bands, ATR, ADX, Stochastic, OBV, VWAP). If the data provider is down, returns the last known good analysis with stale=true and data_as_of",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "symbol": {
+                "type": "string",
+                "description": "Stock ticker symbol (e.g., AAPL, MSFT, GOOGL)"
+            },
+            "mode": {
+                "type": "string",
+                "enum": ["daily", "intraday", "multi_timeframe"],
+                "description": "daily (default), intraday bars, or multi_timeframe for daily signals confirmed by weekly/monthly trend"
+            },
+            "interval": {
+                "type": "string",
+                "enum": ["1min", "5min", "15min"],
+                "description": "Intraday bar size (intraday mode only, default 15min)"
+            }
+        },
+        "required": ["symbol"]
+    }
+}]
+
+NOTIFICATION_TOOL_SCHEMA = [{
+    "name": "send_email_notification",
+    "description": "Send email notification for trading alerts and daily summaries",
+    "inputSchema": {
+        "type": "object",
+        "properties": {
+            "alert_type": {
+                "type": "string",
+                "enum": ["high_confidence_opportunity", "stop_loss_triggered", "take_profit_reached", "daily_summary",
+                         "trade_approval_request"],
+                "description": "Type of alert to send"
+            },
+            "data": {
+                "type": "object",
+                "description": "Alert data to include in email (recommendations, prices, etc.). For daily_summary, optional closes ({symbol: [chronological closes]}) enables correlation flags"
+            }
+        },
+        "required": ["alert_type", "data"]
+    }
+}]
+
+LAMBDA_FUNCTIONS = {
+    'market_data': {
+        'function_name': 'TradingAgent-MarketData',
+        'sources': ['lambda_market_data.py', 'market_data_providers.py', 'indicators.py',
+                    'signal_rules.py', 'timeframes.py', 'analysis_cache.py', 'ttl_cache.py',
+                    'recommendation_log.py', 'circuit_breaker.py', 'trading_config.py',
+                    'config.template.json'],
+        'handler': 'lambda_market_data.lambda_handler',
+        'description': 'Fetches and analyzes stock market data',
+        'target_name': 'MarketDataAnalyzer',
+        'target_description': 'Fetches and analyzes stock market data with technical indicators',
+        'tool_schema': MARKET_DATA_TOOL_SCHEMA
+    },
+    'notification': {
+        'function_name': 'TradingAgent-EmailNotification',
+        'sources': ['lambda_notification.py', 'portfolio_analytics.py', 'trading_config.py',
+                    'config.template.json', 'watchlist.json'],
+        'handler': 'lambda_notification.lambda_handler',
+        'description': 'Sends email notifications for trading alerts',
+        'target_name': 'EmailNotifier',
+        'target_description': 'Sends email notifications for trading alerts',
+        'tool_schema': NOTIFICATION_TOOL_SCHEMA
+    },
+    'pipeline': {
+        'function_name': 'TradingAgent-DailyPipeline',
+        'sources': ['daily_pipeline.py', 'portfolio_analytics.py', 'recommendation_log.py',
+                    'trading_config.py', 'config.template.json', 'watchlist.json'],
+        'handler': 'daily_pipeline.lambda_handler',
+        'description': 'Scheduled watchlist analysis and daily summary email',
+        'timeout': 300,
+        'invokes': ['market_data', 'notification'],
+        'uses_bedrock': True
+    }
+}
+
+# Opt-in tables: created only when named by env_var or the config setting
+DYNAMODB_TABLES = {
+    'recommendation_log': {
+        'env_var': 'RECOMMENDATION_LOG_TABLE',
+        'setting': ('recommendation_log', 'table'),
+        'key_schema': [
+            {'AttributeName': 'symbol', 'KeyType': 'HASH'},
+            {'AttributeName': 'sort_key', 'KeyType': 'RANGE'}
+        ],
+        'attributes': {'symbol': 'S', 'sort_key': 'S', 'recommendation': 'S', 'date': 'S'},
+        'indexes': {
+            'recommendation-date-index': [
+                {'AttributeName': 'recommendation', 'KeyType': 'HASH'},
+                {'AttributeName': 'date', 'KeyType': 'RANGE'}
+            ]
+        },
+        'ttl_attribute': None,
+        'actions': ['dynamodb:PutItem', 'dynamodb:Query'],
+        'lambdas': ['market_data', 'pipeline']
+    },
+    'analysis_cache': {
+        'env_var': 'ANALYSIS_CACHE_TABLE',
+        'setting': ('market_data', 'analysis_cache_table'),
+        'key_schema': [{'AttributeName': 'cache_key', 'KeyType': 'HASH'}],
+        'attributes': {'cache_key': 'S'},
+        'indexes': {},
+        'ttl_attribute': 'expires_at',
+        'actions': ['dynamodb:GetItem', 'dynamodb:PutItem'],
+        'lambdas': ['market_data']
+    },
+    'approval_queue': {
+        'env_var': 'APPROVAL_QUEUE_TABLE',
+        'setting': ('phase_2_settings', 'approval_table'),
+        'key_schema': [{'AttributeName': 'request_id', 'KeyType': 'HASH'}],
+        'attributes': {'request_id': 'S', 'status': 'S', 'expires_at': 'N'},
+        'indexes': {
+            'status-expires-index': [
+                {'AttributeName': 'status', 'KeyType': 'HASH'},
+                {'AttributeName': 'expires_at', 'KeyType': 'RANGE'}
+            ]
+        },
+        'ttl_attribute': None,
+        'actions': ['dynamodb:GetItem', 'dynamodb:PutItem', 'dynamodb:UpdateItem', 'dynamodb:Query'],
+        'lambdas': []
+    }
+}
+
+
+def table_name(key):
+    """Configured name of an optional table, or None when it is not enabled"""
+    spec = DYNAMODB_TABLES[key]
+    return os.environ.get(spec['env_var']) or get_setting(*spec['setting']) or None
+
+
+def lambda_permissions_policy(key, region, account_id):
+    """Inline policy for a Lambda that calls other Lambdas or Bedrock (None if it needs neither)"""
+    spec = LAMBDA_FUNCTIONS[key]
+    statements = []
+    if spec.get('invokes'):
+        statements.append({
+            "Effect": "Allow",
+            "Action": "lambda:InvokeFunction",
+            "Resource": [f"arn:aws:lambda:{region}:{account_id}:function:{LAMBDA_FUNCTIONS[other]['function_name']}"
+                         for other in spec['invokes']]
+        })
+    if spec.get('uses_bedrock'):
+        statements.append({
+            "Effect": "Allow",
+            "Action": "bedrock:InvokeModel",
+            "Resource": ["arn:aws:bedrock:*::foundation-model/*",
+                         f"arn:aws:bedrock:{region}:{account_id}:inference-profile/*"]
+        })
+    if not statements:
+        return None
+    return {"Version": "2012-10-17", "Statement": statements}
+
+
+def poll_until(check, timeout=300, initial_delay=1, max_delay=15, description='resource'):
+    """Call check() with exponential backoff until it returns a truthy value"""
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        result = check()
+        if result:
+            return result
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for {description}")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+def retry_while_propagating(call, error_codes=('InvalidParameterValueException',), timeout=120):
+    """Retry a call that fails until a freshly created IAM role becomes assumable"""
+    deadline = time.monotonic() + timeout
+    delay = 1
+    while True:
+        try:
+            return call()
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code not in error_codes or time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 10)
+
+
+def ensure_role(iam, role_name, service, description):
+    """Create an IAM role if it does not exist and wait until it is visible"""
+    try:
+        return iam.get_role(RoleName=role_name)['Role']['Arn'], False
+    except iam.exceptions.NoSuchEntityException:
+        pass
+
+    trust_policy = {
+        "Version": "2012-10-17",
+        "Statement": [{
+            "Effect": "Allow",
+            "Principal": {"Service": service},
+            "Action": "sts:AssumeRole"
+        }]
+    }
+    role_arn = iam.create_role(
+        RoleName=role_name,
+        AssumeRolePolicyDocument=json.dumps(trust_policy),
+        Description=description
+    )['Role']['Arn']
+    iam.get_waiter('role_exists').wait(RoleName=role_name)
+    return role_arn, True
+
+
+class ProvisioningState:
+    """Resource IDs for every completed step, persisted in one JSON file"""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+        else:
+            self.data = {}
+
+    def get(self, step_name):
+        with self._lock:
+            return dict(self.data.get(step_name, {}))
+
+    def set(self, step_name, outputs):
+        with self._lock:
+            self.data[step_name] = outputs
+            with open(self.path, 'w') as f:
+                json.dump(self.data, f, indent=2)
+
+
+class Step:
+    """A provisioning step: a function of the provisioner plus the steps it depends on"""
+
+    def __init__(self, name, run, depends_on=()):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+
+
+class Provisioner:
+    """Runs provisioning steps concurrently in dependency order"""
+
+    def __init__(self, session=None, state_path=STATE_FILE, max_workers=4,
+                 alpha_vantage_key=None, notification_email=None):
+        self.session = session or boto3.Session(region_name=REGION)
+        self.region = self.session.region_name or REGION
+        self.state = ProvisioningState(state_path)
+        self.max_workers = max_workers
+        self.alpha_vantage_key = alpha_vantage_key or os.environ.get('ALPHA_VANTAGE_API_KEY')
+        self.notification_email = notification_email or os.environ.get('NOTIFICATION_EMAIL')
+        self.timings = {}
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+        self.steps = [
+            Step('parameters', self.ensure_parameters),
+            Step('lambda_role', self.ensure_lambda_role),
+            Step('dependency_layer', self.ensure_dependency_layer),
+            Step('market_data_lambda', lambda: self.ensure_lambda('market_data'),
+                 ['lambda_role', 'dependency_layer'] + self.table_steps('market_data')),
+            Step('notification_lambda', lambda: self.ensure_lambda('notification'),
+                 ['lambda_role', 'dependency_layer'] + self.table_steps('notification')),
+            Step('pipeline_lambda', lambda: self.ensure_lambda('pipeline'),
+                 ['lambda_role', 'dependency_layer'] + self.table_steps('pipeline')),
+            Step('pipeline_schedule', self.ensure_pipeline_schedule, ['pipeline_lambda']),
+            Step('ses_identity', self.ensure_ses_identity),
+            Step('cognito', self.ensure_cognito),
+            Step('memory', self.ensure_memory),
+            Step('gateway_role', self.ensure_gateway_role),
+            Step('runtime_role', self.ensure_runtime_role),
+            Step('gateway', self.ensure_gateway, ['cognito', 'gateway_role']),
+            Step('market_data_target', lambda: self.ensure_gateway_target('market_data'),
+                 ['gateway', 'market_data_lambda']),
+            Step('notification_target', lambda: self.ensure_gateway_target('notification'),
+                 ['gateway', 'notification_lambda']),
+        ]
+        for key in DYNAMODB_TABLES:
+            self.steps.append(Step(f'{key}_table', lambda key=key: self.ensure_table(key), ['lambda_role']))
+
+    def table_steps(self, lambda_key):
+        """Table steps a Lambda depends on (its environment names the tables)"""
+        return [f'{key}_table' for key, spec in DYNAMODB_TABLES.items() if lambda_key in spec['lambdas']]
+
+    def table_environment(self, lambda_key):
+        """Environment variables naming the provisioned tables a Lambda uses"""
+        environment = {}
+        for key, spec in DYNAMODB_TABLES.items():
+            name = self.state.get(f'{key}_table').get('table_name')
+            if lambda_key in spec['lambdas'] and name:
+                environment[spec['env_var']] = name
+        return environment
+
+    def client(self, service):
+        """boto3 clients are created once and shared between worker threads"""
+        with self._clients_lock:
+            if service not in self._clients:
+                self._clients[service] = self.session.client(service, region_name=self.region)
+            return self._clients[service]
+
+    def account_id(self):
+        return self.client('sts').get_caller_identity()['Account']
+
+    # ------------------------------------------------------------------
+    # Steps
+    # ------------------------------------------------------------------
+
+    def ensure_parameters(self):
+        ssm = self.client('ssm')
+        parameters = [
+            ('/trading-agent/alpha-vantage-api-key', self.alpha_vantage_key, 'SecureString',
+             'Alpha Vantage API key for market data'),
+            ('/trading-agent/notification-email', self.notification_email, 'String',
+             'Email address for trading notifications'),
+        ]
+        changed = False
+        for name, value, param_type, description in parameters:
+            try:
+                current = ssm.get_parameter(Name=name, WithDecryption=True)['Parameter']['Value']
+            except ssm.exceptions.ParameterNotFound:
+                current = None
+            if current == value:
+                continue
+            ssm.put_parameter(Name=name, Value=value, Type=param_type,
+                              Overwrite=True, Description=description)
+            changed = True
+        return {'names': [p[0] for p in parameters]}, changed
+
+    def ensure_lambda_role(self):
+        iam = self.client('iam')
+        role_arn, created = ensure_role(iam, LAMBDA_ROLE_NAME, 'lambda.amazonaws.com',
+                                        'Role for Trading Agent Lambda functions')
+        attached = {
+            p['PolicyArn']
+            for p in iam.list_attached_role_policies(RoleName=LAMBDA_ROLE_NAME)['AttachedPolicies']
+        }
+        for policy_arn in LAMBDA_POLICIES:
+            if policy_arn not in attached:
+                iam.attach_role_policy(RoleName=LAMBDA_ROLE_NAME, PolicyArn=policy_arn)
+                created = True
+        return {'role_name': LAMBDA_ROLE_NAME, 'role_arn': role_arn}, created
+
+    def ensure_dependency_layer(self):
+        layer_arn, published = ensure_layer(self.client('lambda'))
+        return {'layer_version_arn': layer_arn}, published
+
+    def ensure_lambda(self, key):
+        spec = LAMBDA_FUNCTIONS[key]
+        function_name = spec['function_name']
+        zip_bytes, digest, _ = build_function_package(function_name, spec['sources'])
+
+        policy = lambda_permissions_policy(key, self.region, self.account_id())
+        if policy:
+            self.client('iam').put_role_policy(RoleName=LAMBDA_ROLE_NAME, PolicyName=f'TradingAgent-{key}-permissions',
+                                               PolicyDocument=json.dumps(policy))
+
+        function_arn, changed = deploy_function(
+            self.client('lambda'),
+            function_name,
+            zip_bytes,
+            role_arn=self.state.get('lambda_role')['role_arn'],
+            handler=spec['handler'],
+            description=spec['description'],
+            layers=[self.state.get('dependency_layer')['layer_version_arn']],
+            environment=self.table_environment(key),
+            timeout=spec.get('timeout', 30),
+            create_function=retry_while_propagating
+        )
+        return {'function_name': function_name, 'function_arn': function_arn, 'code_hash': digest}, changed
+
+    def ensure_table(self, key):
+        """Create an opt-in table (on-demand billing) and grant the Lambda role its actions"""
+        name = table_name(key)
+        if not name:
+            return {}, False
+        spec = DYNAMODB_TABLES[key]
+        dynamodb = self.client('dynamodb')
+
+        created = False
+        try:
+            table_arn = dynamodb.describe_table(TableName=name)['Table']['TableArn']
+        except dynamodb.exceptions.ResourceNotFoundException:
+            kwargs = {
+                'TableName': name,
+                'KeySchema': spec['key_schema'],
+                'AttributeDefinitions': [{'AttributeName': attribute, 'AttributeType': attribute_type}
+                                         for attribute, attribute_type in spec['attributes'].items()],
+                'BillingMode': 'PAY_PER_REQUEST'
+            }
+            if spec['indexes']:
+                kwargs['GlobalSecondaryIndexes'] = [
+                    {'IndexName': index, 'KeySchema': keys, 'Projection': {'ProjectionType': 'ALL'}}
+                    for index, keys in spec['indexes'].items()
+                ]
+            table_arn = dynamodb.create_table(**kwargs)['TableDescription']['TableArn']
+            dynamodb.get_waiter('table_exists').wait(TableName=name)
+            if spec['ttl_attribute']:
+                dynamodb.update_time_to_live(
+                    TableName=name,
+                    TimeToLiveSpecification={'Enabled': True, 'AttributeName': spec['ttl_attribute']}
+                )
+            created = True
+
+        policy = {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": spec['actions'],
+                "Resource": [table_arn, f"{table_arn}/index/*"]
+            }]
+        }
+        self.client('iam').put_role_policy(RoleName=LAMBDA_ROLE_NAME, PolicyName=f'TradingAgent-{key}-table',
+                                           PolicyDocument=json.dumps(policy))
+        return {'table_name': name, 'table_arn': table_arn}, created
+
+    def ensure_pipeline_schedule(self):
+        """Daily EventBridge rule that invokes the pipeline Lambda"""
+        events = self.client('events')
+        function_arn = self.state.get('pipeline_lambda')['function_arn']
+        changed = False
+        try:
+            rule = events.describe_rule(Name=SCHEDULE_RULE_NAME)
+        except events.exceptions.ResourceNotFoundException:
+            rule = {}
+        if rule.get('ScheduleExpression') != SCHEDULE_EXPRESSION or rule.get('State') != 'ENABLED':
+            rule = events.put_rule(Name=SCHEDULE_RULE_NAME, ScheduleExpression=SCHEDULE_EXPRESSION, State='ENABLED',
+                                   Description='Daily market analysis at 8 AM CST')
+            changed = True
+        rule_arn = rule.get('Arn') or rule['RuleArn']
+
+        try:
+            self.client('lambda').add_permission(FunctionName=function_arn, StatementId=SCHEDULE_RULE_NAME,
+                                                 Action='lambda:InvokeFunction', Principal='events.amazonaws.com',
+                                                 SourceArn=rule_arn)
+            changed = True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ResourceConflictException':
+                raise
+
+        targets = events.list_targets_by_rule(Rule=SCHEDULE_RULE_NAME)['Targets']
+        if [t['Arn'] for t in targets] != [function_arn]:
+            stale = [t['Id'] for t in targets if t['Arn'] != function_arn]
+            if stale:
+                events.remove_targets(Rule=SCHEDULE_RULE_NAME, Ids=stale)
+            events.put_targets(Rule=SCHEDULE_RULE_NAME, Targets=[{'Id': 'daily-pipeline', 'Arn': function_arn}])
+            changed = True
+        return {'rule_name': SCHEDULE_RULE_NAME, 'rule_arn': rule_arn, 'schedule': SCHEDULE_EXPRESSION}, changed
+
+    def ensure_ses_identity(self):
+        ses = self.client('ses')
+        email = self.notification_email
+        attributes = ses.get_identity_verification_attributes(Identities=[email])
+        status = attributes['VerificationAttributes'].get(email, {}).get('VerificationStatus')
+        if status in ('Success', 'Pending'):
+            return {'email': email, 'status': status}, False
+        ses.verify_email_identity(EmailAddress=email)
+        return {'email': email, 'status': 'Pending'}, True
+
+    def find_user_pool(self, cognito):
+        """Id of an existing trading-agent pool: from the state, cognito_config.json or by name"""
+        candidates = [self.state.get('cognito').get('user_pool_id')]
+        try:
+            with open('cognito_config.json') as f:
+                candidates.append(json.load(f).get('user_pool_id'))
+        except (FileNotFoundError, ValueError):
+            pass
+        for pool_id in dict.fromkeys(filter(None, candidates)):
+            try:
+                cognito.describe_user_pool(UserPoolId=pool_id)
+                return pool_id
+            except cognito.exceptions.ResourceNotFoundException:
+                pass
+        for page in cognito.get_paginator('list_user_pools').paginate(MaxResults=60):
+            for pool in page['UserPools']:
+                if pool['Name'] == COGNITO_POOL_NAME:
+                    return pool['Id']
+        return None
+
+    def ensure_cognito(self):
+        """Reuse the pool, domain, resource server and app client that exist; create the rest"""
+        cognito = self.client('cognito-idp')
+        cached = self.state.get('cognito')
+        created = False
+
+        pool_id = self.find_user_pool(cognito)
+        if not pool_id:
+            pool_id = cognito.create_user_pool(
+                PoolName=COGNITO_POOL_NAME,
+                Policies={
+                    'PasswordPolicy': {
+                        'MinimumLength': 8,
+                        'RequireUppercase': False,
+                        'RequireLowercase': False,
+                        'RequireNumbers': False,
+                        'RequireSymbols': False
+                    }
+                },
+                AutoVerifiedAttributes=['email']
+            )['UserPool']['Id']
+            created = True
+
+        domain_prefix = cognito.describe_user_pool(UserPoolId=pool_id)['UserPool'].get('Domain')
+        if not domain_prefix:
+            domain_prefix = f"trading-agent-{os.urandom(4).hex()}"
+            cognito.create_user_pool_domain(Domain=domain_prefix, UserPoolId=pool_id)
+            created = True
+
+        try:
+            cognito.describe_resource_server(UserPoolId=pool_id, Identifier='trading-api')
+        except cognito.exceptions.ResourceNotFoundException:
+            cognito.create_resource_server(
+                UserPoolId=pool_id,
+                Identifier='trading-api',
+                Name='TradingAPI',
+                Scopes=[
+                    {'ScopeName': 'read', 'ScopeDescription': 'Read access to trading agent'},
+                    {'ScopeName': 'write', 'ScopeDescription': 'Write access to trading agent'}
+                ]
+            )
+            created = True
+
+        app_client = None
+        for page in cognito.get_paginator('list_user_pool_clients').paginate(UserPoolId=pool_id, MaxResults=60):
+            for item in page['UserPoolClients']:
+                if item['ClientName'] == 'trading-agent-client':
+                    app_client = cognito.describe_user_pool_client(UserPoolId=pool_id,
+                                                                   ClientId=item['ClientId'])['UserPoolClient']
+                    break
+            if app_client:
+                break
+        if not app_client:
+            app_client = cognito.create_user_pool_client(
+                UserPoolId=pool_id,
+                ClientName='trading-agent-client',
+                GenerateSecret=True,
+                ExplicitAuthFlows=[],
+                AllowedOAuthFlows=['client_credentials'],
+                AllowedOAuthScopes=['trading-api/read', 'trading-api/write'],
+                AllowedOAuthFlowsUserPoolClient=True,
+                SupportedIdentityProviders=['COGNITO']
+            )['UserPoolClient']
+            created = True
+
+        config = {
+            "user_pool_id": pool_id,
+            "domain_prefix": domain_prefix,
+            "client_id": app_client['ClientId'],
+            "client_secret": app_client['ClientSecret'],
+            "token_endpoint": f"https://{domain_prefix}.auth.{self.region}.amazoncognito.com/oauth2/token",
+            "discovery_url": f"https://cognito-idp.{self.region}.amazonaws.com/{pool_id}/.well-known/openid-configuration",
+            "region": self.region
+        }
+        return config, created or config != cached
+
+    def ensure_memory(self):
+        cached = self.state.get('memory')
+        if cached.get('memory_id'):
+            control = self.client('bedrock-agentcore-control')
+            try:
+                status = control.get_memory(memoryId=cached['memory_id'])['memory'].get('status')
+                if status not in ('FAILED', 'DELETING'):
+                    return cached, False
+            except control.exceptions.ResourceNotFoundException:
+                pass
+
+        from bedrock_agentcore_starter_toolkit.operations.memory.manager import MemoryManager
+
+        strategies = [
+            {"summaryMemoryStrategy": {"name": "summary", "namespaces": ["trading/{actorId}/{sessionId}/summary"]}},
+            {"userPreferenceMemoryStrategy": {"name": "preferences", "namespaces": ["trading/{actorId}/preferences"]}},
+            {"semanticMemoryStrategy": {"name": "semantic", "namespaces": ["trading/{actorId}/semantic"]}},
+        ]
+        memory = MemoryManager(region_name=self.region).get_or_create_memory(
+            name=MEMORY_NAME,
+            description="Stores trading history, user preferences, and market analysis results",
+            strategies=strategies
+        )
+        return {"memory_id": memory["id"], "name": MEMORY_NAME, "region": self.region}, True
+
+    def ensure_gateway_role(self):
+        iam = self.client('iam')
+        role_arn, created = ensure_role(iam, GATEWAY_ROLE_NAME, 'bedrock-agentcore.amazonaws.com',
+                                        'Role for Trading Agent Gateway to invoke Lambda functions')
+        policy_document = {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": "lambda:InvokeFunction",
+                "Resource": [f"arn:aws:lambda:{self.region}:{self.account_id()}:function:TradingAgent-*"]
+            }]
+        }
+        iam.put_role_policy(RoleName=GATEWAY_ROLE_NAME, PolicyName='TradingAgentGatewayPolicy',
+                            PolicyDocument=json.dumps(policy_document))
+        return {"role_name": GATEWAY_ROLE_NAME, "role_arn": role_arn, "region": self.region}, created
+
+    def ensure_runtime_role(self):
+        iam = self.client('iam')
+        account_id = self.account_id()
+        role_arn, created = ensure_role(iam, RUNTIME_ROLE_NAME, 'bedrock-agentcore.amazonaws.com',
+                                        'Execution role for Trading Agent Runtime')
+        permissions_policy = {
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Sid": "BedrockModelAccess",
+                    "Effect": "Allow",
+                    "Action": ["bedrock:InvokeModel", "bedrock:InvokeModelWithResponseStream"],
+                    "Resource": [
+                        "arn:aws:bedrock:*::foundation-model/*",
+                        f"arn:aws:bedrock:{self.region}:{account_id}:*"
+                    ]
+                },
+                {
+                    "Sid": "AgentCoreMemoryAccess",
+                    "Effect": "Allow",
+                    "Action": [
+                        "bedrock-agentcore:CreateEvent",
+                        "bedrock-agentcore:ListEvents",
+                        "bedrock-agentcore:GetMemoryRecord",
+                        "bedrock-agentcore:GetMemory",
+                        "bedrock-agentcore:RetrieveMemoryRecords",
+                        "bedrock-agentcore:ListMemoryRecords"
+                    ],
+                    "Resource": f"arn:aws:bedrock-agentcore:{self.region}:{account_id}:*"
+                },
+                {
+                    "Sid": "CloudWatchLogsAccess",
+                    "Effect": "Allow",
+                    "Action": ["logs:CreateLogGroup", "logs:CreateLogStream", "logs:PutLogEvents"],
+                    "Resource": f"arn:aws:logs:{self.region}:{account_id}:log-group:/aws/bedrock-agentcore/*"
+                },
+                {
+                    "Sid": "XRayAccess",
+                    "Effect": "Allow",
+                    "Action": ["xray:PutTraceSegments", "xray:PutTelemetryRecords"],
+                    "Resource": "*"
+                },
+                {
+                    "Sid": "ECRAccess",
+                    "Effect": "Allow",
+                    "Action": [
+                        "ecr:GetAuthorizationToken",
+                        "ecr:BatchCheckLayerAvailability",
+                        "ecr:GetDownloadUrlForLayer",
+                        "ecr:BatchGetImage"
+                    ],
+                    "Resource": "*"
+                },
+                {
+                    "Sid": "SSMParameterAccess",
+                    "Effect": "Allow",
+                    "Action": "ssm:GetParameter",
+                    "Resource": f"arn:aws:ssm:{self.region}:{account_id}:parameter/trading-agent/*"
+                }
+            ]
+        }
+        iam.put_role_policy(RoleName=RUNTIME_ROLE_NAME, PolicyName='TradingAgentRuntimePolicy',
+                            PolicyDocument=json.dumps(permissions_policy))
+        return {"role_name": RUNTIME_ROLE_NAME, "role_arn": role_arn, "region": self.region}, created
+
+    def ensure_gateway(self):
+        control = self.client('bedrock-agentcore-control')
+        cognito_config = self.state.get('cognito')
+        role_arn = self.state.get('gateway_role')['role_arn']
+
+        gateway_id = self.state.get('gateway').get('gateway_id')
+        if not gateway_id:
+            for item in control.list_gateways().get('items', []):
+                if item.get('name') == GATEWAY_NAME:
+                    gateway_id = item['gatewayId']
+                    break
+
+        gateway_settings = {
+            'name': GATEWAY_NAME,
+            'roleArn': role_arn,
+            'protocolType': "MCP",
+            'authorizerType': "CUSTOM_JWT",
+            'authorizerConfiguration': {
+                "customJWTAuthorizer": {
+                    "allowedClients": [cognito_config["client_id"]],
+                    "discoveryUrl": cognito_config["discovery_url"]
+                }
+            },
+            'description': "Gateway for Trading Agent Lambda tools"
+        }
+
+        created = False
+        if not gateway_id:
+            gateway_id = control.create_gateway(**gateway_settings)["gatewayId"]
+            created = True
+        else:
+            # A recreated Cognito client must be allowed through the existing gateway
+            deployed = control.get_gateway(gatewayIdentifier=gateway_id)
+            authorizer = deployed.get('authorizerConfiguration', {}).get('customJWTAuthorizer', {})
+            if (authorizer.get('allowedClients') != [cognito_config["client_id"]]
+                    or authorizer.get('discoveryUrl') != cognito_config["discovery_url"]
+                    or deployed.get('roleArn') != role_arn):
+                control.update_gateway(gatewayIdentifier=gateway_id, **gateway_settings)
+                created = True
+
+        def gateway_ready():
+            gateway = control.get_gateway(gatewayIdentifier=gateway_id)
+            if gateway['status'] == 'FAILED':
+                raise RuntimeError(f"Gateway {gateway_id} failed: {gateway.get('statusReasons')}")
+            return gateway if gateway['status'] == 'READY' else None
+
+        gateway = poll_until(gateway_ready, description='gateway to become READY')
+        return {
+            "id": gateway_id,
+            "gateway_id": gateway_id,
+            "gateway_url": gateway["gatewayUrl"],
+            "gateway_arn": gateway["gatewayArn"],
+            "name": GATEWAY_NAME,
+            "region": self.region
+        }, created
+
+    def ensure_gateway_target(self, key):
+        """Create the target, or update it when its Lambda, description or tool schema changed"""
+        spec = LAMBDA_FUNCTIONS[key]
+        control = self.client('bedrock-agentcore-control')
+        gateway_id = self.state.get('gateway')['gateway_id']
+        lambda_arn = self.state.get(f'{key}_lambda')['function_arn']
+        target = {
+            'gatewayIdentifier': gateway_id,
+            'name': spec['target_name'],
+            'description': spec['target_description'],
+            'targetConfiguration': {
+                "mcp": {
+                    "lambda": {
+                        "lambdaArn": lambda_arn,
+                        "toolSchema": {"inlinePayload": spec['tool_schema']}
+                    }
+                }
+            },
+            'credentialProviderConfigurations': [{"credentialProviderType": "GATEWAY_IAM_ROLE"}]
+        }
+
+        for item in control.list_gateway_targets(gatewayIdentifier=gateway_id).get('items', []):
+            if item.get('name') != spec['target_name']:
+                continue
+            target_id = item['targetId']
+            deployed = control.get_gateway_target(gatewayIdentifier=gateway_id, targetId=target_id)
+            if (deployed.get('targetConfiguration') == target['targetConfiguration']
+                    and deployed.get('description') == target['description']):
+                return {'target_id': target_id, 'target_name': spec['target_name']}, False
+            control.update_gateway_target(targetId=target_id, **target)
+            return {'target_id': target_id, 'target_name': spec['target_name']}, True
+
+        target_id = control.create_gateway_target(**target)["targetId"]
+        return {'target_id': target_id, 'target_name': spec['target_name']}, True
+
+    # ------------------------------------------------------------------
+    # Orchestration
+    # ------------------------------------------------------------------
+
+    def _run_step(self, step):
+        started = time.monotonic()
+        outputs, changed = step.run()
+        self.state.set(step.name, outputs)
+        self.timings[step.name] = round(time.monotonic() - started, 2)
+        return changed
+
+    def run(self, only=None):
+        """Run all steps (or the named subset plus their dependencies) as a DAG"""
+        steps = {step.name: step for step in self.steps}
+        unknown = sorted(set(only or ()) - set(steps))
+        if unknown:
+            raise ValueError(f"Unknown step(s): {', '.join(unknown)} (choose from {', '.join(sorted(steps))})")
+        selected = set(only or steps)
+        pending = list(selected)
+        while pending:
+            name = pending.pop()
+            for dep in steps[name].depends_on:
+                if dep not in selected:
+                    selected.add(dep)
+                    pending.append(dep)
+
+        done, failed = set(), {}
+        running = {}
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(done) + len(failed) < len(selected):
+                for name in sorted(selected - done - set(failed) - set(running.values())):
+                    deps = steps[name].depends_on
+                    if any(dep in failed for dep in deps):
+                        failed[name] = 'dependency failed'
+                        print(f"⏭️  {name}: skipped (dependency failed)")
+                    elif all(dep in done for dep in deps):
+                        running[executor.submit(self._run_step, steps[name])] = name
+
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        changed = future.result()
+                        done.add(name)
+                        verb = 'provisioned' if changed else 'already converged'
+                        print(f"✓ {name}: {verb} ({self.timings[name]}s)")
+                    except Exception as e:
+                        failed[name] = str(e)
+                        print(f"❌ {name}: {e}")
+
+        self.write_legacy_configs()
+        return {
+            'succeeded': sorted(done),
+            'failed': failed,
+            'timings': self.timings,
+            'elapsed_seconds': round(time.monotonic() - started, 2)
+        }
+
+    def write_legacy_configs(self):
+        """Write the per-step config files the deploy and test scripts read"""
+        state = self.state
+        market_data = state.get('market_data_lambda')
+        notification = state.get('notification_lambda')
+
+        configs = {}
+        if market_data and notification:
+            configs['lambda_config.json'] = {
+                "market_data": dict(market_data, tool_schema=MARKET_DATA_TOOL_SCHEMA),
+                "notification": dict(notification, tool_schema=NOTIFICATION_TOOL_SCHEMA),
+                "role_arn": state.get('lambda_role').get('role_arn'),
+                "region": self.region
+            }
+        if state.get('cognito'):
+            configs['cognito_config.json'] = state.get('cognito')
+        if state.get('memory'):
+            configs['memory_config.json'] = state.get('memory')
+        if state.get('gateway_role'):
+            configs['gateway_role_config.json'] = state.get('gateway_role')
+        if state.get('runtime_role'):
+            configs['runtime_execution_role_config.json'] = state.get('runtime_role')
+        if state.get('gateway'):
+            gateway_config = state.get('gateway')
+            if state.get('market_data_target'):
+                gateway_config['market_data_target_id'] = state.get('market_data_target')['target_id']
+            if state.get('notification_target'):
+                gateway_config['notification_target_id'] = state.get('notification_target')['target_id']
+            configs['gateway_config.json'] = gateway_config
+
+        for filename, config in configs.items():
+            with open(filename, 'w') as f:
+                json.dump(config, f, indent=2)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Recommendation Log
+Append-only history of recommendations for measuring hit rates.
+
+Local logs are partitioned on disk as <root>/<date>/<SYMBOL>.jsonl, so a
+query over a date range only opens the partitions in that range. The
+DynamoDB log keys items by symbol and date and adds a GSI on
+(recommendation, date), so "all BUYs in the last 90 days" is one Query
+rather than a Scan.
+
+Usage:
+  python3 recommendation_log.py --action BUY --days 90            # list
+  python3 recommendation_log.py --action BUY --days 90 --score    # hit rate vs later prices
+  python3 recommendation_log.py --score --stub                    # offline with fake market data
+"""
+
+import argparse
+import json
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from decimal import Decimal
+
+from trading_config import get_setting
+
+LOG_DIR = 'recommendation_log'
+ACTION_INDEX = 'recommendation-date-index'
+LOGGED_FIELDS = ('symbol', 'date', 'recommendation', 'confidence', 'price', 'signals', 'timestamp')
+
+
+def log_record(analysis, source='lambda'):
+    """The subset of an analysis result that is worth keeping"""
+    record = {field: analysis.get(field) for field in LOGGED_FIELDS}
+    record['date'] = str(record['date'])[:10]
+    record['source'] = source
+    return record
+
+
+class LocalRecommendationLog:
+    """JSON Lines partitions per date and symbol under a root directory"""
+
+    def __init__(self, root=LOG_DIR):
+        self.root = root
+
+    def append(self, record):
+        partition = os.path.join(self.root, record['date'])
+        os.makedirs(partition, exist_ok=True)
+        with open(os.path.join(partition, f"{record['symbol'].upper()}.jsonl"), 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def partitions(self, start, end):
+        """Date partitions in [start, end], found by bisecting the sorted directory listing"""
+        if not os.path.isdir(self.root):
+            return []
+        dates = sorted(os.listdir(self.root))
+        return dates[bisect_left(dates, start):bisect_right(dates, end)]
+
+    def query(self, start, end=None, action=None, symbol=None):
+        end = end or date.today().isoformat()
+        records = []
+        for partition in self.partitions(start, end):
+            directory = os.path.join(self.root, partition)
+            files = [f"{symbol.upper()}.jsonl"] if symbol else sorted(os.listdir(directory))
+            for filename in files:
+                path = os.path.join(directory, filename)
+                if not os.path.exists(path):
+                    continue
+                with open(path) as f:
+                    for line in f:
+                        record = json.loads(line)
+                        if action is None or record['recommendation'] == action:
+                            records.append(record)
+        return records
+
+
+class DynamoDBRecommendationLog:
+    """Items keyed (symbol, sort_key=date#source) with a GSI on (recommendation, date).
+
+    Table: partition key 'symbol' (S), sort key 'sort_key' (S); GSI
+    'recommendation-date-index' with partition key 'recommendation' (S) and
+    sort key 'date' (S). One item per symbol, bar date and source, so
+    re-analysing the same bar overwrites instead of adding a duplicate.
+    setup_infrastructure.py creates the table when recommendation_log.table
+    (or RECOMMENDATION_LOG_TABLE) is set.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def append(self, record):
+        item = json.loads(json.dumps(record), parse_float=Decimal)
+        item['sort_key'] = f"{record['date']}#{record.get('source') or ''}"
+        self.table.put_item(Item=item)
+
+    def _query_all(self, **kwargs):
+        items = []
+        while True:
+            response = self.table.query(**kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return [json.loads(json.dumps(item, default=float)) for item in items]
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def query(self, start, end=None, action=None, symbol=None):
+        from boto3.dynamodb.conditions import Attr, Key
+
+        end = end or date.today().isoformat()
+        if symbol:
+            kwargs = {'KeyConditionExpression': Key('symbol').eq(symbol.upper())
+                      & Key('sort_key').between(start, f"{end}#~")}
+            if action:
+                kwargs['FilterExpression'] = Attr('recommendation').eq(action)
+            return self._query_all(**kwargs)
+
+        actions = [action] if action else ['BUY', 'SELL', 'HOLD']
+        records = []
+        for name in actions:
+            records.extend(self._query_all(
+                IndexName=ACTION_INDEX,
+                KeyConditionExpression=Key('recommendation').eq(name) & Key('date').between(start, end)
+            ))
+        return records
+
+
+def create_recommendation_log(dynamodb=None, allow_local=True):
+    """DynamoDB log when RECOMMENDATION_LOG_TABLE (or config) names a table, else local files.
+
+    With allow_local=False (e.g. in Lambda, where disk is ephemeral) returns
+    None when no table is configured.
+    """
+    table_name = os.environ.get('RECOMMENDATION_LOG_TABLE') or get_setting('recommendation_log', 'table')
+    if table_name:
+        if dynamodb is None:
+            import boto3
+            dynamodb = boto3.resource('dynamodb')
+        return DynamoDBRecommendationLog(dynamodb.Table(table_name))
+    if not allow_local:
+        return None
+    return LocalRecommendationLog(os.environ.get('RECOMMENDATION_LOG_DIR', LOG_DIR))
+
+
+def score_outcomes(records, bars_by_symbol, horizon_days=None):
+    """Forward return of each BUY/SELL after horizon_days trading days.
+
+    Records are grouped per symbol and located in that symbol's bar dates by
+    bisection, so each symbol's history is read once. A BUY is a hit when the
+    price rose, a SELL when it fell; records without enough later bars are
+    left unscored. The same call on the same bar is scored once, however many
+    times or sources logged it (the latest record wins).
+    """
+    if horizon_days is None:
+        horizon_days = get_setting('trading_parameters', 'holding_period_days', 'max', default=10)
+
+    unique = {}
+    for record in records:
+        if record.get('recommendation') in ('BUY', 'SELL'):
+            unique[(record['symbol'].upper(), record['date'], record['recommendation'])] = record
+    by_symbol = {}
+    for (symbol, _, _), record in unique.items():
+        by_symbol.setdefault(symbol, []).append(record)
+
+    scored = []
+    for symbol, symbol_records in by_symbol.items():
+        bars = bars_by_symbol.get(symbol) or []
+        dates = [bar['date'][:10] for bar in bars]
+        closes = [bar['close'] for bar in bars]
+        for record in symbol_records:
+            i = bisect_right(dates, record['date']) - 1
+            if i < 0 or i + horizon_days >= len(closes):
+                continue
+            entry = record.get('price') or closes[i]
+            forward_return = closes[i + horizon_days] / entry - 1
+            direction = 1 if record['recommendation'] == 'BUY' else -1
+            scored.append(dict(record, forward_return=round(forward_return, 4), hit=forward_return * direction > 0))
+    return scored
+
+
+def summarize_outcomes(scored):
+    """Hit rate and average directional return per recommendation type"""
+    summary = {}
+    for record in scored:
+        stats = summary.setdefault(record['recommendation'], {'count': 0, 'hits': 0, 'total_return': 0.0})
+        direction = 1 if record['recommendation'] == 'BUY' else -1
+        stats['count'] += 1
+        stats['hits'] += record['hit']
+        stats['total_return'] += record['forward_return'] * direction
+    return {
+        action: {
+            'count': stats['count'],
+            'hit_rate': round(stats['hits'] / stats['count'], 3),
+            'avg_return_percent': round(stats['total_return'] / stats['count'] * 100, 2)
+        }
+        for action, stats in summary.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query logged recommendations and score their outcomes")
+    parser.add_argument("--action", choices=["BUY", "SELL", "HOLD"])
+    parser.add_argument("--symbol")
+    parser.add_argument("--days", type=int, default=90, help="Look-back window in days")
+    parser.add_argument("--score", action="store_true", help="Score against later prices")
+    parser.add_argument("--horizon", type=int, help="Trading days ahead to score (default: max holding period)")
+    parser.add_argument("--stub", action="store_true", help="Use fake market data for scoring")
+    args = parser.parse_args()
+
+    log = create_recommendation_log()
+    start = (date.today() - timedelta(days=args.days)).isoformat()
+    records = log.query(start, action=args.action, symbol=args.symbol)
+    print(f"{len(records)} recommendation(s) since {start}")
+
+    if not args.score:
+        for record in records:
+            print(f"  {record['date']} {record['symbol']:<6} {record['recommendation']:<4} "
+                  f"{record['confidence']:.2f} @ {record['price']}")
+        return
+
+    if args.stub:
+        from local_stubs import install_lambda_stubs
+        market_data, _ = install_lambda_stubs()
+    else:
+        import lambda_market_data as market_data
+    provider = market_data.get_market_data_provider()
+
+    bars_by_symbol = {}
+    for symbol in sorted({record['symbol'].upper() for record in records}):
+        try:
+            bars_by_symbol[symbol] = provider.fetch_daily_bars(symbol)
+        except Exception as e:
+            print(f"⚠️  No prices for {symbol}: {e}")
+
+    scored = score_outcomes(records, bars_by_symbol, args.horizon)
+    print(f"{len(scored)} scored")
+    print(json.dumps(summarize_outcomes(scored), indent=2))
+
+
+if __name__ == "__main__":
+    main()
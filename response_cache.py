@@ -0,0 +1,111 @@
+"""
+Response cache
+Serves repeated agent prompts without calling Bedrock or the gateway.
+
+Keys combine the actor, the session, a normalized form of the prompt
+(lower-cased content words with filler and time words removed,
+order-insensitive), the symbols mentioned and the date of the latest daily
+bar the answer could depend on. Prompts without an explicit symbol, or that
+refer back to earlier turns ("why?", "tell me more about it"), depend on the
+conversation and are never cached.
+When the next bar closes the expected date moves on, so yesterday's answers
+stop matching without any explicit invalidation.
+
+Answers that quote live figures (direct lookups, "right now", "current
+price") still move during the session, so they are keyed separately and only
+kept for the market data refresh interval (market_data.update_frequency_minutes).
+"""
+
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+from trading_config import get_setting
+from ttl_cache import TTLCache
+
+# Daily bars are final after the 16:00 New York close; 21:00 UTC covers EST and EDT
+MARKET_CLOSE_UTC_HOUR = 21
+
+FILLER_WORDS = {
+    "a", "an", "the", "i", "me", "my", "you", "your", "we", "is", "are", "be", "do", "does",
+    "it", "its", "of", "on", "in", "at", "to", "for", "and", "or", "please", "can", "could",
+    "would", "will", "tell", "give", "show", "what", "whats", "s", "right", "now", "today",
+    "currently", "current", "this", "morning", "afternoon", "hey", "hi", "thanks", "stock", "shares",
+}
+
+# Prompts that change state must always reach the agent
+WRITE_PATTERN = re.compile(r"\b(remember|prefer|preference|avoid|don't|dont|never|always|my risk|send|email)\b",
+                           re.IGNORECASE)
+# Prompts that lean on earlier turns; their answers are not reusable
+FOLLOW_UP_PATTERN = re.compile(r"\b(it|its|that|this|these|those|them|they|why|more|else|also|again|same|"
+                               r"above|previous|earlier|instead)\b", re.IGNORECASE)
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Prompts about the live market; answers to them age with the quotes
+LIVE_PATTERN = re.compile(r"\b(now|current|currently|live|latest|price|quote|trading at|intraday)\b", re.IGNORECASE)
+
+
+def latest_bar_date(now=None):
+    """Date of the most recent completed daily bar (weekends skipped, holidays ignored)"""
+    now = now or datetime.now(timezone.utc)
+    day = now.date()
+    if now.hour < MARKET_CLOSE_UTC_HOUR:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def normalize_intent(prompt, symbols):
+    """Order-insensitive content words of the prompt, without symbols or filler"""
+    symbols = {symbol.lower() for symbol in symbols}
+    words = {word for word in WORD_PATTERN.findall(prompt.lower())
+             if word not in FILLER_WORDS and word not in symbols}
+    return " ".join(sorted(words))
+
+
+class ResponseCache:
+    """TTLCache of agent answers keyed by (actor, session, intent, symbols, latest bar date, live).
+
+    live answers (live=True or a time-sensitive prompt) expire after
+    live_ttl_seconds instead of the cache's default TTL.
+    """
+
+    def __init__(self, cache, clock=None, live_ttl_seconds=None):
+        self.cache = cache
+        self.clock = clock
+        self.live_ttl_seconds = live_ttl_seconds
+
+    def key(self, actor_id, session_id, prompt, symbols, live=False):
+        if not symbols or WRITE_PATTERN.search(prompt) or FOLLOW_UP_PATTERN.search(prompt):
+            return None
+        now = self.clock() if self.clock else None
+        live = bool(live or LIVE_PATTERN.search(prompt))
+        return (actor_id, session_id, normalize_intent(prompt, symbols), tuple(sorted(symbols)),
+                latest_bar_date(now), live)
+
+    def get(self, actor_id, session_id, prompt, symbols, live=False):
+        key = self.key(actor_id, session_id, prompt, symbols, live)
+        return self.cache.get(key) if key else None
+
+    def set(self, actor_id, session_id, prompt, symbols, response, live=False):
+        key = self.key(actor_id, session_id, prompt, symbols, live)
+        if key:
+            self.cache.set(key, response, self.live_ttl_seconds if key[-1] else None)
+
+    def invalidate_actor(self, actor_id):
+        self.cache.invalidate_where(lambda key: key[0] == actor_id)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def create_response_cache():
+    """Cache sized by RESPONSE_CACHE_MAX_ENTRIES / RESPONSE_CACHE_TTL_SECONDS; live answers
+    expire after RESPONSE_CACHE_LIVE_TTL_SECONDS (default: market_data.update_frequency_minutes)"""
+    live_ttl_seconds = os.environ.get('RESPONSE_CACHE_LIVE_TTL_SECONDS')
+    if live_ttl_seconds is None:
+        live_ttl_seconds = get_setting('market_data', 'update_frequency_minutes', default=15) * 60
+    return ResponseCache(TTLCache(
+        max_size=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024)),
+        ttl_seconds=int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', 6 * 3600))
+    ), live_ttl_seconds=int(live_ttl_seconds))
@@ -0,0 +1,107 @@
+"""
+Runtime status helpers
+Configure the AgentCore Runtime and wait for deployments with backoff
+"""
+
+import time
+from contextlib import contextmanager
+
+READY_STATUSES = {"READY"}
+FAILED_STATUSES = {"CREATE_FAILED", "UPDATE_FAILED", "FAILED"}
+
+
+def configure_runtime(runtime, role_config, cognito_config):
+    """Apply the trading agent runtime configuration shared by the deploy/status/test scripts"""
+    auth_config = {
+        "customJWTAuthorizer": {
+            "allowedClients": [cognito_config["client_id"]],
+            "discoveryUrl": cognito_config["discovery_url"]
+        }
+    }
+    runtime.configure(
+        entrypoint="trading_agent.py",
+        agent_name="trading_agent",
+        execution_role=role_config["role_arn"],
+        auto_create_ecr=True,
+        memory_mode="NO_MEMORY",
+        requirements_file="requirements.txt",
+        region="us-west-2",
+        authorizer_configuration=auth_config
+    )
+    return runtime
+
+
+class PhaseTimer:
+    """Records wall-clock duration of named deployment phases"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(self.clock() - start, 1)
+
+    def record(self, name, seconds):
+        self.phases[name] = round(seconds, 1)
+
+    def elapsed(self):
+        return round(self.clock() - self.started, 1)
+
+
+def _status_of(section):
+    """Status string from an agent/endpoint section of a StatusResult"""
+    if isinstance(section, dict):
+        return section.get("status")
+    return None
+
+
+def wait_for_runtime(runtime, timeout=900, initial_delay=5, max_delay=60,
+                     on_update=print, sleep=time.sleep, clock=time.monotonic):
+    """Poll runtime.status() with exponential backoff until READY, FAILED or the deadline.
+
+    Returns a dict with the final status, the last endpoint details and the
+    elapsed seconds of the 'runtime' (agent runtime reaching READY) and
+    'endpoint' (endpoint reaching READY) phases.
+    """
+    started = clock()
+    deadline = started + timeout
+    delay = initial_delay
+    phases = {}
+    last = (None, None)
+
+    while True:
+        status_response = runtime.status()
+        agent_status = _status_of(status_response.agent)
+        endpoint_status = _status_of(status_response.endpoint)
+        elapsed = clock() - started
+
+        if (agent_status, endpoint_status) != last:
+            on_update(f"  [{elapsed:6.1f}s] runtime: {agent_status or '-'}  endpoint: {endpoint_status or '-'}")
+            last = (agent_status, endpoint_status)
+
+        if agent_status in READY_STATUSES and "runtime" not in phases:
+            phases["runtime"] = round(elapsed, 1)
+
+        if endpoint_status in READY_STATUSES:
+            phases.setdefault("runtime", round(elapsed, 1))
+            phases["endpoint"] = round(elapsed - phases["runtime"], 1)
+            return {"status": endpoint_status, "endpoint": status_response.endpoint,
+                    "phases": phases, "elapsed_seconds": round(elapsed, 1)}
+
+        if agent_status in FAILED_STATUSES or endpoint_status in FAILED_STATUSES:
+            return {"status": endpoint_status if endpoint_status in FAILED_STATUSES else agent_status,
+                    "endpoint": status_response.endpoint,
+                    "phases": phases, "elapsed_seconds": round(elapsed, 1)}
+
+        if clock() + delay > deadline:
+            return {"status": "TIMEOUT", "endpoint": status_response.endpoint,
+                    "phases": phases, "elapsed_seconds": round(elapsed, 1)}
+
+        sleep(delay)
+        delay = min(delay * 2, max_delay)
@@ -4,24 +4,10 @@ Complete infrastructure setup for Trading Agent
 Run this script to set up all AWS resources
 """
 
-import subprocess
+import argparse
 import sys
 import os
-
-def run_script(script_name, description):
-    """Run a setup script and handle errors"""
-    print(f"\n{'='*80}")
-    print(f"Running: {description}")
-    print(f"{'='*80}\n")
-    
-    result = subprocess.run([sys.executable, script_name], capture_output=False)
-    
-    if result.returncode != 0:
-        print(f"\n❌ Error running {script_name}")
-        print("Please fix the error and run this script again")
-        sys.exit(1)
-    
-    print(f"\n✓ {description} completed successfully")
+from provisioner import Provisioner, STATE_FILE
 
 def check_environment():
     """Check required environment variables"""
@@ -44,6 +30,12 @@ def check_environment():
     print("✓ Environment variables configured")
 
 def main():
+    parser = argparse.ArgumentParser(description="Provision all Trading Agent AWS resources")
+    parser.add_argument("--only", nargs="+", help="Provision only these steps (and their dependencies)")
+    parser.add_argument("--state-file", default=STATE_FILE, help="Where resource IDs are cached")
+    parser.add_argument("--max-workers", type=int, default=4, help="Steps to run concurrently")
+    args = parser.parse_args()
+
     print("=" * 80)
     print("TRADING AGENT - COMPLETE INFRASTRUCTURE SETUP")
     print("=" * 80)
@@ -52,25 +44,29 @@ def main():
     print("\nStep 1: Checking environment...")
     check_environment()
     
-    # Run setup scripts in order
-    scripts = [
-        ("01_create_lambdas.py", "Create Lambda Functions"),
-        ("02_create_cognito.py", "Create Cognito User Pool"),
-    ]
+    # Independent steps run concurrently; converged resources are skipped
+    print("\nStep 2: Provisioning resources...")
+    provisioner = Provisioner(state_path=args.state_file, max_workers=args.max_workers)
+    try:
+        result = provisioner.run(only=args.only)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     
-    for script, description in scripts:
-        if os.path.exists(script):
-            run_script(script, description)
-        else:
-            print(f"⚠️  Script not found: {script}")
+    if result['failed']:
+        print("\n❌ Some steps failed:")
+        for step, error in result['failed'].items():
+            print(f"   - {step}: {error}")
+        print("Please fix the error and run this script again (completed steps are skipped)")
+        sys.exit(1)
     
     print("\n" + "=" * 80)
-    print("✓ INFRASTRUCTURE SETUP COMPLETE")
+    print(f"✓ INFRASTRUCTURE SETUP COMPLETE ({result['elapsed_seconds']}s)")
     print("=" * 80)
+    print(f"\nResource IDs cached in {args.state_file}")
     print("\nNext steps:")
-    print("  1. Create Gateway (requires MCP tool or manual setup)")
-    print("  2. Create Memory (requires MCP tool)")
-    print("  3. Deploy Trading Agent")
+    print("  1. Verify your email in SES (check inbox)")
+    print("  2. Deploy Trading Agent: python3 09_deploy_agent.py")
     print("\nSee README.md for detailed instructions")
 
 if __name__ == "__main__":
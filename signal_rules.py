@@ -0,0 +1,208 @@
+"""
+Signal rules
+Declarative buy/sell signal rules compiled once into an evaluation plan.
+
+A rule compares an indicator field with a threshold or with another field:
+
+  {"name": "RSI_OVERSOLD", "field": "rsi", "op": "<", "value": "rsi_oversold", "direction": "bullish"}
+  {"name": "MACD_BULLISH", "field": "macd.line", "op": ">", "other": "macd.signal", "direction": "bullish"}
+
+"value" is a number or the name of a technical_indicators parameter, and the
+fields "ema_short"/"ema_long" resolve to the configured EMA periods. Rules
+whose inputs are missing do not fire. The same plan evaluates one snapshot
+(the Lambda) or whole columns of snapshots (screens over symbols, backtests
+over days), and each rule carries its direction so scoring never inspects
+signal names.
+"""
+
+import hashlib
+import json
+import operator
+
+from indicators import indicator_parameters
+from trading_config import get_setting
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
+
+DIRECTIONS = {'bullish': 1, 'bearish': -1}
+
+DEFAULT_RULES = [
+    {'name': 'RSI_OVERSOLD', 'field': 'rsi', 'op': '<', 'value': 'rsi_oversold', 'direction': 'bullish'},
+    {'name': 'RSI_OVERBOUGHT', 'field': 'rsi', 'op': '>', 'value': 'rsi_overbought', 'direction': 'bearish'},
+    {'name': 'BULLISH_EMA_CROSS', 'field': 'ema_short', 'op': '>', 'other': 'ema_long', 'direction': 'bullish'},
+    {'name': 'BEARISH_EMA_CROSS', 'field': 'ema_short', 'op': '<=', 'other': 'ema_long', 'direction': 'bearish'},
+    {'name': 'MACD_BULLISH', 'field': 'macd.line', 'op': '>', 'other': 'macd.signal', 'direction': 'bullish'},
+    {'name': 'MACD_BEARISH', 'field': 'macd.line', 'op': '<=', 'other': 'macd.signal', 'direction': 'bearish'},
+    {'name': 'STOCH_OVERSOLD', 'field': 'stochastic.k', 'op': '<', 'value': 'stochastic_oversold', 'direction': 'bullish'},
+    {'name': 'STOCH_OVERBOUGHT', 'field': 'stochastic.k', 'op': '>', 'value': 'stochastic_overbought', 'direction': 'bearish'},
+    {'name': 'PRICE_ABOVE_UPPER_BB', 'field': 'price', 'op': '>', 'other': 'bollinger_bands.upper', 'direction': 'bearish'},
+    {'name': 'PRICE_BELOW_LOWER_BB', 'field': 'price', 'op': '<', 'other': 'bollinger_bands.lower', 'direction': 'bullish'}
+]
+
+DEFAULT_MIN_AGREEMENT = 0.5
+
+
+class SignalRuleError(Exception):
+    """Raised when a rule definition cannot be compiled"""
+
+
+def flatten(snapshot, price=None, prefix=''):
+    """Indicator snapshot as a flat {'macd.line': ...} row, plus 'price'"""
+    row = {} if price is None else {'price': price}
+    for key, value in snapshot.items():
+        if isinstance(value, dict):
+            row.update(flatten(value, prefix=f"{prefix}{key}."))
+        else:
+            row[f"{prefix}{key}"] = value
+    return row
+
+
+def columns_from_rows(rows):
+    """Turn flat rows (one per symbol or day) into {field: [values]} columns"""
+    fields = set()
+    for row in rows:
+        fields.update(row)
+    return {field: [row.get(field) for row in rows] for field in fields}
+
+
+class CompiledRule:
+    """One rule with its operator, resolved fields and constant bound at compile time"""
+
+    def __init__(self, name, field, compare, direction, other=None, constant=None):
+        self.name = name
+        self.field = field
+        self.compare = compare
+        self.direction = direction
+        self.other = other
+        self.constant = constant
+
+    def fires(self, row):
+        left = row.get(self.field)
+        right = row.get(self.other) if self.other else self.constant
+        return left is not None and right is not None and self.compare(left, right)
+
+    def fire_column(self, columns, length):
+        """Boolean mask of this rule over every row of a column set"""
+        compare = self.compare
+        left = columns.get(self.field, [None] * length)
+        if self.other:
+            right = columns.get(self.other, [None] * length)
+            return [a is not None and b is not None and compare(a, b) for a, b in zip(left, right)]
+        constant = self.constant
+        return [a is not None and compare(a, constant) for a in left]
+
+
+class SignalRuleSet:
+    """Compiled rules plus the scoring that turns fired rules into a recommendation"""
+
+    def __init__(self, rules, min_agreement=DEFAULT_MIN_AGREEMENT, fingerprint=''):
+        self.rules = rules
+        self.min_agreement = min_agreement
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def compile(cls, rule_definitions=None, parameters=None, min_agreement=DEFAULT_MIN_AGREEMENT):
+        parameters = parameters or indicator_parameters()
+        rule_definitions = rule_definitions or DEFAULT_RULES
+        aliases = {
+            'ema_short': f"ema_{parameters['ema_short']}",
+            'ema_long': f"ema_{parameters['ema_long']}"
+        }
+
+        rules = []
+        for definition in rule_definitions:
+            name = definition.get('name')
+            if definition.get('op') not in OPERATORS:
+                raise SignalRuleError(f"Rule {name}: unsupported operator {definition.get('op')!r}")
+            if definition.get('direction') not in DIRECTIONS:
+                raise SignalRuleError(f"Rule {name}: direction must be 'bullish' or 'bearish'")
+
+            constant = definition.get('value')
+            if isinstance(constant, str):
+                if constant not in parameters:
+                    raise SignalRuleError(f"Rule {name}: unknown parameter {constant!r}")
+                constant = parameters[constant]
+            other = definition.get('other')
+            if other is None and constant is None:
+                raise SignalRuleError(f"Rule {name}: needs 'value' or 'other'")
+
+            field = definition['field']
+            rules.append(CompiledRule(
+                name,
+                aliases.get(field, field),
+                OPERATORS[definition['op']],
+                DIRECTIONS[definition['direction']],
+                other=aliases.get(other, other),
+                constant=constant
+            ))
+
+        encoded = json.dumps([rule_definitions, min_agreement], sort_keys=True)
+        return cls(rules, min_agreement, hashlib.sha256(encoded.encode()).hexdigest()[:16])
+
+    def score(self, bullish, bearish):
+        """(recommendation, confidence) from bullish and bearish signal counts"""
+        total = bullish + bearish
+        confidence = abs(bullish - bearish) / total if total else 0
+        recommendation = "HOLD"
+        if bullish > bearish and confidence > self.min_agreement:
+            recommendation = "BUY"
+        elif bearish > bullish and confidence > self.min_agreement:
+            recommendation = "SELL"
+        return recommendation, round(confidence, 2)
+
+    def fired(self, row):
+        """(signals, bullish count, bearish count) for one flat row"""
+        signals = []
+        bullish = bearish = 0
+        for rule in self.rules:
+            if rule.fires(row):
+                signals.append(rule.name)
+                if rule.direction > 0:
+                    bullish += 1
+                else:
+                    bearish += 1
+        return signals, bullish, bearish
+
+    def evaluate(self, row):
+        """Evaluate one flat row; returns (signals, recommendation, confidence)"""
+        signals, bullish, bearish = self.fired(row)
+        return (signals,) + self.score(bullish, bearish)
+
+    def bias(self, row):
+        """Net signal direction in [-1, 1]: (bullish - bearish) / fired"""
+        _, bullish, bearish = self.fired(row)
+        total = bullish + bearish
+        return (bullish - bearish) / total if total else 0.0
+
+    def evaluate_matrix(self, columns):
+        """Evaluate every row of a column set (symbols x days flattened into rows).
+
+        Each rule is applied column-wise in one pass, then per-row counts are
+        combined; returns a list of (signals, recommendation, confidence).
+        """
+        length = max((len(values) for values in columns.values()), default=0)
+        bullish = [0] * length
+        bearish = [0] * length
+        signals = [[] for _ in range(length)]
+        for rule in self.rules:
+            counts = bullish if rule.direction > 0 else bearish
+            for i, fired in enumerate(rule.fire_column(columns, length)):
+                if fired:
+                    counts[i] += 1
+                    signals[i].append(rule.name)
+        return [(signals[i],) + self.score(bullish[i], bearish[i]) for i in range(length)]
+
+
+def load_signal_rules(config=None):
+    """Compile trading_parameters.signal_rules (or the defaults) from config"""
+    settings = get_setting('trading_parameters', 'signal_rules', default={}, config=config) or {}
+    return SignalRuleSet.compile(
+        settings.get('rules'),
+        indicator_parameters(config),
+        settings.get('min_agreement', DEFAULT_MIN_AGREEMENT)
+    )
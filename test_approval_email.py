@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Offline check of the approval flow: propose sends the approval email,
+approval releases the order to the paper-trading engine exactly once.
+
+The notifier calls the notification Lambda handler directly, with SES
+replaced by the local fake, instead of invoking the deployed function.
+"""
+
+from approval_queue import ApprovalService, LocalApprovalQueue
+from local_stubs import FakeSES, install_lambda_stubs
+from paper_trading import PaperTradingEngine
+
+ses = FakeSES(latency_seconds=0)
+_, notification = install_lambda_stubs(ses=ses)
+
+
+def notify(alert_type, data):
+    return notification.lambda_handler({'alert_type': alert_type, 'data': data}, None)
+
+
+engine = PaperTradingEngine(cash=10000)
+settings = {'require_human_approval': True, 'approval_timeout_minutes': 60, 'executor': 'paper'}
+service = ApprovalService(LocalApprovalQueue(), notify, engine.execute, settings)
+
+request = service.propose({'symbol': 'aapl', 'side': 'BUY', 'quantity': 1, 'entry_price': 95.0,
+                           'stop_price': 90.0, 'take_profit': 105.0, 'confidence': 0.8, 'reason': 'RSI oversold'})
+print(f"Proposed {request['request_id']}, emails: {ses.sent}")
+assert len(ses.sent) == 1 and 'AAPL' in ses.sent[0]['subject'], "approval email was not sent"
+
+assert service.approve(request['request_id'], decided_by='check')['status'] == 'approved'
+released = service.process()['released']
+print(f"Released: {[(r['request_id'], r['execution']) for r in released]}")
+assert len(released) == 1 and released[0]['execution']['status'] == 'open'
+assert [o['symbol'] for o in engine.open_orders()] == ['AAPL'], "order did not reach the paper engine"
+assert service.process()['released'] == [], "approved request released twice"
+print("✓ Approval email sent and approved order executed once")
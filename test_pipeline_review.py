@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Offline check that the daily pipeline flags correlated picks end to end.
+
+GOOGL's fake prices are META's scaled by half, so the two return series are
+perfectly correlated and get the same recommendation. The closes travel from
+the MarketData handler through the pipeline's review into the daily_summary
+email payload, where both picks must carry correlated_with.
+"""
+
+from daily_pipeline import StubExecutor, run_daily_pipeline
+from local_stubs import FakeAlphaVantage, FakeResponse, generate_daily_series, install_lambda_stubs
+
+
+class CorrelatedAlphaVantage(FakeAlphaVantage):
+    """GOOGL moves exactly like META"""
+
+    def get(self, url, params=None, timeout=None):
+        if (params or {}).get('symbol') != 'GOOGL':
+            return super().get(url, params, timeout)
+        series = generate_daily_series('META')
+        for values in series['Time Series (Daily)'].values():
+            for field in ('1. open', '2. high', '3. low', '4. close'):
+                values[field] = f"{float(values[field]) / 2:.4f}"
+        return FakeResponse(series)
+
+
+class RecordingExecutor(StubExecutor):
+    def __init__(self):
+        self.market_data, self.notification = install_lambda_stubs(alpha_vantage=CorrelatedAlphaVantage(latency_seconds=0))
+        self.sent = []
+
+    def notify(self, alert_type, data):
+        self.sent.append((alert_type, data))
+        return super().notify(alert_type, data)
+
+
+executor = RecordingExecutor()
+result = run_daily_pipeline(executor, ['META', 'GOOGL', 'AAPL'], min_confidence=0.0, limit=3)
+
+_, payload = executor.sent[0]
+flags = {rec['symbol']: rec.get('correlated_with') for rec in payload['recommendations']}
+print(f"Recommendations: {[(rec['symbol'], rec['recommendation']) for rec in payload['recommendations']]}")
+print(f"Correlation flags: {flags}")
+
+assert all('closes' not in rec for rec in payload['recommendations']), "closes must not reach the email payload"
+assert flags.get('META') == ['GOOGL'] and flags.get('GOOGL') == ['META'], "META/GOOGL pair was not flagged"
+assert sorted(result['correlated']) == ['GOOGL', 'META']
+print("✓ Correlated pair flagged from market data to email")
@@ -0,0 +1,73 @@
+"""
+Timeframes
+Weekly/monthly bars derived from daily bars, and cross-timeframe alignment.
+
+Resampling is a single pass over the chronological daily bars, so higher
+timeframes cost no extra API calls. The last weekly/monthly bar covers the
+period to date, as on a live chart.
+"""
+
+from datetime import date
+
+TIMEFRAME_WEIGHTS = {
+    'daily': 0.5,
+    'weekly': 0.3,
+    'monthly': 0.2
+}
+
+# Weight of the price-vs-EMA fallback relative to a unanimous rule set
+TREND_BIAS = 0.5
+
+
+def period_key(bar_date, timeframe):
+    if timeframe == 'weekly':
+        return date.fromisoformat(bar_date[:10]).isocalendar()[:2]
+    if timeframe == 'monthly':
+        return bar_date[:7]
+    raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+
+def resample_bars(bars, timeframe):
+    """Aggregate chronological daily bars into weekly or monthly OHLCV bars.
+
+    Each aggregated bar is dated by its last daily bar.
+    """
+    resampled = []
+    current_key = None
+    for bar in bars:
+        key = period_key(bar['date'], timeframe)
+        if key != current_key:
+            current_key = key
+            resampled.append(dict(bar))
+            continue
+        period = resampled[-1]
+        period['date'] = bar['date']
+        period['high'] = max(period['high'], bar['high'])
+        period['low'] = min(period['low'], bar['low'])
+        period['close'] = bar['close']
+        period['volume'] += bar['volume']
+    return resampled
+
+
+def trend_bias(close, ema):
+    """Fallback bias for short series no rule fires on: price above or below its short EMA"""
+    if ema is None:
+        return None
+    if close == ema:
+        return 0.0
+    return TREND_BIAS if close > ema else -TREND_BIAS
+
+
+def alignment_score(biases, weights=TIMEFRAME_WEIGHTS):
+    """Weighted mean bias over the timeframes that have one.
+
+    Returns (score in [-1, 1], aligned) where aligned means every available
+    timeframe leans the same way.
+    """
+    available = {name: bias for name, bias in biases.items() if bias is not None}
+    if not available:
+        return 0.0, False
+    total_weight = sum(weights.get(name, 0) for name in available)
+    score = sum(bias * weights.get(name, 0) for name, bias in available.items()) / total_weight if total_weight else 0.0
+    directions = {(bias > 0) - (bias < 0) for bias in available.values()}
+    return round(score, 2), len(directions) == 1 and 0 not in directions
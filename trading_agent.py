@@ -5,6 +5,7 @@ Trading agent with memory and gateway integration
 
 import os
 import json
+import time
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
 from strands import Agent, tool
 from strands.models import BedrockModel
@@ -13,13 +14,42 @@ from mcp.client.streamable_http import streamablehttp_client
 import requests
 from bedrock_agentcore.memory.integrations.strands.config import AgentCoreMemoryConfig, RetrievalConfig
 from bedrock_agentcore.memory.integrations.strands.session_manager import AgentCoreMemorySessionManager
+from agent_metrics import AgentMetrics, usage_from_result
+from circuit_breaker import CircuitBreaker
+from concurrency import GateBusy, create_request_gate
+from memory_cache import CachingMemoryClient, create_retrieval_cache
+from model_router import MODEL_TIERS, Route, classify, extract_symbols, format_lookup
+from response_cache import create_response_cache
+from portfolio import load_portfolio
+from trading_config import DEBUG_STATS
+from ttl_cache import TTLCache
 
 # Constants
-MODEL_ID = "us.anthropic.claude-sonnet-4-5-20250929-v1:0"
+MODEL_ID = MODEL_TIERS["deep"]
 REGION = "us-west-2"
-SESSION_ID = "default-session"
 ACTOR_ID = "default-actor"
 
+# Route simple prompts to a direct tool call or a smaller model ("off" always uses MODEL_ID)
+MODEL_ROUTING = os.environ.get("MODEL_ROUTING", "on")
+
+# Memory retrieval: "eager" injects context on every turn, "lazy" exposes it as a tool
+MEMORY_RETRIEVAL_MODE = os.environ.get("MEMORY_RETRIEVAL_MODE", "eager")
+
+# Shared across invocations while the runtime container stays warm
+retrieval_cache = create_retrieval_cache()
+response_cache = create_response_cache()
+agent_metrics = AgentMetrics()
+request_gate = create_request_gate()
+
+# Skip the gateway for a cool-down after repeated connection failures
+gateway_breaker = CircuitBreaker(
+    "gateway",
+    failure_threshold=int(os.environ.get("GATEWAY_FAILURE_THRESHOLD", 3)),
+    cooldown_seconds=int(os.environ.get("GATEWAY_COOLDOWN_SECONDS", 60))
+)
+# Last fresh analyze_stock result per symbol, used for direct lookups while the gateway is down
+last_analyses = TTLCache(max_size=256, ttl_seconds=int(os.environ.get("LAST_GOOD_MAX_AGE_HOURS", 72)) * 3600)
+
 # Initialize app
 app = BedrockAgentCoreApp()
 
@@ -55,112 +85,322 @@ def create_mcp_client():
     if not all([gateway_url, cognito_client_id, cognito_client_secret, cognito_discovery_url]):
         return None
     
-    try:
-        token = get_cognito_token_with_scope(
-            cognito_client_id,
-            cognito_client_secret,
-            cognito_discovery_url,
-            oauth_scopes
+    # Token errors propagate so the caller can count them against the gateway circuit
+    token = get_cognito_token_with_scope(
+        cognito_client_id,
+        cognito_client_secret,
+        cognito_discovery_url,
+        oauth_scopes
+    )
+    return MCPClient(
+        lambda: streamablehttp_client(
+            gateway_url,
+            headers={"Authorization": f"Bearer {token}"},
         )
-        return MCPClient(
-            lambda: streamablehttp_client(
-                gateway_url,
-                headers={"Authorization": f"Bearer {token}"},
+    )
+
+def build_retrieval_config(actor_id, session_id):
+    """Namespaces retrieved automatically on every turn (none in lazy mode)"""
+    if MEMORY_RETRIEVAL_MODE == "lazy":
+        return None
+
+    return {
+        f"trading/{actor_id}/semantic": RetrievalConfig(top_k=3),
+        f"trading/{actor_id}/preferences": RetrievalConfig(top_k=3),
+        f"trading/{actor_id}/{session_id}/summary": RetrievalConfig(top_k=2),
+    }
+
+def create_memory_tools(memory_client, memory_id, actor_id, session_id):
+    """Create tools for on-demand memory recall and preference updates"""
+
+    @tool
+    def recall_memory(query: str, scope: str = "all") -> str:
+        """Look up the user's stored trading preferences and past analysis.
+
+        Only call this when the answer depends on what the user told you before
+        (risk tolerance, preferred sectors, previous recommendations).
+
+        Args:
+            query: What to look for, e.g. "risk tolerance" or "past NVDA recommendations"
+            scope: One of "preferences", "semantic", "summary" or "all"
+        """
+        namespaces = {
+            "preferences": f"trading/{actor_id}/preferences",
+            "semantic": f"trading/{actor_id}/semantic",
+            "summary": f"trading/{actor_id}/{session_id}/summary",
+        }
+        selected = namespaces.values() if scope == "all" else [namespaces.get(scope, namespaces["semantic"])]
+
+        records = []
+        for namespace in selected:
+            memories = memory_client.retrieve_memories(
+                memory_id=memory_id,
+                namespace=namespace,
+                query=query,
+                top_k=3
             )
+            for memory in memories:
+                text = memory.get("content", {}).get("text", "").strip()
+                if text:
+                    records.append(text)
+
+        return "\n".join(records) if records else "No relevant memories found."
+
+    @tool
+    def save_trading_preference(preference: str) -> str:
+        """Record a trading preference the user has just stated.
+
+        Args:
+            preference: The preference in the user's words, e.g. "avoid energy stocks"
+        """
+        memory_client.create_event(
+            memory_id=memory_id,
+            actor_id=actor_id,
+            session_id=session_id,
+            messages=[(f"My trading preference: {preference}", "USER")]
         )
-    except Exception as e:
-        print(f"Warning: Failed to create MCP client: {e}")
-        return None
+        memory_client.invalidate()
+        response_cache.invalidate_actor(actor_id)
+        return "Preference saved."
+
+    return [recall_memory, save_trading_preference]
+
+_portfolio = None
+
+def get_portfolio():
+    """Portfolio loaded once per warm container from portfolio.json / PORTFOLIO_CAPITAL"""
+    global _portfolio
+    if _portfolio is None:
+        _portfolio = load_portfolio()
+    return _portfolio
 
-system_prompt = """You are an AI-powered swing trading analyst. Your role is to analyze stock market data, identify trading opportunities, and provide actionable recommendations.
+@tool
+def size_position(symbol: str, entry_price: float, stop_price: float = None) -> str:
+    """Compute the share count for a new long position under the risk rules.
 
-You have access to:
-1. Market data analysis tool - fetches real-time stock data and calculates technical indicators (RSI, MACD, EMA, Bollinger Bands)
-2. Email notification tool - sends trading alerts and daily summaries
-3. Memory - remembers user preferences and trading history
+    Uses half-Kelly sizing with the configured historical win rate, capped by
+    the 2% max loss per trade, the 10% max portfolio risk and available cash.
+    Always use this instead of estimating position sizes yourself.
 
-Your analysis should:
-- Focus on swing trading opportunities (2-10 day holds)
-- Use technical indicators to identify entry/exit points
-- Provide clear BUY/SELL/HOLD recommendations with confidence scores
-- Include risk management parameters (stop loss, take profit)
-- Send email notifications for high-confidence opportunities (>70%)
+    Args:
+        symbol: Stock ticker symbol
+        entry_price: Planned entry price
+        stop_price: Planned stop loss (defaults to the 3% trailing stop)
+    """
+    portfolio = get_portfolio()
+    sizing = portfolio.size_position(symbol, entry_price, stop_price=stop_price)
+    sizing["portfolio"] = portfolio.risk_summary()
+    return json.dumps(sizing)
 
-Risk Management Rules:
-- Max loss per trade: 2% of capital
-- Stop loss: 3% trailing
-- Take profit target: 5-8%
-- Only recommend trades with confidence >70%
+# Kept short and byte-for-byte stable: together with the tool definitions it
+# forms the cached prompt prefix, so per-request details never belong here.
+system_prompt = """You are a conservative swing trading analyst (2-10 day holds).
 
-Always be conservative, prioritize capital preservation, and provide clear reasoning for your recommendations."""
+Get every number from tools: analyze_stock for indicators and signals (mode "multi_timeframe" to confirm against the weekly trend), size_position for share counts, recall_memory and save_trading_preference for the user's preferences.
+
+Each recommendation states BUY/SELL/HOLD, confidence, entry, stop loss (3% trailing or atr_stop_loss) and a 5-8% take profit target. Only recommend trades above 70% confidence and email those with send_email_notification. Risk limits: 2% max loss per trade, 10% max portfolio risk.
+
+If a tool result has stale=true, say the data is as of data_as_of and may be outdated.
+
+Prioritize capital preservation and explain your reasoning briefly."""
+
+def create_model(model_id=MODEL_ID):
+    """Bedrock model with prompt caching on the tool definitions and system prompt"""
+    return BedrockModel(
+        model_id=model_id,
+        temperature=0.3,
+        cache_tools="default",
+        cache_prompt="default"
+    )
+
+def stale_notice(as_of=None):
+    """Marker prepended to answers built without live market data"""
+    if as_of:
+        return f"⚠️ Live market data is unavailable; figures are from {as_of} and may be stale.\n\n"
+    return "⚠️ Live market data is unavailable; this answer is not based on current market data.\n\n"
+
+def direct_lookup(mcp_client, gateway_tools, route):
+    """Answer a single-indicator lookup by calling analyze_stock directly.
+    
+    Returns (answer, stale); answer is None if the lookup was not possible.
+    """
+    tool_names = [t.tool_name for t in gateway_tools if t.tool_name.endswith("analyze_stock")]
+    if not tool_names:
+        return None, False
+    
+    start = time.monotonic()
+    result = mcp_client.call_tool_sync(
+        tool_use_id="direct-lookup",
+        name=tool_names[0],
+        arguments={"symbol": route.symbols[0]}
+    )
+    if result.get("status") != "success":
+        return None, False
+    
+    # The gateway returns the Lambda response; analyses live in its JSON body
+    data = json.loads(result["content"][0]["text"])
+    if isinstance(data.get("body"), str):
+        data = json.loads(data["body"])
+    answer = format_lookup(route, data)
+    if not answer:
+        return None, False
+    
+    agent_metrics.record("direct", time.monotonic() - start)
+    if data.get("stale"):
+        return stale_notice(data.get("data_as_of")) + answer, True
+    last_analyses.set(route.symbols[0], data)
+    return answer, False
+
+def offline_answer(route):
+    """Direct lookup answered from the last fresh analysis while the gateway is down"""
+    if route.tier != "direct":
+        return None
+    analysis = last_analyses.get(route.symbols[0])
+    answer = analysis and format_lookup(route, analysis)
+    return stale_notice(analysis.get("date")) + answer if answer else None
+
+def run_agent(agent, user_input, tier="agent"):
+    """Invoke the agent and record latency plus cached/uncached token usage"""
+    start = time.monotonic()
+    response = agent(user_input)
+    usage = usage_from_result(response)
+    agent_metrics.record(tier, time.monotonic() - start, usage)
+    print(f"Token usage: {usage}")
+    if DEBUG_STATS:
+        print(f"Agent metrics: {agent_metrics.summary()}")
+        print(f"Memory retrieval cache: {retrieval_cache.stats()}")
+    return response.message["content"][0]["text"]
+
+def answer_prompt(user_input, route, symbols, memory_id, session_id, actor_id):
+    """Run one prompt through a direct lookup or the agent and cache the answer"""
+    # Direct lookups quote live figures; keep the cache key even if the route falls back
+    live = route.tier == "direct"
+    # Configure memory
+    agentcore_memory_config = AgentCoreMemoryConfig(
+        memory_id=memory_id,
+        session_id=session_id,
+        actor_id=actor_id,
+        retrieval_config=build_retrieval_config(actor_id, session_id)
+    )
+    
+    session_manager = AgentCoreMemorySessionManager(
+        agentcore_memory_config=agentcore_memory_config,
+        region_name=REGION
+    )
+    
+    # Serve repeated preference/semantic lookups from the warm-container cache
+    memory_client = CachingMemoryClient(session_manager.memory_client, retrieval_cache, actor_id)
+    session_manager.memory_client = memory_client
+    
+    # Custom tools
+    custom_tools = create_memory_tools(memory_client, memory_id, actor_id, session_id) + [size_position]
+    
+    # Try to create MCP client for gateway tools, unless its circuit is open
+    mcp_client = None
+    gateway_error = None
+    if gateway_breaker.allow():
+        try:
+            mcp_client = create_mcp_client()
+        except Exception as e:
+            gateway_breaker.record_failure()
+            gateway_error = f"Failed to create MCP client: {e}"
+    else:
+        gateway_error = f"gateway circuit open, retrying in {gateway_breaker.retry_in():.0f}s"
+    
+    if mcp_client:
+        connected = False
+        try:
+            with mcp_client:
+                gateway_tools = list(mcp_client.list_tools_sync())
+                connected = True
+                gateway_breaker.record_success()
+                
+                if route.tier == "direct":
+                    answer, stale = direct_lookup(mcp_client, gateway_tools, route)
+                    if answer:
+                        if not stale:
+                            response_cache.set(actor_id, session_id, user_input, symbols, answer, live=live)
+                        return answer
+                    route = Route("fast", route.symbols)
+                
+                agent = Agent(
+                    model=create_model(route.model_id),
+                    tools=custom_tools + gateway_tools,
+                    system_prompt=system_prompt,
+                    session_manager=session_manager
+                )
+                
+                answer = run_agent(agent, user_input, route.tier)
+                response_cache.set(actor_id, session_id, user_input, symbols, answer, live=live)
+                return answer
+        except Exception as e:
+            if not connected:
+                gateway_breaker.record_failure()
+            gateway_error = f"Failed to use gateway tools: {e}"
+    
+    if gateway_error:
+        print(f"Warning: {gateway_error} (circuit: {gateway_breaker.stats()})")
+        answer = offline_answer(route)
+        if answer:
+            return answer
+    
+    # Fallback without gateway tools
+    if route.tier == "direct":
+        route = Route("fast", route.symbols)
+    agent = Agent(
+        model=create_model(route.model_id),
+        tools=custom_tools,
+        system_prompt=system_prompt,
+        session_manager=session_manager
+    )
+    
+    if not gateway_error:
+        answer = run_agent(agent, user_input, route.tier)
+        response_cache.set(actor_id, session_id, user_input, symbols, answer, live=live)
+        return answer
+    
+    # Degraded: tell the model it has no market data and mark the answer; never cache it
+    answer = run_agent(agent, "[Market data tools are unavailable right now; do not quote prices or "
+                              "indicator values.]\n\n" + user_input, route.tier)
+    return stale_notice() + answer
 
 @app.entrypoint
 def invoke(payload, context=None):
     """AgentCore Runtime entrypoint"""
     try:
-        # Initialize model
-        bedrock_model = BedrockModel(model_id=MODEL_ID, temperature=0.3)
+        user_input = payload.get("prompt", "")
+        route = classify(user_input) if MODEL_ROUTING == "on" else Route("deep", [])
+        if DEBUG_STATS:
+            print(f"Routing: {route}")
         
         # Get environment variables
         memory_id = os.environ.get("MEMORY_ID")
         if not memory_id:
             return "Error: MEMORY_ID environment variable is required"
         
-        session_id = context.session_id if context else SESSION_ID
+        # Without a runtime session, keep each actor's conversation separate
         actor_id = payload.get("actor_id", ACTOR_ID)
+        session_id = getattr(context, "session_id", None) or f"{actor_id}-session"
         
-        # Configure memory
-        agentcore_memory_config = AgentCoreMemoryConfig(
-            memory_id=memory_id,
-            session_id=session_id,
-            actor_id=actor_id,
-            retrieval_config={
-                f"trading/{actor_id}/semantic": RetrievalConfig(top_k=3),
-                f"trading/{actor_id}/preferences": RetrievalConfig(top_k=3),
-                f"trading/{actor_id}/{session_id}/summary": RetrievalConfig(top_k=2),
-            }
-        )
-        
-        session_manager = AgentCoreMemorySessionManager(
-            agentcore_memory_config=agentcore_memory_config,
-            region_name=REGION
-        )
-        
-        # Custom tools
-        custom_tools = []
-        
-        # Try to create MCP client for gateway tools
-        mcp_client = create_mcp_client()
+        # Same question, same actor, same market data: answer without Bedrock or the gateway
+        symbols = route.symbols or extract_symbols(user_input)
+        start = time.monotonic()
+        cached = response_cache.get(actor_id, session_id, user_input, symbols, live=route.tier == "direct")
+        if cached is not None:
+            agent_metrics.record("response_cache", time.monotonic() - start)
+            if DEBUG_STATS:
+                print(f"Response cache: {response_cache.stats()}")
+            return cached
         
-        if mcp_client:
-            try:
-                with mcp_client:
-                    gateway_tools = list(mcp_client.list_tools_sync())
-                    
-                    agent = Agent(
-                        model=bedrock_model,
-                        tools=custom_tools + gateway_tools,
-                        system_prompt=system_prompt,
-                        session_manager=session_manager
-                    )
-                    
-                    user_input = payload.get("prompt", "")
-                    response = agent(user_input)
-                    return response.message["content"][0]["text"]
-            except Exception as e:
-                print(f"Warning: Failed to use gateway tools: {e}")
-        
-        # Fallback without gateway tools
-        agent = Agent(
-            model=bedrock_model,
-            tools=custom_tools,
-            system_prompt=system_prompt,
-            session_manager=session_manager
-        )
-        
-        user_input = payload.get("prompt", "")
-        response = agent(user_input)
-        return response.message["content"][0]["text"]
+        # One request per session at a time, bounded concurrency across sessions
+        try:
+            with request_gate.slot(session_id) as waited:
+                if DEBUG_STATS:
+                    print(f"Request gate: waited {waited:.2f}s, {request_gate.stats()}")
+                return answer_prompt(user_input, route, symbols, memory_id, session_id, actor_id)
+        except GateBusy as e:
+            print(f"Request rejected: {e}, {request_gate.stats()}")
+            return "The trading agent is busy with other requests right now. Please try again in a minute."
     
     except Exception as e:
         error_msg = f"Agent invocation failed: {str(e)}"
@@ -0,0 +1,43 @@
+"""
+Trading configuration loader
+Reads config.json (or the bundled config.template.json) once per process
+"""
+
+import json
+import os
+from functools import lru_cache
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Per-request cache, circuit, metrics and gate stats in the logs (off: only warnings and errors)
+DEBUG_STATS = os.environ.get('DEBUG_STATS', 'off').lower() in ('1', 'true', 'on')
+
+
+def config_paths():
+    """Candidate config files, most specific first"""
+    paths = []
+    if os.environ.get('TRADING_CONFIG_PATH'):
+        paths.append(os.environ['TRADING_CONFIG_PATH'])
+    paths.append(os.path.join(MODULE_DIR, 'config.json'))
+    paths.append(os.path.join(MODULE_DIR, 'config.template.json'))
+    return paths
+
+
+@lru_cache(maxsize=1)
+def load_config():
+    """Load the first config file that exists (empty dict if none)"""
+    for path in config_paths():
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+    return {}
+
+
+def get_setting(*keys, default=None, config=None):
+    """Look up a nested setting, e.g. get_setting('market_data', 'provider')"""
+    value = load_config() if config is None else config
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            return default
+        value = value[key]
+    return value